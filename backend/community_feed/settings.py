@@ -44,6 +44,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'feed.metrics.metrics_middleware',  # Outermost, so latency covers every other middleware
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',  # For static files in production
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -155,6 +156,95 @@ REST_FRAMEWORK = {
     'PAGE_SIZE': 20
 }
 
+# Cache (local memory per process by default; Redis shared by all workers
+# if REDIS_URL is set)
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'community-feed',
+            'OPTIONS': {
+                'MAX_ENTRIES': 10000,
+            },
+        }
+    }
+
+# Sessions live in the shared cache when there is one, so authenticating
+# needs no database query; otherwise in the database (a per-process cache
+# would lose them between workers). Both are server-side, so logging out
+# revokes the session even if its cookie is replayed.
+SESSION_ENGINE = os.getenv('SESSION_ENGINE', (
+    'django.contrib.sessions.backends.cache' if os.getenv('REDIS_URL')
+    else 'django.contrib.sessions.backends.db'
+))
+
+# Seconds a user snapshot (id, username, flags) serves check-auth and
+# current-user; saving or deleting the user drops it sooner
+USER_SNAPSHOT_TTL = int(os.getenv('USER_SNAPSHOT_TTL', '60'))
+
+# Seconds a rendered comment-thread page stays cached (writes invalidate it sooner)
+THREAD_CACHE_TIMEOUT = int(os.getenv('THREAD_CACHE_TIMEOUT', '300'))
+
+# Seconds a ranked leaderboard snapshot is reused when no karma is written
+LEADERBOARD_SNAPSHOT_TTL = int(os.getenv('LEADERBOARD_SNAPSHOT_TTL', '60'))
+
+# Seconds between leaderboard.changed events, each of which makes every
+# connected client refetch the leaderboard (per worker process)
+LEADERBOARD_EVENT_INTERVAL = float(os.getenv('LEADERBOARD_EVENT_INTERVAL', '5'))
+
+# Hours over which a post's engagement counts for half as much in the
+# ?ordering=hot feed; run `manage.py refresh_hot_scores` after changing it
+FEED_HOT_HALF_LIFE_HOURS = float(os.getenv('FEED_HOT_HALF_LIFE_HOURS', '12'))
+
+# Copy new posts into followers' home timelines right after the post
+# commits; set to False when a `manage.py fan_out_timelines --loop`
+# worker does the fan-out instead
+FEED_FANOUT_INLINE = os.getenv('FEED_FANOUT_INLINE', 'True') == 'True'
+
+# Authors with at least this many followers are not fanned out: their
+# followers' timelines read their posts directly instead
+FEED_FANOUT_MAX_FOLLOWERS = int(os.getenv('FEED_FANOUT_MAX_FOLLOWERS', '10000'))
+
+# Recent posts copied into a timeline when its owner follows someone
+FEED_TIMELINE_BACKFILL = int(os.getenv('FEED_TIMELINE_BACKFILL', '100'))
+
+# Apply each like's karma event (and any pending ones for the same object)
+# right after it commits; set to False when a
+# `manage.py drain_karma_outbox --loop` worker applies karma instead
+KARMA_OUTBOX_INLINE = os.getenv('KARMA_OUTBOX_INLINE', 'True') == 'True'
+
+# Days of raw karma ledger kept; older days are folded into lifetime totals
+# by `manage.py prune_karma_ledger` (must exceed the 7-day leaderboard window)
+KARMA_LEDGER_RETENTION_DAYS = int(os.getenv('KARMA_LEDGER_RETENTION_DAYS', '30'))
+
+# Limits for /api/batch/: sub-requests per batch, and total cost (reads
+# cost 1, writes 3)
+BATCH_MAX_REQUESTS = int(os.getenv('BATCH_MAX_REQUESTS', '20'))
+BATCH_MAX_COST = int(os.getenv('BATCH_MAX_COST', '40'))
+
+# Live update stream (/api/events/): pub/sub backend, seconds between
+# keepalive comments, and distinct pending events per stream before it is
+# told to resync
+EVENT_BUS_BACKEND = os.getenv('EVENT_BUS_BACKEND', 'feed.events.LocalEventBus')
+EVENT_STREAM_KEEPALIVE = int(os.getenv('EVENT_STREAM_KEEPALIVE', '15'))
+EVENT_STREAM_MAX_PENDING = int(os.getenv('EVENT_STREAM_MAX_PENDING', '100'))
+
+# Request metrics (/api/metrics/): directory where each worker process
+# writes its totals so the endpoint can sum them (unset: this process
+# only), seconds between writes, and who may scrape (a bearer token,
+# comma-separated client networks; staff users always can)
+METRICS_DIR = os.getenv('METRICS_DIR', '')
+METRICS_FLUSH_INTERVAL = int(os.getenv('METRICS_FLUSH_INTERVAL', '5'))
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+METRICS_ALLOWED_NETWORKS = [net for net in os.getenv('METRICS_ALLOWED_NETWORKS', '').split(',') if net]
+
 # CORS settings
 CORS_ALLOWED_ORIGINS = os.getenv(
     'CORS_ALLOWED_ORIGINS',
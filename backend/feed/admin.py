@@ -1,13 +1,81 @@
 from django.contrib import admin
-from .models import Post, Comment, Like, KarmaTransaction
+from django.core.paginator import Paginator
+from django.db import connection
+from django.db.models import Q, QuerySet
+from django.utils.functional import cached_property
+from .models import Post, Comment, Like, PostLike, CommentLike, KarmaTransaction
+from .search import SearchUnavailable, search_ids
+
+# Unfiltered tables estimated above this many rows are not COUNT(*)ed
+ESTIMATED_COUNT_THRESHOLD = 100000
+
+# Most content matches an admin search returns, best first
+ADMIN_SEARCH_LIMIT = 1000
+
+
+def estimate_row_count(model):
+    """The planner's row estimate for a model's table, or None where there is none"""
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [model._meta.db_table])
+        row = cursor.fetchone()
+    # -1 means the table has never been analyzed
+    return row[0] if row and row[0] >= 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator that trusts the planner's estimate for large unfiltered tables.
+
+    An exact COUNT(*) over millions of rows is a full scan; the page links
+    only need the rough size. Filtered and small result sets are counted.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if isinstance(queryset, QuerySet) and not queryset.query.where:
+            estimate = estimate_row_count(queryset.model)
+            if estimate is not None and estimate >= ESTIMATED_COUNT_THRESHOLD:
+                return estimate
+        return super().count
+
+
+class ScalableAdmin(admin.ModelAdmin):
+    """Changelists that stay fast on large tables: no full-table COUNT(*)"""
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+class ContentSearchAdmin(ScalableAdmin):
+    """Search content through the full-text index instead of ILIKE '%term%' scans.
+
+    A search matches content via feed.search (the best ADMIN_SEARCH_LIMIT
+    hits) or the author's exact username; databases without the index fall
+    back to ``search_fields``. Also used by autocomplete widgets.
+    """
+    search_kind = None
+    search_fields = ['=author__username']
+
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        try:
+            ids = [pk for _kind, pk, _score in search_ids(term, (self.search_kind,), ADMIN_SEARCH_LIMIT)]
+        except SearchUnavailable:
+            return super().get_search_results(request, queryset, search_term)
+        return queryset.filter(Q(pk__in=ids) | Q(author__username=term)), False
 
 
 @admin.register(Post)
-class PostAdmin(admin.ModelAdmin):
+class PostAdmin(ContentSearchAdmin):
     list_display = ['id', 'author', 'content_preview', 'like_count', 'comment_count', 'created_at']
     list_filter = ['created_at']
-    search_fields = ['content', 'author__username']
-    readonly_fields = ['created_at', 'updated_at']
+    list_select_related = ['author']
+    autocomplete_fields = ['author']
+    readonly_fields = ['created_at', 'updated_at', 'like_count', 'comment_count']
+    search_kind = 'post'
 
     def content_preview(self, obj):
         return obj.content[:50] + '...' if len(obj.content) > 50 else obj.content
@@ -15,11 +83,25 @@ class PostAdmin(admin.ModelAdmin):
 
 
 @admin.register(Comment)
-class CommentAdmin(admin.ModelAdmin):
-    list_display = ['id', 'author', 'post', 'parent', 'content_preview', 'like_count', 'created_at']
-    list_filter = ['created_at', 'post']
-    search_fields = ['content', 'author__username']
-    readonly_fields = ['created_at', 'updated_at']
+class CommentAdmin(ContentSearchAdmin):
+    list_display = ['id', 'author', 'post_ref', 'parent_ref', 'content_preview', 'like_count', 'created_at']
+    list_filter = ['created_at']
+    list_select_related = ['author']
+    autocomplete_fields = ['author', 'post', 'parent']
+    readonly_fields = ['created_at', 'updated_at', 'path', 'depth', 'like_count', 'reply_count']
+    # Comment's default created_at ordering has no index of its own
+    ordering = ['-id']
+    search_kind = 'comment'
+
+    # Post and parent shown as raw ids: listing the related objects would
+    # load them (and their authors) row by row
+    def post_ref(self, obj):
+        return obj.post_id
+    post_ref.short_description = 'Post'
+
+    def parent_ref(self, obj):
+        return obj.parent_id
+    parent_ref.short_description = 'Parent'
 
     def content_preview(self, obj):
         return obj.content[:50] + '...' if len(obj.content) > 50 else obj.content
@@ -27,15 +109,48 @@ class CommentAdmin(admin.ModelAdmin):
 
 
 @admin.register(Like)
-class LikeAdmin(admin.ModelAdmin):
+class LikeAdmin(ScalableAdmin):
     list_display = ['id', 'user', 'content_type', 'object_id', 'created_at']
     list_filter = ['content_type', 'created_at']
-    search_fields = ['user__username']
+    list_select_related = ['user', 'content_type']
+    search_fields = ['=user__username']
+    autocomplete_fields = ['user']
+    ordering = ['-id']
+
+
+@admin.register(PostLike)
+class PostLikeAdmin(ScalableAdmin):
+    list_display = ['id', 'user', 'post_ref', 'created_at']
+    list_filter = ['created_at']
+    list_select_related = ['user']
+    search_fields = ['=user__username']
+    autocomplete_fields = ['user', 'post']
+    ordering = ['-id']
+
+    def post_ref(self, obj):
+        return obj.post_id
+    post_ref.short_description = 'Post'
+
+
+@admin.register(CommentLike)
+class CommentLikeAdmin(ScalableAdmin):
+    list_display = ['id', 'user', 'comment_ref', 'created_at']
+    list_filter = ['created_at']
+    list_select_related = ['user']
+    search_fields = ['=user__username']
+    autocomplete_fields = ['user', 'comment']
+    ordering = ['-id']
+
+    def comment_ref(self, obj):
+        return obj.comment_id
+    comment_ref.short_description = 'Comment'
 
 
 @admin.register(KarmaTransaction)
-class KarmaTransactionAdmin(admin.ModelAdmin):
+class KarmaTransactionAdmin(ScalableAdmin):
     list_display = ['id', 'user', 'amount', 'content_type', 'object_id', 'created_at']
     list_filter = ['created_at', 'content_type']
-    search_fields = ['user__username']
+    list_select_related = ['user', 'content_type']
+    search_fields = ['=user__username']
+    autocomplete_fields = ['user']
     readonly_fields = ['created_at']
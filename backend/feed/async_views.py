@@ -0,0 +1,135 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.http import Http404
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.response import Response
+from .models import Post, PostLike
+from .conditional import not_modified_response, set_validators
+from .leaderboard import DEFAULT_WINDOW, WINDOWS as LEADERBOARD_WINDOWS, get_leaderboard
+from .serializers import PostListSerializer
+from .views import PostViewSet, LeaderboardViewSet
+
+# Requests served natively; anything else goes to the sync viewset
+READ_METHODS = ('GET', 'HEAD')
+
+_post_list_sync = PostViewSet.as_view({'get': 'list', 'post': 'create'})
+_post_detail_sync = PostViewSet.as_view({
+    'get': 'retrieve', 'put': 'update', 'patch': 'partial_update', 'delete': 'destroy'
+})
+_leaderboard_sync = LeaderboardViewSet.as_view({'get': 'list'})
+
+
+def _viewset(viewset_class, request, action, **kwargs):
+    """A viewset instance set up as DRF's dispatch would, minus the handler call"""
+    view = viewset_class(action_map={'get': action, 'head': action}, args=(), kwargs=kwargs)
+    view.format_kwarg = None
+    view.request = view.initialize_request(request, **kwargs)
+    view.headers = view.default_response_headers
+    return view
+
+
+async def _dispatch(view, handler, *lookups):
+    """Async counterpart of APIView.dispatch.
+
+    DRF's initial() (authentication, permissions, throttling, content
+    negotiation) runs in a worker thread alongside ``lookups``, awaitables
+    that do not depend on the user; their results are passed to handler.
+    Exceptions get the viewset's usual error responses.
+    """
+    try:
+        results = await asyncio.gather(sync_to_async(view.initial)(view.request), *lookups)
+        response = await handler(view, *results[1:])
+    except Exception as exc:
+        response = view.handle_exception(exc)
+    return view.finalize_response(view.request, response)
+
+
+@csrf_exempt
+async def post_list(request):
+    """Async PostViewSet.list for the keyset-paginated feed"""
+    if request.method not in READ_METHODS or 'page' in request.GET:
+        return await sync_to_async(_post_list_sync)(request)
+
+    async def handler(view):
+        request = view.request
+        error = view._ordering_error()
+        if error is not None:
+            return error
+        paginator = view.paginator
+        posts = await paginator.apaginate_queryset(view.filter_queryset(view.get_queryset()), request)
+
+        etag, last_modified = view._list_validators(request, posts)
+        not_modified = not_modified_response(request, etag, last_modified)
+        if not_modified is not None:
+            return not_modified
+
+        context = view.get_serializer_context()
+        context['liked_post_ids'] = await PostLike.aget_liked_ids(request.user, [post.id for post in posts])
+        data = PostListSerializer(posts, many=True, context=context).data
+        return set_validators(Response(paginator.get_paginated_data(data)), etag, last_modified)
+
+    return await _dispatch(_viewset(PostViewSet, request, 'list'), handler)
+
+
+@csrf_exempt
+async def post_detail(request, pk):
+    """Async PostViewSet.retrieve"""
+    if request.method not in READ_METHODS:
+        return await sync_to_async(_post_detail_sync)(request, pk=pk)
+
+    async def handler(view):
+        request = view.request
+        instance = await view.get_queryset().filter(pk=pk).afirst()
+        if instance is None:
+            raise Http404(f'No {Post._meta.object_name} matches the given query.')
+        view.check_object_permissions(request, instance)
+
+        etag = view._detail_etag(request, instance)
+        not_modified = not_modified_response(request, etag, instance.updated_at)
+        if not_modified is not None:
+            return not_modified
+
+        # The comment thread and the viewer's like on the post are independent
+        (tree, next_url), liked_post_ids = await asyncio.gather(
+            sync_to_async(view._render_thread)(request, instance),
+            PostLike.aget_liked_ids(request.user, [instance.id]),
+        )
+        instance._comment_tree, instance._comments_next = tree, next_url
+
+        context = view.get_serializer_context()
+        context['liked_post_ids'] = liked_post_ids
+        serializer = view.get_serializer_class()(instance, context=context)
+        return set_validators(Response(serializer.data), etag, instance.updated_at)
+
+    return await _dispatch(_viewset(PostViewSet, request, 'retrieve', pk=pk), handler)
+
+
+@csrf_exempt
+async def leaderboard(request):
+    """Async LeaderboardViewSet.list; the ranking is built while the viewer is authenticated"""
+    if request.method not in READ_METHODS:
+        return await sync_to_async(_leaderboard_sync)(request)
+
+    window = request.GET.get('window', DEFAULT_WINDOW)
+    lookups = [sync_to_async(get_leaderboard)(window)] if window in LEADERBOARD_WINDOWS else []
+
+    async def handler(view, ranked=None):
+        request = view.request
+        if ranked is None:
+            return view._window_error(window)
+        offset, limit = view._page_params(request)
+        entries = ranked.page(offset, limit)
+        me = ranked.lookup(request.user.id) if request.user.is_authenticated else None
+
+        etag = view._etag(request, ranked, entries, me)
+        not_modified = not_modified_response(request, etag)
+        if not_modified is not None:
+            return not_modified
+
+        users = await User.objects.ain_bulk(view._user_ids(entries, me))
+        data = view._response_data(request, window, offset, limit, ranked, entries, me, users)
+        return set_validators(Response(data), etag)
+
+    return await _dispatch(_viewset(LeaderboardViewSet, request, 'list'), handler, *lookups)
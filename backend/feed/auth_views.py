@@ -1,10 +1,11 @@
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, authentication_classes, permission_classes
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
 from django.contrib.auth import authenticate, login, logout
 from django.views.decorators.csrf import csrf_exempt
 from .serializers import UserSerializer
+from .user_cache import SnapshotSessionAuthentication
 
 
 @csrf_exempt
@@ -60,18 +61,20 @@ def login_view(request):
 
 
 @api_view(['GET'])
+@authentication_classes([SnapshotSessionAuthentication])
 @permission_classes([IsAuthenticated])
 def current_user(request):
-    """Get current authenticated user"""
+    """Get current authenticated user (from the cached snapshot, no User query)"""
     return Response({
         'user': UserSerializer(request.user).data
     })
 
 
 @api_view(['GET'])
+@authentication_classes([SnapshotSessionAuthentication])
 @permission_classes([AllowAny])
 def check_auth(request):
-    """Check if user is authenticated"""
+    """Check if user is authenticated (from the cached snapshot, no User query)"""
     if request.user.is_authenticated:
         return Response({
             'authenticated': True,
@@ -0,0 +1,151 @@
+import json
+from io import BytesIO
+
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import transaction
+from django.urls import Resolver404, resolve
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+from .invalidation import atomic_with_cache_rollback
+
+# Relative cost of one sub-request, checked against BATCH_MAX_COST
+METHOD_COSTS = {'GET': 1, 'HEAD': 1, 'POST': 3, 'PUT': 3, 'PATCH': 3, 'DELETE': 3}
+
+# Response headers passed back for each sub-request
+FORWARDED_HEADERS = ('ETag', 'Last-Modified', 'Location')
+
+
+def _error(message):
+    return Response({'error': message}, status=status.HTTP_400_BAD_REQUEST)
+
+
+def _validate(items):
+    """Return an error message for a malformed or over-limit batch, else None"""
+    if not isinstance(items, list) or not items:
+        return 'requests must be a non-empty list'
+    max_requests = getattr(settings, 'BATCH_MAX_REQUESTS', 20)
+    if len(items) > max_requests:
+        return f'A batch may contain at most {max_requests} requests'
+    for item in items:
+        if not isinstance(item, dict):
+            return 'Each request must be an object'
+        if str(item.get('method', 'GET')).upper() not in METHOD_COSTS:
+            return f"Unsupported method: {item.get('method')}"
+        if not isinstance(item.get('path'), str) or not item['path'].startswith('/api/'):
+            return 'Each request needs a path under /api/'
+        if not isinstance(item.get('headers', {}), dict):
+            return 'headers must be an object'
+    max_cost = getattr(settings, 'BATCH_MAX_COST', 40)
+    cost = sum(METHOD_COSTS[str(item.get('method', 'GET')).upper()] for item in items)
+    if cost > max_cost:
+        return f'Batch cost {cost} exceeds the limit of {max_cost}'
+    return None
+
+
+def _build_subrequest(request, method, path, body, headers):
+    """A WSGIRequest for one sub-request, sharing the batch request's identity.
+
+    The authenticated user and session are carried over rather than
+    re-resolved, and CSRF is not checked again: the batch request itself
+    already passed it.
+    """
+    path, _, query_string = path.partition('?')
+    payload = json.dumps(body).encode('utf-8') if body is not None else b''
+    environ = {
+        key: value for key, value in request.META.items()
+        if not key.startswith('HTTP_IF_') and key not in ('CONTENT_LENGTH', 'CONTENT_TYPE')
+    }
+    environ.update({
+        'REQUEST_METHOD': method,
+        'PATH_INFO': path,
+        'SCRIPT_NAME': '',
+        'QUERY_STRING': query_string,
+        'CONTENT_TYPE': 'application/json',
+        'CONTENT_LENGTH': str(len(payload)),
+        'wsgi.input': BytesIO(payload),
+    })
+    for name, value in headers.items():
+        environ['HTTP_' + name.upper().replace('-', '_')] = str(value)
+
+    subrequest = WSGIRequest(environ)
+    subrequest.user = request.user
+    subrequest.session = getattr(request._request, 'session', None)
+    subrequest._dont_enforce_csrf_checks = True
+    return subrequest
+
+
+def _body(response):
+    """A sub-response's body: DRF data, else the decoded content of a plain
+    Django response (parsed when it is JSON); None for an empty or
+    streaming body"""
+    if hasattr(response, 'data'):
+        return response.data
+    if response.streaming or not response.content:
+        return None
+    content = response.content.decode(response.charset)
+    if response.get('Content-Type', '').startswith('application/json'):
+        return json.loads(content)
+    return content
+
+
+def _run(request, item):
+    """Dispatch one sub-request to its feed view and return its result entry"""
+    method = str(item.get('method', 'GET')).upper()
+    path = item['path']
+    try:
+        match = resolve(path.partition('?')[0], urlconf='feed.urls')
+    except Resolver404:
+        return {'status': status.HTTP_404_NOT_FOUND, 'headers': {}, 'body': {'error': 'Not found'}}
+    if match.url_name == 'batch':
+        return {'status': status.HTTP_400_BAD_REQUEST, 'headers': {}, 'body': {'error': 'Batches cannot be nested'}}
+
+    subrequest = _build_subrequest(request, method, path, item.get('body'), item.get('headers', {}))
+    view = match.func
+    if iscoroutinefunction(view):
+        # Async read views hop back onto this thread for their ORM work, so
+        # they still share the batch's connection and transaction.
+        view = async_to_sync(view)
+    response = view(subrequest, *match.args, **match.kwargs)
+    return {
+        'status': response.status_code,
+        'headers': {name: response[name] for name in FORWARDED_HEADERS if response.has_header(name)},
+        'body': _body(response),
+    }
+
+
+@api_view(['POST'])
+@permission_classes([AllowAny])
+def batch_view(request):
+    """Run several API requests in one round trip.
+
+    Body: ``{"requests": [{"method", "path", "body"?, "headers"?}, ...],
+    "atomic": false}``. Sub-requests run in order as the batch's user, on
+    the same database connection, and each view enforces its own
+    permissions. With ``atomic`` they share one transaction that is rolled
+    back, skipping the rest, as soon as one returns a 4xx/5xx status; the
+    cache entries the rolled-back writes invalidated are invalidated again.
+    """
+    items = request.data.get('requests')
+    error = _validate(items)
+    if error:
+        return _error(error)
+
+    if not request.data.get('atomic'):
+        return Response({'results': [_run(request, item) for item in items], 'rolled_back': False})
+
+    results = []
+    rolled_back = False
+    # Later sub-requests may cache what earlier ones wrote
+    with atomic_with_cache_rollback():
+        for item in items:
+            result = _run(request, item)
+            results.append(result)
+            if result['status'] >= 400:
+                transaction.set_rollback(True)
+                rolled_back = True
+                break
+    return Response({'results': results, 'rolled_back': rolled_back})
@@ -0,0 +1,33 @@
+import hashlib
+
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+
+def make_etag(request, *parts):
+    """Strong ETag over the validator parts, the viewer and the query string.
+
+    The viewer is part of the tag because responses carry per-user fields
+    such as is_liked.
+    """
+    user_id = request.user.id if request.user.is_authenticated else 0
+    raw = repr((user_id, request.get_full_path()) + parts)
+    return '"%s"' % hashlib.md5(raw.encode('utf-8')).hexdigest()
+
+
+def not_modified_response(request, etag, last_modified=None):
+    """Return a 304 if the request's If-None-Match / If-Modified-Since match, else None"""
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if response is not None:
+        set_validators(response, etag, last_modified)
+    return response
+
+
+def set_validators(response, etag, last_modified=None):
+    """Attach ETag / Last-Modified and require revalidation on every use"""
+    response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
@@ -0,0 +1,87 @@
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from .models import Post, Comment, PostLike, CommentLike
+from .events import publish_on_commit
+from .ranking import hot_score_change, refresh_hot_scores
+
+
+def adjust_like_count(model, pk, delta):
+    """Apply a +1/-1 like delta to a Post or Comment row in place.
+
+    updated_at is bumped too, since it doubles as the row's HTTP validator,
+    a post is rescored for the hot feed, and live streams get the delta
+    once the transaction commits.
+    """
+    rows = model.objects.filter(pk=pk)
+    if delta < 0:
+        # Never drive the counter below zero if it has drifted
+        rows = rows.filter(like_count__gt=0)
+    updates = {'like_count': F('like_count') + delta, 'updated_at': timezone.now()}
+    if model is Post:
+        updates['hot_score'] = hot_score_change(like_delta=delta)
+    if rows.update(**updates):
+        publish_on_commit(f'{model._meta.model_name}.counters', id=pk, like_count_delta=delta)
+
+
+def touch_post(post_id):
+    """Mark a post as changed when something inside its thread changes"""
+    Post.objects.filter(pk=post_id).update(updated_at=timezone.now())
+
+
+def record_new_comment(comment):
+    """Bump the post's comment_count (and hot_score) and the parent's reply_count"""
+    now = timezone.now()
+    Post.objects.filter(pk=comment.post_id).update(
+        comment_count=F('comment_count') + 1, hot_score=hot_score_change(comment_delta=1), updated_at=now
+    )
+    publish_on_commit('post.counters', id=comment.post_id, comment_count_delta=1)
+    if comment.parent_id:
+        Comment.objects.filter(pk=comment.parent_id).update(reply_count=F('reply_count') + 1, updated_at=now)
+        publish_on_commit('comment.counters', id=comment.parent_id, reply_count_delta=1)
+
+
+def _count_subquery(queryset, group_field):
+    """Correlated COUNT(*) subquery, coalesced to 0 for rows with no matches"""
+    counts = queryset.filter(**{group_field: OuterRef('pk')}).order_by().values(
+        group_field
+    ).annotate(total=Count('pk')).values('total')
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+def rebuild_counters(batch_size=5000):
+    """Recompute every denormalized counter from the source tables.
+
+    Works through each table in primary-key ranges so that a single
+    UPDATE never locks more than ``batch_size`` rows, then rescores posts
+    for the hot feed. Returns the number of posts and comments processed.
+    """
+    plans = [
+        (Post, {
+            'like_count': _count_subquery(PostLike.objects.all(), 'post'),
+            'comment_count': _count_subquery(Comment.objects.all(), 'post'),
+        }),
+        (Comment, {
+            'like_count': _count_subquery(CommentLike.objects.all(), 'comment'),
+            'reply_count': _count_subquery(Comment.objects.all(), 'parent'),
+        }),
+    ]
+
+    totals = {}
+    for model, updates in plans:
+        processed = 0
+        last_pk = 0
+        while True:
+            pks = list(
+                model.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:batch_size]
+            )
+            if not pks:
+                break
+            with transaction.atomic():
+                model.objects.filter(pk__gte=pks[0], pk__lte=pks[-1]).update(**updates)
+            processed += len(pks)
+            last_pk = pks[-1]
+        totals[model.__name__] = processed
+    refresh_hot_scores(batch_size)
+    return totals
@@ -0,0 +1,40 @@
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from .events import TOPICS, format_sse, get_bus
+
+
+async def event_stream(request):
+    """Server-Sent Events stream of feed changes.
+
+    ``?topics=posts,comments,leaderboard`` (default: posts,leaderboard)
+    selects what to receive: ``post.created``, ``post.counters``,
+    ``comment.counters`` (counter deltas) and ``leaderboard.changed``. A
+    ``resync`` event means updates were dropped and the client should
+    refetch. Needs an ASGI server; each open stream is one coroutine.
+    """
+    if not isinstance(request, ASGIRequest):
+        # WSGI would buffer the endless stream; a 503 makes EventSource give up
+        return JsonResponse({'error': 'Live updates require an ASGI server'}, status=503)
+    requested = request.GET.get('topics', 'posts,leaderboard').split(',')
+    topics = {topic.strip() for topic in requested} & set(TOPICS.values())
+    subscription = get_bus().subscribe(topics)
+    keepalive = getattr(settings, 'EVENT_STREAM_KEEPALIVE', 15)
+
+    async def stream():
+        try:
+            yield 'retry: 3000\n\n'
+            while True:
+                events = await subscription.get(timeout=keepalive)
+                if not events:
+                    # Comment line; keeps proxies from closing an idle stream
+                    yield ': keepalive\n\n'
+                for event in events:
+                    yield format_sse(event)
+        finally:
+            subscription.close()
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,193 @@
+import asyncio
+import json
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+# Event type prefix -> subscription topic
+TOPICS = {
+    'post': 'posts',
+    'comment': 'comments',
+    'leaderboard': 'leaderboard',
+}
+
+# Numeric fields that are summed, not replaced, when events are coalesced
+DELTA_FIELDS = ('like_count_delta', 'comment_count_delta', 'reply_count_delta')
+
+
+def _merge(previous, event):
+    """Fold a newer event for the same key into the pending one"""
+    merged = dict(event)
+    for field in DELTA_FIELDS:
+        if field in previous or field in event:
+            merged[field] = previous.get(field, 0) + event.get(field, 0)
+    return merged
+
+
+class Subscription:
+    """One stream's pending events, bounded and coalesced.
+
+    Events with the same (type, id) collapse into one, summing counter
+    deltas, so a hot post costs one pending entry however often it changes.
+    If more than ``max_pending`` distinct keys pile up the buffer is
+    dropped and the reader gets a single ``resync`` event instead. An idle
+    subscription is just this object and an unset asyncio.Event.
+    """
+
+    def __init__(self, bus, topics, loop, max_pending):
+        self.bus = bus
+        self.topics = topics
+        self.loop = loop
+        self.max_pending = max_pending
+        self._pending = OrderedDict()
+        self._overflowed = False
+        self._ready = asyncio.Event()
+
+    def deliver(self, event):
+        """Queue an event; must run on the subscription's event loop"""
+        if self._overflowed:
+            return
+        key = (event['type'], event.get('id'))
+        if key in self._pending:
+            self._pending[key] = _merge(self._pending[key], event)
+        elif len(self._pending) >= self.max_pending:
+            self._pending.clear()
+            self._overflowed = True
+        else:
+            self._pending[key] = event
+        self._ready.set()
+
+    async def get(self, timeout=None):
+        """Wait for pending events and take them all; [] on timeout"""
+        if not self._pending and not self._overflowed:
+            self._ready.clear()
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                return []
+        if self._overflowed:
+            self._overflowed = False
+            self._pending.clear()
+            return [{'type': 'resync'}]
+        events = list(self._pending.values())
+        self._pending.clear()
+        return events
+
+    def close(self):
+        self.bus.unsubscribe(self)
+
+
+class LocalEventBus:
+    """In-process pub/sub: events reach subscribers in this process only.
+
+    publish() may be called from any thread (sync views run in a worker
+    thread under ASGI); delivery is handed to each subscriber's event loop.
+    A shared backend (e.g. Redis pub/sub) would subclass this and call
+    _dispatch() for messages received from other processes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_topic = {topic: set() for topic in TOPICS.values()}
+
+    def subscribe(self, topics, max_pending=None):
+        if max_pending is None:
+            max_pending = getattr(settings, 'EVENT_STREAM_MAX_PENDING', 100)
+        topics = set(topics) & set(self._by_topic)
+        subscription = Subscription(self, topics, asyncio.get_running_loop(), max_pending)
+        with self._lock:
+            for topic in topics:
+                self._by_topic[topic].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for topic in subscription.topics:
+                self._by_topic[topic].discard(subscription)
+
+    def subscriber_count(self):
+        with self._lock:
+            return len(set().union(*self._by_topic.values()))
+
+    def publish(self, event):
+        self._dispatch(event)
+
+    def _dispatch(self, event):
+        topic = TOPICS.get(event['type'].split('.', 1)[0])
+        with self._lock:
+            subscriptions = list(self._by_topic.get(topic, ()))
+        # One thread-safe handoff per event loop, not per subscriber
+        by_loop = defaultdict(list)
+        for subscription in subscriptions:
+            by_loop[subscription.loop].append(subscription)
+        for loop, group in by_loop.items():
+            try:
+                loop.call_soon_threadsafe(_deliver_all, group, event)
+            except RuntimeError:
+                # The loop has shut down without closing its streams
+                for subscription in group:
+                    self.unsubscribe(subscription)
+
+
+def _deliver_all(subscriptions, event):
+    for subscription in subscriptions:
+        subscription.deliver(event)
+
+
+_bus = None
+
+
+def get_bus():
+    """The process-wide bus, built from settings.EVENT_BUS_BACKEND"""
+    global _bus
+    if _bus is None:
+        _bus = import_string(getattr(settings, 'EVENT_BUS_BACKEND', 'feed.events.LocalEventBus'))()
+    return _bus
+
+
+def publish_on_commit(event_type, **data):
+    """Publish an event once the current transaction commits (now, outside one)"""
+    event = {'type': event_type, **data}
+    transaction.on_commit(lambda: get_bus().publish(event))
+
+
+_throttle_lock = threading.Lock()
+_last_published = {}  # event type -> time.monotonic() of its last publish
+_trailing = set()  # event types with a publish scheduled for the end of the interval
+
+
+def _publish_trailing(event_type):
+    with _throttle_lock:
+        _trailing.discard(event_type)
+        _last_published[event_type] = time.monotonic()
+    get_bus().publish({'type': event_type})
+
+
+def publish_throttled(event_type, interval):
+    """Publish a data-less event at most once per ``interval`` seconds in this process.
+
+    For events that make every reader refetch: a burst of writes costs
+    each reader one fetch per interval instead of one per write. A change
+    inside the interval is announced once, at its end.
+    """
+    with _throttle_lock:
+        now = time.monotonic()
+        last = _last_published.get(event_type)
+        if last is not None and now - last < interval:
+            if event_type not in _trailing:
+                _trailing.add(event_type)
+                timer = threading.Timer(last + interval - now, _publish_trailing, [event_type])
+                timer.daemon = True
+                timer.start()
+            return
+        _last_published[event_type] = now
+    get_bus().publish({'type': event_type})
+
+
+def format_sse(event):
+    """Encode an event as a Server-Sent Events frame"""
+    return f"event: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
@@ -0,0 +1,49 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import transaction
+
+# Invalidations run inside atomic_with_cache_rollback(), to replay if it
+# rolls back; context variables follow sync_to_async like the metrics do
+_pending = ContextVar('feed_pending_invalidations', default=None)
+
+
+def invalidate(func):
+    """Run a cache invalidation now and again on commit.
+
+    Running it now stops a reader from caching pre-commit data under the
+    old version; running it on commit drops whatever was read between the
+    write and the commit. Inside atomic_with_cache_rollback() it also runs
+    again if the block rolls back, so entries cached from the discarded
+    writes are never served.
+    """
+    func()
+    transaction.on_commit(func)
+    pending = _pending.get()
+    if pending is not None:
+        pending.append(func)
+
+
+@contextmanager
+def atomic_with_cache_rollback():
+    """transaction.atomic() for blocks that read back their own writes.
+
+    A read inside the block can cache rows that a rollback then discards;
+    every invalidation made in the block is replayed after a rollback
+    (set_rollback() or an exception), orphaning those entries.
+    """
+    parent = _pending.get()
+    pending = []
+    token = _pending.set(pending)
+    committed = False
+    try:
+        with transaction.atomic():
+            yield
+            committed = not transaction.get_rollback()
+    finally:
+        _pending.reset(token)
+        if not committed:
+            for func in pending:
+                func()
+        elif parent is not None:
+            parent.extend(pending)
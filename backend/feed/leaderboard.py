@@ -0,0 +1,125 @@
+import bisect
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from .models import KarmaTransaction
+from .events import publish_throttled
+from .invalidation import invalidate
+from .metrics import record_cache
+
+# Supported leaderboard windows; None means all-time
+WINDOWS = {
+    '1h': timedelta(hours=1),
+    '24h': timedelta(hours=24),
+    '7d': timedelta(days=7),
+    'all': None,
+}
+DEFAULT_WINDOW = '24h'
+
+VERSION_CACHE_KEY = 'leaderboard:version'
+
+# Per-process ranked snapshots, keyed by window name
+_snapshots = {}
+
+
+def _bump_version():
+    try:
+        cache.incr(VERSION_CACHE_KEY)
+    except ValueError:
+        cache.add(VERSION_CACHE_KEY, time.time_ns(), timeout=None)
+
+
+def get_version():
+    """Current leaderboard data version (shared across workers with a shared cache backend).
+
+    Seeded with a timestamp, as thread versions are, so an evicted version
+    key cannot come back equal to the version of a stale snapshot.
+    """
+    version = cache.get(VERSION_CACHE_KEY)
+    if version is None:
+        cache.add(VERSION_CACHE_KEY, time.time_ns(), timeout=None)
+        version = cache.get(VERSION_CACHE_KEY, 0)
+    return version
+
+
+def invalidate_leaderboards():
+    """Mark every ranked snapshot stale after a karma write.
+
+    Bumped immediately and again on commit, so a reader that rebuilds
+    between the write and the commit cannot pin pre-commit totals. The
+    leaderboard.changed event that makes clients refetch is throttled to
+    one per LEADERBOARD_EVENT_INTERVAL seconds.
+    """
+    invalidate(_bump_version)
+    interval = getattr(settings, 'LEADERBOARD_EVENT_INTERVAL', 5)
+    transaction.on_commit(lambda: publish_throttled('leaderboard.changed', interval))
+
+
+class RankedLeaderboard:
+    """Users sorted by karma with dense ranks and O(1) rank lookup by user"""
+
+    def __init__(self, totals, version):
+        self.version = version
+        self.built_at = time.monotonic()
+        self.entries = sorted(totals.items(), key=lambda item: (-item[1], item[0]))
+        # Distinct scores in descending order; a score's dense rank is its index + 1
+        self._scores = sorted(set(totals.values()))
+        self._positions = {user_id: index for index, (user_id, _) in enumerate(self.entries)}
+        self._tie_sizes = {}
+        for score in totals.values():
+            self._tie_sizes[score] = self._tie_sizes.get(score, 0) + 1
+
+    def __len__(self):
+        return len(self.entries)
+
+    def dense_rank(self, karma):
+        return len(self._scores) - bisect.bisect_left(self._scores, karma)
+
+    def _entry(self, user_id, karma):
+        return {
+            'user_id': user_id,
+            'total_karma': karma,
+            'rank': self.dense_rank(karma),
+            'tied': self._tie_sizes[karma] > 1,
+        }
+
+    def page(self, offset, limit):
+        """Ranked entries in [offset, offset + limit)"""
+        return [self._entry(user_id, karma) for user_id, karma in self.entries[offset:offset + limit]]
+
+    def lookup(self, user_id):
+        """The entry for user_id, or None if the user has no karma in the window"""
+        index = self._positions.get(user_id)
+        if index is None:
+            return None
+        return self._entry(*self.entries[index])
+
+
+def get_leaderboard(window=DEFAULT_WINDOW):
+    """Return the ranked snapshot for a window, rebuilding it if stale.
+
+    A snapshot is reused until a karma write bumps the shared version or it
+    is older than LEADERBOARD_SNAPSHOT_TTL seconds (the window edge moves
+    with time even when nothing is written).
+    """
+    ttl = getattr(settings, 'LEADERBOARD_SNAPSHOT_TTL', 60)
+    version = get_version()
+    snapshot = _snapshots.get(window)
+    fresh = (
+        snapshot is not None
+        and snapshot.version == version
+        and time.monotonic() - snapshot.built_at < ttl
+    )
+    record_cache('leaderboard', fresh)
+    if fresh:
+        return snapshot
+
+    span = WINDOWS[window]
+    cutoff_time = timezone.now() - span if span is not None else None
+    snapshot = RankedLeaderboard(KarmaTransaction.get_karma_by_user_since(cutoff_time), version)
+    _snapshots[window] = snapshot
+    return snapshot
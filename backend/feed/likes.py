@@ -0,0 +1,138 @@
+from datetime import timezone as dt_timezone
+
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from .models import Post, Comment, Like, PostLike, CommentLike, KarmaOutboxEvent
+from .counters import adjust_like_count, touch_post
+from .outbox import enqueue_karma
+
+# Karma awarded to the author per like
+LIKE_KARMA = {Post: 5, Comment: 1}
+
+# Typed like table for each likeable model
+LIKE_MODELS = {Post: PostLike, Comment: CommentLike}
+
+
+def _can_return_rows():
+    """Whether INSERT ... ON CONFLICT DO NOTHING / DELETE ... RETURNING are available"""
+    return connection.vendor in ('postgresql', 'sqlite') and connection.features.can_return_columns_from_insert
+
+
+def _like_columns(like_model):
+    qn = connection.ops.quote_name
+    user_column = qn(like_model._meta.get_field('user').column)
+    target_column = qn(like_model._meta.get_field(like_model.target_field).column)
+    return qn(like_model._meta.db_table), user_column, target_column, qn(like_model._meta.pk.column)
+
+
+def add_like(like_model, user_id, target_id):
+    """Insert a like unless it exists; returns the new like's id, or None.
+
+    On PostgreSQL (and SQLite 3.35+) this is one conflict-tolerant statement
+    that never raises on a concurrent duplicate. Elsewhere it falls back to
+    get_or_create inside a savepoint.
+    """
+    if _can_return_rows():
+        table, user_column, target_column, pk_column = _like_columns(like_model)
+        created_at = connection.ops.quote_name(like_model._meta.get_field('created_at').column)
+        sql = (
+            f'INSERT INTO {table} ({user_column}, {target_column}, {created_at}) VALUES (%s, %s, %s) '
+            f'ON CONFLICT ({user_column}, {target_column}) DO NOTHING RETURNING {pk_column}'
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [user_id, target_id, connection.ops.adapt_datetimefield_value(timezone.now())])
+            row = cursor.fetchone()
+        return row[0] if row else None
+
+    with transaction.atomic():
+        like, created = like_model.objects.get_or_create(
+            user_id=user_id, **{f'{like_model.target_field}_id': target_id}
+        )
+    return like.id if created else None
+
+
+def _returned_datetime(value):
+    """A datetime read back by raw SQL; SQLite returns the stored text"""
+    if isinstance(value, str):
+        value = parse_datetime(value)
+    if timezone.is_naive(value):
+        value = timezone.make_aware(value, dt_timezone.utc)
+    return value
+
+
+def remove_like(like_model, user_id, target_id):
+    """Delete a like if it exists; returns the removed like's (id, created_at), or None.
+
+    A single DELETE ... RETURNING where supported, otherwise a keyed lookup
+    followed by a delete by primary key. A like copied from the legacy
+    table takes its generic Like row with it (see remove_legacy_like).
+    """
+    if _can_return_rows():
+        table, user_column, target_column, pk_column = _like_columns(like_model)
+        qn = connection.ops.quote_name
+        created_at = qn(like_model._meta.get_field('created_at').column)
+        from_legacy = qn(like_model._meta.get_field('from_legacy').column)
+        sql = (
+            f'DELETE FROM {table} WHERE {user_column} = %s AND {target_column} = %s '
+            f'RETURNING {pk_column}, {created_at}, {from_legacy}'
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [user_id, target_id])
+            row = cursor.fetchone()
+        removed = (row[0], _returned_datetime(row[1]), bool(row[2])) if row else None
+    else:
+        rows = like_model.objects.filter(user_id=user_id, **{f'{like_model.target_field}_id': target_id})
+        removed = rows.values_list('id', 'created_at', 'from_legacy').first()
+        if removed is not None:
+            like_model.objects.filter(pk=removed[0]).delete()
+
+    if removed is None:
+        return None
+    if removed[2]:
+        remove_legacy_like(like_model, user_id, target_id)
+    return removed[:2]
+
+
+def remove_legacy_like(like_model, user_id, target_id):
+    """Delete the generic Like row a removed from_legacy like was copied from.
+
+    Otherwise the next copy_legacy_likes run would find the legacy row
+    without a typed like and copy the unliked like back.
+    """
+    target_model = like_model._meta.get_field(like_model.target_field).related_model
+    Like.objects.filter(
+        user_id=user_id, content_type=ContentType.objects.get_for_model(target_model), object_id=target_id
+    ).delete()
+
+
+def set_like(user, model, pk, liked):
+    """Idempotently make user's like on a Post or Comment present or absent.
+
+    Returns whether the state changed; counters, karma and cache
+    invalidation only run when it did, so retries are harmless. Raises
+    model.DoesNotExist for an unknown pk.
+    """
+    columns = ('author_id', 'post_id') if model is Comment else ('author_id',)
+    target = model.objects.filter(pk=pk).values_list(*columns).first()
+    if target is None:
+        raise model.DoesNotExist
+    like_model = LIKE_MODELS[model]
+
+    with transaction.atomic():
+        like_created_at = None
+        if liked:
+            like_id = add_like(like_model, user.id, pk)
+        else:
+            like_id, like_created_at = remove_like(like_model, user.id, pk) or (None, None)
+        if like_id is not None:
+            adjust_like_count(model, pk, 1 if liked else -1)
+            kind = KarmaOutboxEvent.LIKE if liked else KarmaOutboxEvent.UNLIKE
+            content_type = ContentType.objects.get_for_model(model)
+            enqueue_karma(
+                kind, target[0], LIKE_KARMA[model], content_type, pk, like_id=like_id, like_created_at=like_created_at
+            )
+            if model is Comment:
+                touch_post(target[1])
+    return like_id is not None
@@ -0,0 +1,135 @@
+import json
+import os
+import socket
+import subprocess
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from feed.models import Post
+
+# Each server gets the same number of worker processes
+SERVERS = {
+    'wsgi': ['gunicorn', 'community_feed.wsgi:application', '--workers', '{workers}', '--bind', '127.0.0.1:{port}'],
+    'asgi': ['uvicorn', 'community_feed.asgi:application', '--workers', '{workers}', '--port', '{port}',
+             '--log-level', 'warning'],
+}
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare feed, post detail and leaderboard read latency under gunicorn '
+        '(wsgi.py) and uvicorn (asgi.py) at the same worker count. Both servers '
+        'use the configured database; benchmark users and posts are deleted afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=32, help='Concurrent clients (default: 32)')
+        parser.add_argument('--requests', type=int, default=20, help='Requests per client (default: 20)')
+        parser.add_argument('--workers', type=int, default=2, help='Server worker processes (default: 2)')
+        parser.add_argument('--servers', default='wsgi,asgi', help='Comma-separated servers to run (default: both)')
+        parser.add_argument('--json', action='store_true', help='Print results as JSON')
+
+    def _seed(self):
+        stamp = f'{time.time_ns()}'
+        author = User.objects.create(username=f'bench_read_author_{stamp}')
+        posts = Post.objects.bulk_create([
+            Post(author=author, content=f'Read benchmark {i}') for i in range(20)
+        ])
+        return author, posts
+
+    def _start(self, name, workers):
+        port = _free_port()
+        command = [part.format(workers=workers, port=port) for part in SERVERS[name]]
+        try:
+            process = subprocess.Popen(
+                command, cwd=settings.BASE_DIR, env=os.environ.copy(),
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            )
+        except FileNotFoundError:
+            raise CommandError(f'{command[0]} is not installed')
+        base_url = f'http://127.0.0.1:{port}'
+        deadline = time.monotonic() + 20
+        while time.monotonic() < deadline:
+            try:
+                urllib.request.urlopen(f'{base_url}/api/leaderboard/', timeout=1)
+                return process, base_url
+            except (urllib.error.URLError, ConnectionError, socket.timeout):
+                time.sleep(0.2)
+        process.terminate()
+        raise CommandError(f'{command[0]} did not start on port {port}')
+
+    def _run(self, base_url, paths, options):
+        def client(index):
+            latencies, errors = [], 0
+            for i in range(options['requests']):
+                start = time.perf_counter()
+                try:
+                    with urllib.request.urlopen(base_url + paths[(index + i) % len(paths)], timeout=30) as response:
+                        response.read()
+                except (urllib.error.URLError, ConnectionError, socket.timeout):
+                    errors += 1
+                latencies.append(time.perf_counter() - start)
+            return latencies, errors
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+            runs = list(pool.map(client, range(options['concurrency'])))
+        elapsed = time.perf_counter() - start
+        latencies = [latency for run, _ in runs for latency in run]
+        return {
+            'requests': len(latencies),
+            'rps': round(len(latencies) / elapsed, 1),
+            'p50_ms': round(_percentile(latencies, 0.5) * 1000, 1),
+            'p99_ms': round(_percentile(latencies, 0.99) * 1000, 1),
+            'errors': sum(errors for _, errors in runs),
+        }
+
+    def handle(self, *args, **options):
+        names = [name.strip() for name in options['servers'].split(',') if name.strip()]
+        unknown = set(names) - set(SERVERS)
+        if unknown:
+            raise CommandError(f"Unknown servers: {', '.join(sorted(unknown))}")
+
+        author, posts = self._seed()
+        paths = ['/api/posts/', '/api/leaderboard/'] + [f'/api/posts/{post.id}/' for post in posts[:5]]
+        results = {}
+        try:
+            for name in names:
+                process, base_url = self._start(name, options['workers'])
+                try:
+                    results[name] = self._run(base_url, paths, options)
+                finally:
+                    process.terminate()
+                    process.wait(timeout=10)
+        finally:
+            Post.objects.filter(id__in=[post.id for post in posts]).delete()
+            author.delete()
+
+        if options['json']:
+            self.stdout.write(json.dumps({'concurrency': options['concurrency'], 'results': results}, indent=2))
+            return
+
+        self.stdout.write(
+            f"Read latency, {options['concurrency']} concurrent clients, {options['workers']} workers"
+        )
+        for name, run in results.items():
+            self.stdout.write(
+                f"  {name:<5} {run['rps']:>8} req/s   p50 {run['p50_ms']:>7} ms   p99 {run['p99_ms']:>7} ms"
+                f"   {run['errors']} errors"
+            )
@@ -0,0 +1,144 @@
+import json
+import random
+import time
+import tracemalloc
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max, Prefetch
+from feed.models import Post, Comment, CommentLike
+from feed.serializers import CommentSerializer
+from feed.threads import load_thread_page
+
+
+class LegacyCommentSerializer(CommentSerializer):
+    """The previous recursive serializer: one nested serializer per comment"""
+
+    def get_replies(self, obj):
+        if hasattr(obj, '_replies'):
+            return LegacyCommentSerializer(obj._replies, many=True, context=self.context).data
+        return []
+
+
+def legacy_comment_tree(post):
+    """The previous PostSerializer.get_comments path, kept for comparison"""
+    comments = list(
+        Comment.objects.filter(post=post).select_related('author', 'parent').prefetch_related(
+            Prefetch('likes', queryset=CommentLike.objects.select_related('user'))
+        ).order_by('created_at')
+    )
+    comments_by_parent = {}
+    root_comments = []
+    for comment in comments:
+        if comment.parent_id is None:
+            root_comments.append(comment)
+        else:
+            comments_by_parent.setdefault(comment.parent_id, []).append(comment)
+
+    def attach_replies(comment):
+        comment._replies = sorted(comments_by_parent.get(comment.id, []), key=lambda x: x.created_at)
+        for reply in comment._replies:
+            attach_replies(reply)
+
+    for root_comment in root_comments:
+        attach_replies(root_comment)
+    return LegacyCommentSerializer(root_comments, many=True).data
+
+
+def compact_comment_tree(post):
+    """The iterative engine over value rows, loading the whole thread"""
+    page = load_thread_page(post, limit=10 ** 9, depth=Comment.PATH_SEGMENT_WIDTH * 16, replies=10 ** 9)
+    return page.render()
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare memory and CPU of building a post comment tree with the legacy '
+        'model/serializer path and the compact value-row engine. Synthetic data '
+        'is created inside a transaction that is rolled back afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--comments', type=int, default=10000, help='Comments in the thread (default: 10000)')
+        parser.add_argument('--max-depth', type=int, default=8, help='Deepest reply level generated (default: 8)')
+        parser.add_argument('--likes-per-comment', type=int, default=1, help='Likes attached to each comment (default: 1)')
+        parser.add_argument('--repeat', type=int, default=3, help='Runs per engine; the best run is reported (default: 3)')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--json', action='store_true', help='Print results as JSON')
+
+    def _seed(self, options):
+        rng = random.Random(options['seed'])
+        users = User.objects.bulk_create([
+            User(username=f'bench_tree_{i}_{rng.random():.8f}') for i in range(max(options['likes_per_comment'], 1) + 1)
+        ])
+        post = Post.objects.create(author=users[0], content='Comment tree benchmark')
+
+        # Assign ids up front so each path can be built before the bulk insert
+        next_id = (Comment.objects.aggregate(top=Max('id'))['top'] or 0) + 1
+        comments = []
+        for index in range(options['comments']):
+            parent = None
+            if comments and rng.random() > 0.1:
+                parent = comments[rng.randrange(len(comments))]
+                if parent.depth >= options['max_depth']:
+                    parent = None
+            pk = next_id + index
+            comments.append(Comment(
+                id=pk,
+                post=post,
+                author=users[index % len(users)],
+                content=f'Benchmark comment {index}',
+                parent=parent,
+                depth=parent.depth + 1 if parent else 0,
+                path=(parent.path if parent else '') + Comment.path_segment(pk),
+            ))
+        Comment.objects.bulk_create(comments, batch_size=2000)
+
+        likes = [
+            CommentLike(user=users[1 + n], comment=comment)
+            for comment in comments
+            for n in range(options['likes_per_comment'])
+        ]
+        CommentLike.objects.bulk_create(likes, batch_size=2000)
+        return post
+
+    def _measure(self, build, post, repeat):
+        best = None
+        for _ in range(repeat):
+            tracemalloc.start()
+            cpu_start = time.process_time()
+            wall_start = time.perf_counter()
+            result = build(post)
+            cpu = time.process_time() - cpu_start
+            wall = time.perf_counter() - wall_start
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            del result
+            run = {'cpu_seconds': cpu, 'wall_seconds': wall, 'peak_bytes': peak}
+            if best is None or run['cpu_seconds'] < best['cpu_seconds']:
+                best = run
+        return best
+
+    def handle(self, *args, **options):
+        results = {}
+        with transaction.atomic():
+            post = self._seed(options)
+            for name, build in (('legacy', legacy_comment_tree), ('compact', compact_comment_tree)):
+                results[name] = self._measure(build, post, options['repeat'])
+            transaction.set_rollback(True)
+
+        per_10k = 10000 / max(options['comments'], 1)
+        for run in results.values():
+            run['cpu_ms_per_10k'] = round(run['cpu_seconds'] * 1000 * per_10k, 1)
+            run['peak_mb_per_10k'] = round(run['peak_bytes'] / 2 ** 20 * per_10k, 2)
+
+        if options['json']:
+            self.stdout.write(json.dumps({'comments': options['comments'], 'results': results}, indent=2))
+            return
+
+        self.stdout.write(f"Comment tree build, {options['comments']} comments (best of {options['repeat']})")
+        for name, run in results.items():
+            self.stdout.write(
+                f"  {name:<8} cpu {run['cpu_ms_per_10k']:>8} ms/10k   peak {run['peak_mb_per_10k']:>7} MB/10k"
+            )
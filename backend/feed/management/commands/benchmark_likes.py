@@ -0,0 +1,112 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from feed.models import Post, PostLike, KarmaTransaction, KarmaOutboxEvent
+
+# Each mode likes then unlikes once per iteration
+MODES = {
+    'toggle': ('post', 'post'),
+    'idempotent': ('put', 'delete'),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure like/unlike throughput with concurrent likers, comparing the '
+        'POST toggle with the idempotent PUT/DELETE endpoints. Benchmark users '
+        'and posts are deleted afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--likers', type=int, default=8, help='Concurrent users (default: 8)')
+        parser.add_argument('--iterations', type=int, default=50, help='Like/unlike pairs per user (default: 50)')
+        parser.add_argument('--posts', type=int, default=4, help='Posts the likers spread over (default: 4)')
+        parser.add_argument('--json', action='store_true', help='Print results as JSON')
+
+    def _seed(self, options):
+        stamp = f'{time.time_ns()}'
+        author = User.objects.create(username=f'bench_like_author_{stamp}')
+        users = User.objects.bulk_create([
+            User(username=f'bench_like_{stamp}_{i}') for i in range(options['likers'])
+        ])
+        posts = Post.objects.bulk_create([
+            Post(author=author, content=f'Like benchmark {i}') for i in range(options['posts'])
+        ])
+        return author, users, posts
+
+    def _client(self, user):
+        # The test client's default host is not in ALLOWED_HOSTS outside tests
+        host = next((h for h in settings.ALLOWED_HOSTS if h and h != '*' and not h.startswith('.')), 'localhost')
+        client = APIClient(HTTP_HOST=host)
+        client.force_authenticate(user=user)
+        return client
+
+    def _queries_per_request(self, mode, user, post):
+        client = self._client(user)
+        url = f'/api/posts/{post.id}/like/'
+        with CaptureQueriesContext(connection) as queries:
+            for method in MODES[mode]:
+                getattr(client, method)(url)
+        return len(queries) / len(MODES[mode])
+
+    def _run(self, mode, users, posts, iterations):
+        errors = []
+        lock = threading.Lock()
+
+        def liker(index):
+            client = self._client(users[index])
+            url = f'/api/posts/{posts[index % len(posts)].id}/like/'
+            try:
+                for _ in range(iterations):
+                    for method in MODES[mode]:
+                        response = getattr(client, method)(url)
+                        if response.status_code >= 400:
+                            with lock:
+                                errors.append(response.status_code)
+            except Exception as exc:  # e.g. "database is locked" on SQLite
+                with lock:
+                    errors.append(type(exc).__name__)
+            finally:
+                connections.close_all()
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=len(users)) as pool:
+            list(pool.map(liker, range(len(users))))
+        elapsed = time.perf_counter() - start
+        requests = len(users) * iterations * len(MODES[mode])
+        return {'requests': requests, 'seconds': elapsed, 'rps': round(requests / elapsed, 1), 'errors': len(errors)}
+
+    def handle(self, *args, **options):
+        author, users, posts = self._seed(options)
+        results = {}
+        try:
+            for mode in MODES:
+                run = self._run(mode, users, posts, options['iterations'])
+                run['queries_per_request'] = self._queries_per_request(mode, users[0], posts[0])
+                results[mode] = run
+        finally:
+            post_ids = [post.id for post in posts]
+            PostLike.objects.filter(post_id__in=post_ids).delete()
+            KarmaOutboxEvent.objects.filter(recipient=author).delete()
+            KarmaTransaction.objects.filter(user=author).delete()
+            Post.objects.filter(id__in=post_ids).delete()
+            User.objects.filter(id__in=[user.id for user in users] + [author.id]).delete()
+
+        if options['json']:
+            self.stdout.write(json.dumps({'likers': options['likers'], 'results': results}, indent=2))
+            return
+
+        self.stdout.write(f"Like/unlike throughput, {options['likers']} concurrent likers")
+        for mode, run in results.items():
+            self.stdout.write(
+                f"  {mode:<11} {run['rps']:>8} req/s   {run['queries_per_request']:>4.1f} queries/req"
+                f"   {run['errors']} errors"
+            )
@@ -0,0 +1,204 @@
+import http.cookiejar
+import json
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client
+from feed.models import Post
+from feed.seeding import SEED_PASSWORD
+
+# Endpoint -> share of the request mix
+MIX = {
+    'feed': 40,
+    'post_detail': 30,
+    'like_toggle': 15,
+    'leaderboard': 15,
+}
+
+
+def _percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def _summary(latencies, errors, elapsed):
+    if not latencies:
+        return {'requests': 0, 'errors': errors, 'rps': 0}
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'rps': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(_percentile(latencies, 0.50) * 1000, 1),
+        'p95_ms': round(_percentile(latencies, 0.95) * 1000, 1),
+        'p99_ms': round(_percentile(latencies, 0.99) * 1000, 1),
+    }
+
+
+class _InProcessSession:
+    """A logged-in Django test client"""
+
+    def __init__(self, user):
+        host = next((h for h in settings.ALLOWED_HOSTS if h and h != '*' and not h.startswith('.')), 'localhost')
+        self.client = Client(HTTP_HOST=host)
+        self.client.force_login(user)
+
+    def request(self, method, path):
+        return getattr(self.client, method.lower())(path).status_code
+
+
+class _LocalCookiePolicy(http.cookiejar.DefaultCookiePolicy):
+    """Send Secure session/CSRF cookies to a local server running plain HTTP"""
+
+    def return_ok_secure(self, cookie, request):
+        return True
+
+
+class _HttpSession:
+    """A logged-in session against a running server, with its CSRF token"""
+
+    def __init__(self, base_url, user):
+        self.base_url = base_url.rstrip('/')
+        cookies = http.cookiejar.CookieJar(policy=_LocalCookiePolicy())
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(cookies))
+        body = json.dumps({'username': user.username, 'password': SEED_PASSWORD}).encode()
+        request = urllib.request.Request(
+            f'{self.base_url}/api/login/', data=body, headers={'Content-Type': 'application/json'}
+        )
+        with self.opener.open(request, timeout=30) as response:
+            self.csrf_token = json.load(response)['csrf_token']
+
+    def request(self, method, path):
+        request = urllib.request.Request(self.base_url + path, method=method, headers={
+            'X-CSRFToken': self.csrf_token, 'Referer': self.base_url + '/',
+        })
+        try:
+            with self.opener.open(request, timeout=30) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as exc:
+            return exc.code
+
+
+class Command(BaseCommand):
+    help = (
+        'Drive the feed, post detail, like toggle and leaderboard endpoints '
+        'concurrently and report throughput and p50/p95/p99 latency per '
+        'endpoint as JSON. Runs in-process through the Django test client, or '
+        'against a running server with --url. Logs in as users created by '
+        'seed_feed; run that first.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', help='Base URL of a running server (default: in-process test client)')
+        parser.add_argument('--concurrency', type=int, default=8, help='Concurrent clients (default: 8)')
+        parser.add_argument('--duration', type=float, default=30, help='Seconds to run (default: 30)')
+        parser.add_argument('--requests', type=int, default=None,
+                            help='Stop each client after this many requests instead of --duration')
+        parser.add_argument('--posts', type=int, default=1000, help='Most recent posts to target (default: 1000)')
+        parser.add_argument('--seed', type=int, default=None, help='Random seed for the request mix')
+        parser.add_argument('--output', help='Also write the JSON report to this file')
+        parser.add_argument('--compare', help='A previous JSON report to print changes against')
+
+    def _session(self, options, user):
+        if options['url']:
+            return _HttpSession(options['url'], user)
+        return _InProcessSession(user)
+
+    def _client(self, index, users, post_ids, options, results, lock):
+        rng = random.Random(None if options['seed'] is None else options['seed'] + index)
+        names = list(MIX)
+        weights = list(MIX.values())
+        session = self._session(options, users[index % len(users)])
+        samples = {name: [] for name in names}
+        errors = dict.fromkeys(names, 0)
+        deadline = time.monotonic() + options['duration']
+        sent = 0
+        while (sent < options['requests']) if options['requests'] else (time.monotonic() < deadline):
+            name = rng.choices(names, weights)[0]
+            post_id = rng.choice(post_ids)
+            method, path = {
+                'feed': ('GET', '/api/posts/'),
+                'post_detail': ('GET', f'/api/posts/{post_id}/'),
+                'like_toggle': ('POST', f'/api/posts/{post_id}/like/'),
+                'leaderboard': ('GET', '/api/leaderboard/'),
+            }[name]
+            start = time.perf_counter()
+            try:
+                status_code = session.request(method, path)
+            except Exception:  # connection errors, "database is locked" on SQLite
+                status_code = None
+            samples[name].append(time.perf_counter() - start)
+            if status_code is None or status_code >= 400:
+                errors[name] += 1
+            sent += 1
+        with lock:
+            for name in names:
+                results[name][0].extend(samples[name])
+                results[name][1] += errors[name]
+
+    def run(self, options):
+        """Run the load and return the report dict"""
+        users = list(User.objects.filter(username__startswith='seed_').order_by('id')[:options['concurrency']])
+        post_ids = list(Post.objects.order_by('-created_at').values_list('id', flat=True)[:options['posts']])
+        if not users or not post_ids:
+            raise CommandError('No seed users or posts; run manage.py seed_feed first')
+
+        results = {name: [[], 0] for name in MIX}
+        lock = threading.Lock()
+        start = time.perf_counter()
+
+        def worker(index):
+            try:
+                self._client(index, users, post_ids, options, results, lock)
+            finally:
+                connections.close_all()
+
+        if options['concurrency'] == 1:
+            # Inline, on this thread's connection (and inside a test's transaction)
+            self._client(0, users, post_ids, options, results, lock)
+        else:
+            with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+                list(pool.map(worker, range(options['concurrency'])))
+        elapsed = time.perf_counter() - start
+
+        all_latencies = [latency for latencies, _ in results.values() for latency in latencies]
+        return {
+            'target': options['url'] or 'in-process',
+            'concurrency': options['concurrency'],
+            'seconds': round(elapsed, 2),
+            'endpoints': {name: _summary(latencies, errors, elapsed) for name, (latencies, errors) in results.items()},
+            'total': _summary(all_latencies, sum(errors for _, errors in results.values()), elapsed),
+        }
+
+    def _print_comparison(self, report, path):
+        with open(path) as handle:
+            previous = json.load(handle)
+        self.stderr.write(f'Change against {path}:')
+        rows = [('total', report['total'], previous.get('total', {}))] + [
+            (name, stats, previous.get('endpoints', {}).get(name, {}))
+            for name, stats in report['endpoints'].items()
+        ]
+        for name, current, before in rows:
+            changes = []
+            for key in ('rps', 'p50_ms', 'p95_ms', 'p99_ms'):
+                if before.get(key) and key in current:
+                    changes.append(f'{key} {(current[key] - before[key]) / before[key] * 100:+.0f}%')
+            self.stderr.write(f"  {name:<12} {'  '.join(changes)}")
+
+    def handle(self, *args, **options):
+        report = self.run(options)
+        output = json.dumps(report, indent=2)
+        self.stdout.write(output)
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                handle.write(output + '\n')
+        if options['compare']:
+            self._print_comparison(report, options['compare'])
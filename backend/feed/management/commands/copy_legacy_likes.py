@@ -0,0 +1,24 @@
+from importlib import import_module
+
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from feed.counters import rebuild_counters
+
+# The reconciliation lives in a data migration so it runs on historical models
+reconcile_migration = import_module('feed.migrations.0017_legacy_like_origin')
+
+
+class Command(BaseCommand):
+    help = (
+        'Reconcile PostLike/CommentLike with the generic Like rows again. Run once '
+        'after every server uses the typed tables: copies likes written by older '
+        'servers during the rollout, deletes copied likes they have since removed, '
+        'and rebuilds the like counters.'
+    )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            copied, deleted = reconcile_migration.reconcile_likes(apps, None)
+        rebuild_counters()
+        self.stdout.write(self.style.SUCCESS(f'Copied {copied} likes, removed {deleted}'))
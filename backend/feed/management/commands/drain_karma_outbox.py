@@ -0,0 +1,48 @@
+import time
+
+from django.core.management.base import BaseCommand
+from feed.outbox import drain_outbox, get_outbox_stats
+
+
+class Command(BaseCommand):
+    help = 'Apply pending karma outbox events written by like/unlike requests'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of events applied per transaction (default: 500)',
+        )
+        parser.add_argument('--loop', action='store_true', help='Keep draining until interrupted')
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=1.0,
+            help='Seconds to sleep when the outbox is empty in --loop mode (default: 1.0)',
+        )
+        parser.add_argument('--stats', action='store_true', help='Print pending count and lag, then exit')
+
+    def _report(self):
+        stats = get_outbox_stats()
+        self.stdout.write(f"Pending: {stats['pending']} events, lag {stats['lag_seconds']:.1f}s")
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            self._report()
+            return
+
+        total = 0
+        try:
+            while True:
+                processed = drain_outbox(batch_size=options['batch_size'])
+                total += processed
+                if processed:
+                    continue
+                if not options['loop']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(f'Applied {total} karma events'))
+        self._report()
@@ -0,0 +1,47 @@
+import time
+
+from django.core.management.base import BaseCommand
+from feed.timelines import drain_fanout, get_fanout_stats
+
+
+class Command(BaseCommand):
+    help = "Copy new posts into their authors' followers' home timelines"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=20,
+            help='Number of posts fanned out per transaction (default: 20)',
+        )
+        parser.add_argument('--loop', action='store_true', help='Keep fanning out until interrupted')
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=1.0,
+            help='Seconds to sleep when no posts are waiting in --loop mode (default: 1.0)',
+        )
+        parser.add_argument('--stats', action='store_true', help='Print the number of waiting posts, then exit')
+
+    def _report(self):
+        self.stdout.write(f"Pending: {get_fanout_stats()['pending']} posts")
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            self._report()
+            return
+
+        total = 0
+        try:
+            while True:
+                processed = drain_fanout(batch_size=options['batch_size'])
+                total += processed
+                if processed:
+                    continue
+                if not options['loop']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(f'Fanned out {total} posts'))
+        self._report()
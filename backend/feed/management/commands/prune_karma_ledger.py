@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+from feed.retention import expired_days, get_retention_cutoff, prune_karma_ledger
+
+
+class Command(BaseCommand):
+    help = (
+        'Fold karma ledger days older than the retention period into per-user '
+        'lifetime totals, then delete their transactions and hourly buckets'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=None,
+            help='Days of ledger to keep (default: KARMA_LEDGER_RETENTION_DAYS)',
+        )
+        parser.add_argument('--dry-run', action='store_true', help='List the days that would be folded')
+
+    def handle(self, *args, **options):
+        try:
+            cutoff = get_retention_cutoff(options['days'])
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        if options['dry_run']:
+            days = expired_days(cutoff)
+            for day in days:
+                self.stdout.write(f'{day:%Y-%m-%d}: would be folded')
+            self.stdout.write(f'{len(days)} days before {cutoff:%Y-%m-%d}')
+            return
+
+        results = prune_karma_ledger(options['days'])
+        for day, folded, deleted in results:
+            self.stdout.write(f'{day:%Y-%m-%d}: {deleted} transactions folded for {folded} users')
+        self.stdout.write(self.style.SUCCESS(f'Ledger pruned to {cutoff:%Y-%m-%d}'))
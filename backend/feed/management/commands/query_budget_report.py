@@ -0,0 +1,55 @@
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import Client
+from django.test.utils import override_settings
+from feed.query_budget import ENDPOINTS, SCALES, measure, seed
+
+# Measured against a private cache so the real one is neither read nor cleared
+REPORT_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'query-budget'}}
+
+
+class Command(BaseCommand):
+    help = (
+        'Print the SQL queries each API endpoint runs at every data scale in '
+        'feed.query_budget.SCALES, against its budget. Seeds inside a '
+        'transaction that is rolled back; fails if any endpoint is over budget.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--max-comments', type=int, default=None,
+                            help='Skip scales with more comments than this (default: all)')
+
+    def _measure_all(self, scales):
+        results = {}
+        with override_settings(CACHES=REPORT_CACHES), transaction.atomic():
+            viewer = User.objects.create_user(username='budget_viewer', password='budget-viewer-pass')
+            host = next((h for h in settings.ALLOWED_HOSTS if h and h != '*' and not h.startswith('.')), 'localhost')
+            client = Client(HTTP_HOST=host)
+            client.force_login(viewer)
+            ids = None
+            for posts, comments in scales:
+                ids = seed(viewer, posts, comments, ids)
+                for name, status_code, queries in measure(client, ENDPOINTS, dict(ids)):
+                    results.setdefault(name, []).append((status_code, queries))
+            transaction.set_rollback(True)
+        return results
+
+    def handle(self, *args, **options):
+        limit = options['max_comments']
+        scales = [scale for scale in SCALES if limit is None or scale[1] <= limit]
+        results = self._measure_all(scales)
+
+        header = ''.join(f'{f"{posts}p/{comments}c":>12}' for posts, comments in scales)
+        self.stdout.write(f"{'endpoint':<22}{header}{'budget':>8}")
+        over = []
+        for name, _method, _path, _body, budget in ENDPOINTS:
+            runs = results[name]
+            counts = ''.join(f'{queries:>12}' for _status, queries in runs)
+            failed = any(queries > budget or status_code >= 400 for status_code, queries in runs)
+            if failed:
+                over.append(name)
+            self.stdout.write(f"{name:<22}{counts}{budget:>8}{'  OVER' if failed else ''}")
+        if over:
+            raise CommandError(f"Over budget or failing: {', '.join(over)}")
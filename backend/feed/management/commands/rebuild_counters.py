@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from feed.counters import rebuild_counters
+
+
+class Command(BaseCommand):
+    help = 'Recompute denormalized like/comment counters on posts and comments'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Number of rows updated per statement (default: 5000)',
+        )
+
+    def handle(self, *args, **options):
+        totals = rebuild_counters(batch_size=options['batch_size'])
+        for model_name, processed in totals.items():
+            self.stdout.write(f'{model_name}: {processed} rows recounted')
+        self.stdout.write(self.style.SUCCESS('Counters rebuilt'))
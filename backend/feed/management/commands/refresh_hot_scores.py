@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from feed.ranking import refresh_hot_scores
+
+
+class Command(BaseCommand):
+    help = (
+        'Recompute the hot-feed score of every post from its like and comment '
+        'counters. Run periodically (e.g. hourly) and after changing '
+        'FEED_HOT_HALF_LIFE_HOURS'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Number of posts rescored per transaction (default: 5000)',
+        )
+
+    def handle(self, *args, **options):
+        processed = refresh_hot_scores(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'{processed} posts rescored'))
@@ -0,0 +1,51 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from feed.seeding import DEFAULTS, SEED_PASSWORD, seed_feed
+
+
+class Command(BaseCommand):
+    help = (
+        'Bulk-create synthetic users, posts, deep comment trees with heavy-tailed '
+        'fan-out, likes and back-dated karma (with hourly buckets) for load '
+        f'testing. Seed users are named seed_<run>_<n> with password "{SEED_PASSWORD}".'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=DEFAULTS['users'],
+                            help=f"Users to create (default: {DEFAULTS['users']})")
+        parser.add_argument('--posts', type=int, default=DEFAULTS['posts'],
+                            help=f"Posts to create (default: {DEFAULTS['posts']})")
+        parser.add_argument('--comments-per-post', type=int, default=DEFAULTS['comments_per_post'],
+                            help=f"Mean comments per post, Pareto-distributed (default: {DEFAULTS['comments_per_post']})")
+        parser.add_argument('--max-depth', type=int, default=DEFAULTS['max_depth'],
+                            help=f"Deepest reply level (default: {DEFAULTS['max_depth']})")
+        parser.add_argument('--likes-per-post', type=int, default=DEFAULTS['likes_per_post'],
+                            help=f"Mean likes per post (default: {DEFAULTS['likes_per_post']})")
+        parser.add_argument('--likes-per-comment', type=int, default=DEFAULTS['likes_per_comment'],
+                            help=f"Mean likes per comment (default: {DEFAULTS['likes_per_comment']})")
+        parser.add_argument('--days', type=int, default=DEFAULTS['days'],
+                            help=f"Spread content and karma over this many days (default: {DEFAULTS['days']})")
+        parser.add_argument('--batch-size', type=int, default=DEFAULTS['batch_size'],
+                            help=f"Posts per batch and rows per INSERT (default: {DEFAULTS['batch_size']})")
+        parser.add_argument('--seed', type=int, default=None, help='Random seed for a reproducible data set')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+
+        def progress(counts):
+            if options['verbosity'] > 1:
+                self.stdout.write(f"  {counts['posts']} posts, {counts['comments']} comments")
+
+        with transaction.atomic():
+            counts = seed_feed(
+                progress=progress,
+                **{key: options[key] for key in DEFAULTS},
+            )
+        elapsed = time.perf_counter() - started
+        total = sum(counts.values())
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {total} rows in {elapsed:.1f}s ({total / elapsed:.0f} rows/s): '
+            + ', '.join(f'{count} {name}' for name, count in counts.items())
+        ))
@@ -0,0 +1,281 @@
+import bisect
+import ipaddress
+import json
+import os
+import threading
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse, JsonResponse
+from django.utils.crypto import constant_time_compare
+from django.utils.decorators import sync_and_async_middleware
+from asgiref.sync import iscoroutinefunction
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50)
+
+# name -> (type, help, buckets)
+METRICS = {
+    'feed_http_requests_total': ('counter', 'HTTP requests by route, method and status.', None),
+    'feed_http_request_duration_seconds': ('histogram', 'Request latency by route.', LATENCY_BUCKETS),
+    'feed_http_response_size_bytes': ('histogram', 'Response body size by route.', SIZE_BUCKETS),
+    'feed_http_request_queries': ('histogram', 'SQL queries run per request by route.', QUERY_BUCKETS),
+    'feed_db_query_duration_seconds_total': ('counter', 'Time spent in SQL queries by route.', None),
+    'feed_cache_requests_total': ('counter', 'Application cache lookups by cache and result.', None),
+}
+
+# Per-request SQL accumulator; context variables follow sync_to_async
+# into worker threads, so async views are counted too
+_current_request = ContextVar('feed_request_metrics', default=None)
+
+_local = threading.local()
+_stores = []
+_stores_lock = threading.Lock()
+_last_flush = [0.0]
+
+
+def _store():
+    """This thread's metric values, registered on first use.
+
+    Recording only touches the calling thread's dict, so the hot path takes
+    no lock; collect() sums copies of every thread's dict.
+    """
+    store = getattr(_local, 'store', None)
+    if store is None:
+        store = _local.store = {}
+        with _stores_lock:
+            _stores.append(store)
+    return store
+
+
+def _add(key, amount=1):
+    store = _store()
+    store[key] = store.get(key, 0) + amount
+
+
+def inc(name, labels, amount=1):
+    """Increment a counter; labels is a tuple of (name, value) pairs"""
+    _add((name, labels, ''), amount)
+
+
+def observe(name, labels, value):
+    """Record a histogram observation"""
+    buckets = METRICS[name][2]
+    _add((name, labels, bisect.bisect_left(buckets, value)))
+    _add((name, labels, 'sum'), value)
+    _add((name, labels, 'count'))
+
+
+def record_cache(cache_name, hit):
+    """Count a lookup in one of the application caches"""
+    inc('feed_cache_requests_total', (('cache', cache_name), ('result', 'hit' if hit else 'miss')))
+
+
+def collect():
+    """Sum of every thread's values in this process"""
+    totals = {}
+    with _stores_lock:
+        stores = list(_stores)
+    for store in stores:
+        for key, value in store.copy().items():
+            totals[key] = totals.get(key, 0) + value
+    return totals
+
+
+def _metrics_dir():
+    return getattr(settings, 'METRICS_DIR', '') or None
+
+
+def _flush(force=False):
+    """Write this process's totals to METRICS_DIR for the other workers.
+
+    Each process owns one file, replaced atomically at most every
+    METRICS_FLUSH_INTERVAL seconds; the endpoint sums all of them.
+    """
+    directory = _metrics_dir()
+    now = time.monotonic()
+    if directory is None or (not force and now - _last_flush[0] < getattr(settings, 'METRICS_FLUSH_INTERVAL', 5)):
+        return
+    _last_flush[0] = now
+    rows = [[name, [list(pair) for pair in labels], suffix, value]
+            for (name, labels, suffix), value in collect().items()]
+    path = os.path.join(directory, f'metrics_{os.getpid()}.json')
+    temp_path = f'{path}.tmp'
+    with open(temp_path, 'w') as handle:
+        json.dump(rows, handle)
+    os.replace(temp_path, path)
+
+
+def collect_all():
+    """Totals across workers: this process live, the others from their files"""
+    totals = collect()
+    directory = _metrics_dir()
+    if directory is None:
+        return totals
+    own_file = f'metrics_{os.getpid()}.json'
+    for filename in os.listdir(directory):
+        if not filename.startswith('metrics_') or not filename.endswith('.json') or filename == own_file:
+            continue
+        try:
+            with open(os.path.join(directory, filename)) as handle:
+                rows = json.load(handle)
+        except (OSError, ValueError):
+            continue
+        for name, labels, suffix, value in rows:
+            key = (name, tuple(tuple(pair) for pair in labels), suffix)
+            totals[key] = totals.get(key, 0) + value
+    return totals
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (
+        (name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in labels
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render_prometheus(totals):
+    """Prometheus text exposition (format 0.0.4) of collected totals"""
+    series = {}
+    for (name, labels, suffix), value in totals.items():
+        series.setdefault(name, {}).setdefault(labels, {})[suffix] = value
+
+    lines = []
+    for name, (kind, help_text, buckets) in METRICS.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        for labels, values in sorted(series.get(name, {}).items()):
+            if kind == 'counter':
+                lines.append(f'{name}{_format_labels(labels)} {_format_value(values.get("", 0))}')
+                continue
+            cumulative = 0
+            for index, bound in enumerate(buckets + (float('inf'),)):
+                cumulative += values.get(index, 0)
+                le = '+Inf' if bound == float('inf') else _format_value(bound)
+                lines.append(f'{name}_bucket{_format_labels(labels + (("le", le),))} {cumulative}')
+            lines.append(f'{name}_sum{_format_labels(labels)} {_format_value(values.get("sum", 0))}')
+            lines.append(f'{name}_count{_format_labels(labels)} {values.get("count", 0)}')
+    return '\n'.join(lines) + '\n'
+
+
+class _RequestStats:
+    __slots__ = ('queries', 'sql_time')
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_time = 0.0
+
+
+def _count_query(execute, sql, params, many, context):
+    stats = _current_request.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.queries += 1
+        stats.sql_time += time.perf_counter() - start
+
+
+def install_query_counter(connection, **kwargs):
+    """Add the per-request SQL counter to a database connection (connection_created receiver)"""
+    if _count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_count_query)
+
+
+def connect_signals():
+    """Called from FeedConfig.ready()"""
+    from django.db import connections
+
+    connection_created.connect(install_query_counter, dispatch_uid='feed.metrics.query_counter')
+    for connection in connections.all(initialized_only=True):
+        install_query_counter(connection)
+
+
+def _route(request):
+    match = getattr(request, 'resolver_match', None)
+    return '/' + match.route if match is not None else 'unmatched'
+
+
+def _record(request, response, started, stats):
+    route = _route(request)
+    method_labels = (('route', route), ('method', request.method))
+    inc('feed_http_requests_total', method_labels + (('status', str(response.status_code)),))
+    observe('feed_http_request_duration_seconds', method_labels, time.perf_counter() - started)
+    observe('feed_http_request_queries', (('route', route),), stats.queries)
+    inc('feed_db_query_duration_seconds_total', (('route', route),), stats.sql_time)
+    if not response.streaming:
+        observe('feed_http_response_size_bytes', (('route', route),), len(response.content))
+    _flush()
+
+
+@sync_and_async_middleware
+def metrics_middleware(get_response):
+    """Record latency, SQL queries and time, and response size per route.
+
+    Routes are URL patterns (``/api/posts/<int:pk>/``), so the label set
+    stays bounded. For streaming responses only the time to the first
+    byte is measured.
+    """
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            stats = _RequestStats()
+            token = _current_request.set(stats)
+            started = time.perf_counter()
+            try:
+                response = await get_response(request)
+            finally:
+                _current_request.reset(token)
+            _record(request, response, started, stats)
+            return response
+    else:
+        def middleware(request):
+            stats = _RequestStats()
+            token = _current_request.set(stats)
+            started = time.perf_counter()
+            try:
+                response = get_response(request)
+            finally:
+                _current_request.reset(token)
+            _record(request, response, started, stats)
+            return response
+    return middleware
+
+
+def _allowed(request):
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if token and constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return True
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated and user.is_staff:
+        return True
+    try:
+        address = ipaddress.ip_address(request.META.get('REMOTE_ADDR', ''))
+    except ValueError:
+        return False
+    return any(
+        address in ipaddress.ip_network(network, strict=False)
+        for network in getattr(settings, 'METRICS_ALLOWED_NETWORKS', [])
+    )
+
+
+def metrics_view(request):
+    """Prometheus scrape endpoint.
+
+    Internal: open to ``Authorization: Bearer <METRICS_TOKEN>``, staff
+    users and clients in METRICS_ALLOWED_NETWORKS.
+    """
+    if not _allowed(request):
+        return JsonResponse({'error': 'Forbidden'}, status=403)
+    return HttpResponse(render_prometheus(collect_all()), content_type='text/plain; version=0.0.4; charset=utf-8')
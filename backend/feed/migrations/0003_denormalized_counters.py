@@ -0,0 +1,62 @@
+# Generated by Django 5.2.10 on 2026-10-17 04:15
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def _count_subquery(queryset, group_field):
+    counts = queryset.filter(**{group_field: OuterRef('pk')}).order_by().values(
+        group_field
+    ).annotate(total=Count('pk')).values('total')
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+def backfill_counters(apps, schema_editor):
+    ContentType = apps.get_model('contenttypes', 'ContentType')
+    Post = apps.get_model('feed', 'Post')
+    Comment = apps.get_model('feed', 'Comment')
+    Like = apps.get_model('feed', 'Like')
+
+    post_type = ContentType.objects.filter(app_label='feed', model='post').first()
+    comment_type = ContentType.objects.filter(app_label='feed', model='comment').first()
+
+    Post.objects.update(
+        like_count=_count_subquery(Like.objects.filter(content_type=post_type), 'object_id'),
+        comment_count=_count_subquery(Comment.objects.all(), 'post'),
+    )
+    Comment.objects.update(
+        like_count=_count_subquery(Like.objects.filter(content_type=comment_type), 'object_id'),
+        reply_count=_count_subquery(Comment.objects.all(), 'parent'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feed', '0002_post_keyset_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='like_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='reply_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='like_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
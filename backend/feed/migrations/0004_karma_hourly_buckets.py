@@ -0,0 +1,66 @@
+# Generated by Django 5.2.10 on 2026-10-17 04:17
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncHour
+from datetime import timezone as dt_timezone
+
+
+def backfill_buckets(apps, schema_editor):
+    KarmaTransaction = apps.get_model('feed', 'KarmaTransaction')
+    KarmaHourlyBucket = apps.get_model('feed', 'KarmaHourlyBucket')
+
+    rows = KarmaTransaction.objects.annotate(
+        bucket_hour=TruncHour('created_at', tzinfo=dt_timezone.utc)
+    ).order_by().values('user_id', 'bucket_hour').annotate(
+        total=Sum('amount'),
+        transactions=Count('id')
+    ).iterator()
+
+    batch = []
+    for row in rows:
+        batch.append(KarmaHourlyBucket(
+            user_id=row['user_id'],
+            hour=row['bucket_hour'],
+            amount=row['total'],
+            transaction_count=row['transactions']
+        ))
+        if len(batch) >= 5000:
+            KarmaHourlyBucket.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        KarmaHourlyBucket.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feed', '0003_denormalized_counters'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='karmatransaction',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.CreateModel(
+            name='KarmaHourlyBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField()),
+                ('amount', models.IntegerField(default=0)),
+                ('transaction_count', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='karma_buckets', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['hour'], name='feed_karmah_hour_c1e954_idx')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'hour'), name='unique_karma_bucket_per_hour')],
+            },
+        ),
+        migrations.RunPython(backfill_buckets, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 5.2.10 on 2026-10-17 04:20
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Q
+
+PATH_DIGITS = '0123456789abcdefghijklmnopqrstuvwxyz'
+PATH_SEGMENT_WIDTH = 8
+BATCH_SIZE = 2000
+
+
+def path_segment(pk):
+    encoded = ''
+    while pk:
+        pk, remainder = divmod(pk, 36)
+        encoded = PATH_DIGITS[remainder] + encoded
+    return encoded.rjust(PATH_SEGMENT_WIDTH, '0')
+
+
+def backfill_paths(apps, schema_editor):
+    """Fill path/depth top-down: each pass handles comments whose parent is done"""
+    Comment = apps.get_model('feed', 'Comment')
+    while True:
+        rows = list(
+            Comment.objects.filter(path='').filter(
+                Q(parent__isnull=True) | ~Q(parent__path='')
+            ).order_by('pk').values('pk', 'parent__path', 'parent__depth')[:BATCH_SIZE]
+        )
+        if not rows:
+            break
+        batch = []
+        for row in rows:
+            if row['parent__path']:
+                path = row['parent__path'] + path_segment(row['pk'])
+                depth = row['parent__depth'] + 1
+            else:
+                path = path_segment(row['pk'])
+                depth = 0
+            batch.append(Comment(pk=row['pk'], path=path, depth=depth))
+        Comment.objects.bulk_update(batch, ['path', 'depth'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feed', '0004_karma_hourly_buckets'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='depth',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='path',
+            field=models.CharField(blank=True, default='', max_length=1024),
+        ),
+        migrations.RunPython(backfill_paths, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', 'path'], name='feed_commen_post_id_d5dd9a_idx'),
+        ),
+    ]
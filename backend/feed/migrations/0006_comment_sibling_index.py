@@ -0,0 +1,19 @@
+# Generated by Django 5.2.10 on 2026-10-17 04:23
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feed', '0005_comment_materialized_path'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', 'parent', 'path'], name='feed_commen_post_id_a719c6_idx'),
+        ),
+    ]
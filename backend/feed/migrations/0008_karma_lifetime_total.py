@@ -0,0 +1,24 @@
+# Generated by Django 5.2.10 on 2026-10-17 04:38
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('feed', '0007_karma_outbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='KarmaLifetimeTotal',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='karma_lifetime', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('amount', models.IntegerField(default=0)),
+                ('transaction_count', models.IntegerField(default=0)),
+            ],
+        ),
+    ]
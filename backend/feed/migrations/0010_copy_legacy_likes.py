@@ -0,0 +1,56 @@
+from django.db import migrations
+
+BATCH_SIZE = 5000
+
+
+def copy_likes(apps, schema_editor):
+    """Copy generic Like rows into PostLike/CommentLike in primary-key batches.
+
+    Re-runnable: rows already copied are skipped by the unique constraints,
+    and likes whose post or comment no longer exists are dropped.
+    """
+    ContentType = apps.get_model('contenttypes', 'ContentType')
+    Post = apps.get_model('feed', 'Post')
+    Comment = apps.get_model('feed', 'Comment')
+    Like = apps.get_model('feed', 'Like')
+    PostLike = apps.get_model('feed', 'PostLike')
+    CommentLike = apps.get_model('feed', 'CommentLike')
+
+    targets = {}
+    for model, like_model, field in ((Post, PostLike, 'post_id'), (Comment, CommentLike, 'comment_id')):
+        content_type = ContentType.objects.filter(app_label='feed', model=model._meta.model_name).first()
+        if content_type is not None:
+            targets[content_type.id] = (model, like_model, field)
+
+    last_pk = 0
+    while True:
+        rows = list(
+            Like.objects.filter(pk__gt=last_pk).order_by('pk').values_list(
+                'pk', 'user_id', 'content_type_id', 'object_id', 'created_at'
+            )[:BATCH_SIZE]
+        )
+        if not rows:
+            break
+        last_pk = rows[-1][0]
+        for content_type_id, (model, like_model, field) in targets.items():
+            batch = [row for row in rows if row[2] == content_type_id]
+            existing = set(
+                model.objects.filter(pk__in={row[3] for row in batch}).values_list('pk', flat=True)
+            )
+            like_model.objects.bulk_create([
+                like_model(user_id=user_id, created_at=created_at, **{field: object_id})
+                for _, user_id, _, object_id, created_at in batch
+                if object_id in existing
+            ], ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('feed', '0009_typed_likes'),
+    ]
+
+    operations = [
+        migrations.RunPython(copy_likes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,90 @@
+from django.db import migrations
+
+# Tables whose ``content`` column is searchable
+SEARCH_TABLES = ('feed_post', 'feed_comment')
+
+SQLITE_FORWARD = [
+    """CREATE VIRTUAL TABLE {table}_fts USING fts5(
+        content, content='{table}', content_rowid='id', tokenize='porter unicode61'
+    )""",
+    """CREATE TRIGGER {table}_fts_insert AFTER INSERT ON {table} BEGIN
+        INSERT INTO {table}_fts(rowid, content) VALUES (new.id, new.content);
+    END""",
+    """CREATE TRIGGER {table}_fts_delete AFTER DELETE ON {table} BEGIN
+        INSERT INTO {table}_fts({table}_fts, rowid, content) VALUES ('delete', old.id, old.content);
+    END""",
+    """CREATE TRIGGER {table}_fts_update AFTER UPDATE OF content ON {table} BEGIN
+        INSERT INTO {table}_fts({table}_fts, rowid, content) VALUES ('delete', old.id, old.content);
+        INSERT INTO {table}_fts(rowid, content) VALUES (new.id, new.content);
+    END""",
+    "INSERT INTO {table}_fts({table}_fts) VALUES ('rebuild')",
+]
+
+SQLITE_REVERSE = [
+    'DROP TRIGGER IF EXISTS {table}_fts_insert',
+    'DROP TRIGGER IF EXISTS {table}_fts_delete',
+    'DROP TRIGGER IF EXISTS {table}_fts_update',
+    'DROP TABLE IF EXISTS {table}_fts',
+]
+
+POSTGRES_FORWARD = [
+    'ALTER TABLE {table} ADD COLUMN search_vector tsvector',
+    "UPDATE {table} SET search_vector = to_tsvector('english', content)",
+    'CREATE INDEX {table}_search_idx ON {table} USING GIN (search_vector)',
+    """CREATE FUNCTION {table}_search_vector() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector := to_tsvector('english', NEW.content);
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql""",
+    """CREATE TRIGGER {table}_search_vector BEFORE INSERT OR UPDATE OF content ON {table}
+        FOR EACH ROW EXECUTE FUNCTION {table}_search_vector()""",
+]
+
+POSTGRES_REVERSE = [
+    'DROP TRIGGER IF EXISTS {table}_search_vector ON {table}',
+    'DROP FUNCTION IF EXISTS {table}_search_vector()',
+    'DROP INDEX IF EXISTS {table}_search_idx',
+    'ALTER TABLE {table} DROP COLUMN IF EXISTS search_vector',
+]
+
+SCRIPTS = {
+    'sqlite': (SQLITE_FORWARD, SQLITE_REVERSE),
+    'postgresql': (POSTGRES_FORWARD, POSTGRES_REVERSE),
+}
+
+
+def _run(schema_editor, direction):
+    scripts = SCRIPTS.get(schema_editor.connection.vendor)
+    if scripts is None:
+        # Other databases have no search index; /api/search/ reports that
+        return
+    for table in SEARCH_TABLES:
+        for statement in scripts[direction]:
+            schema_editor.execute(statement.format(table=table), params=None)
+
+
+def create_search_index(apps, schema_editor):
+    """Build the full-text index over post and comment content.
+
+    PostgreSQL: a tsvector column with a GIN index. SQLite: an FTS5
+    external-content table. Either way triggers keep it in step with
+    inserts (bulk_create included), content edits and deletes, and
+    counter-only updates leave it alone.
+    """
+    _run(schema_editor, 0)
+
+
+def drop_search_index(apps, schema_editor):
+    _run(schema_editor, 1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feed', '0010_copy_legacy_likes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
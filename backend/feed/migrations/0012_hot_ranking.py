@@ -0,0 +1,65 @@
+# Generated by Django 5.2.10 on 2026-10-17 05:28
+
+import importlib
+import math
+from datetime import datetime, timezone
+
+import django.db.models.expressions
+from django.conf import settings
+from django.db import migrations, models
+
+# feed.models.COMMENT_WEIGHT and Post.HOT_EPOCH when this migration was written
+COMMENT_WEIGHT = 2
+HOT_EPOCH = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+def backfill_hot_scores(apps, schema_editor):
+    Post = apps.get_model('feed', 'Post')
+    half_life = settings.FEED_HOT_HALF_LIFE_HOURS * 3600
+    posts = []
+    for post in Post.objects.only('created_at', 'like_count', 'comment_count').iterator(chunk_size=2000):
+        engagement = post.like_count + post.comment_count * COMMENT_WEIGHT
+        post.hot_score = math.log2(1 + engagement) + (post.created_at - HOT_EPOCH).total_seconds() / half_life
+        posts.append(post)
+        if len(posts) == 2000:
+            Post.objects.bulk_update(posts, ['hot_score'])
+            posts = []
+    Post.objects.bulk_update(posts, ['hot_score'])
+
+
+def rebuild_sqlite_search_index(apps, schema_editor):
+    """SQLite adds the column by rebuilding feed_post, which drops the
+    full-text triggers of migration 0011; recreate that index"""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    search = importlib.import_module('feed.migrations.0011_search_index')
+    for statement in search.SQLITE_REVERSE + search.SQLITE_FORWARD:
+        schema_editor.execute(statement.format(table='feed_post'), params=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feed', '0011_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        # Unapplying drops hot_score with another rebuild; this runs after it
+        migrations.RunPython(migrations.RunPython.noop, rebuild_sqlite_search_index),
+        migrations.AddField(
+            model_name='post',
+            name='hot_score',
+            field=models.FloatField(default=0),
+        ),
+        migrations.RunPython(backfill_hot_scores, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['-hot_score', '-id'], name='feed_post_hot_sco_a99c4c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(models.OrderBy(django.db.models.expressions.CombinedExpression(models.F('like_count'), '+', django.db.models.expressions.CombinedExpression(models.F('comment_count'), '*', models.Value(2))), descending=True), models.OrderBy(models.F('id'), descending=True), name='feed_post_top_idx'),
+        ),
+        migrations.RunPython(rebuild_sqlite_search_index, migrations.RunPython.noop),
+    ]
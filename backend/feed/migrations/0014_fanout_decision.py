@@ -0,0 +1,55 @@
+# Generated by Django 5.2.10 on 2026-10-17 06:22
+
+import importlib
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def record_read_directly(apps, schema_editor):
+    """Posts of authors over the threshold were read directly until now;
+    mark them so, dropping any entries they have in followers' timelines"""
+    Post = apps.get_model('feed', 'Post')
+    TimelineEntry = apps.get_model('feed', 'TimelineEntry')
+    FollowerCount = apps.get_model('feed', 'FollowerCount')
+    authors = FollowerCount.objects.filter(
+        count__gte=settings.FEED_FANOUT_MAX_FOLLOWERS
+    ).values_list('user_id', flat=True)
+    Post.objects.filter(author_id__in=authors).update(fanned_out=False)
+    TimelineEntry.objects.filter(post__author_id__in=authors).exclude(
+        user_id=models.F('post__author_id')
+    ).delete()
+
+
+def rebuild_sqlite_search_index(apps, schema_editor):
+    """SQLite adds the column by rebuilding feed_post, which drops the
+    full-text triggers of migration 0011; recreate that index"""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    search = importlib.import_module('feed.migrations.0011_search_index')
+    for statement in search.SQLITE_REVERSE + search.SQLITE_FORWARD:
+        schema_editor.execute(statement.format(table='feed_post'), params=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feed', '0013_follow_timelines'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        # Unapplying drops fanned_out with another rebuild; this runs after it
+        migrations.RunPython(migrations.RunPython.noop, rebuild_sqlite_search_index),
+        migrations.AddField(
+            model_name='post',
+            name='fanned_out',
+            field=models.BooleanField(default=True),
+        ),
+        migrations.RunPython(record_read_directly, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(condition=models.Q(('fanned_out', False)), fields=['author', '-created_at', '-id'], name='feed_post_read_direct_idx'),
+        ),
+        migrations.RunPython(rebuild_sqlite_search_index, migrations.RunPython.noop),
+    ]
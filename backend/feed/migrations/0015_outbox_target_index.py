@@ -0,0 +1,20 @@
+# Generated by Django 5.2.10 on 2026-10-17 06:27
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('feed', '0014_fanout_decision'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='karmaoutboxevent',
+            index=models.Index(fields=['content_type', 'object_id'], name='feed_karmao_content_db42ed_idx'),
+        ),
+    ]
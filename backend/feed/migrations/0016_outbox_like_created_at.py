@@ -0,0 +1,18 @@
+# Generated by Django 5.2.10 on 2026-10-17 06:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feed', '0015_outbox_target_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='karmaoutboxevent',
+            name='like_created_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
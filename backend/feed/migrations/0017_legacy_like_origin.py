@@ -0,0 +1,96 @@
+# Generated by Django 5.2.10 on 2026-10-17 06:41
+
+from django.db import migrations, models
+
+BATCH_SIZE = 5000
+
+
+def _typed_tables(apps):
+    """(content type id, like model, target field) for each typed like table"""
+    ContentType = apps.get_model('contenttypes', 'ContentType')
+    tables = []
+    for model_name, like_model, field in (('post', 'PostLike', 'post_id'), ('comment', 'CommentLike', 'comment_id')):
+        content_type = ContentType.objects.filter(app_label='feed', model=model_name).first()
+        if content_type is not None:
+            tables.append((content_type.id, apps.get_model('feed', like_model), field))
+    return tables
+
+
+def _legacy_row(apps, content_type_id, field):
+    Like = apps.get_model('feed', 'Like')
+    return Like.objects.filter(
+        user_id=models.OuterRef('user_id'), content_type_id=content_type_id, object_id=models.OuterRef(field)
+    )
+
+
+def mark_copied_likes(apps, schema_editor):
+    """Flag the typed likes that migration 0010 copied from a generic Like row"""
+    for content_type_id, like_model, field in _typed_tables(apps):
+        like_model.objects.filter(models.Exists(_legacy_row(apps, content_type_id, field))).update(from_legacy=True)
+
+
+def reconcile_likes(apps, schema_editor):
+    """Bring the typed tables in line with generic Like rows written by older servers.
+
+    Copies legacy likes that have no typed row yet (flagged from_legacy,
+    skipping likes whose post or comment is gone) and deletes the copied
+    likes whose legacy row an older server has since removed. Likes
+    written to the typed tables directly are left alone. Returns
+    (rows copied, rows deleted); the caller rebuilds the counters.
+    """
+    Like = apps.get_model('feed', 'Like')
+    tables = {content_type_id: (like_model, field) for content_type_id, like_model, field in _typed_tables(apps)}
+
+    before = sum(like_model.objects.count() for like_model, _field in tables.values())
+    last_pk = 0
+    while True:
+        rows = list(
+            Like.objects.filter(pk__gt=last_pk).order_by('pk').values_list(
+                'pk', 'user_id', 'content_type_id', 'object_id', 'created_at'
+            )[:BATCH_SIZE]
+        )
+        if not rows:
+            break
+        last_pk = rows[-1][0]
+        for content_type_id, (like_model, field) in tables.items():
+            target_model = like_model._meta.get_field(field[:-len('_id')]).related_model
+            batch = [row for row in rows if row[2] == content_type_id]
+            existing = set(
+                target_model.objects.filter(pk__in={row[3] for row in batch}).values_list('pk', flat=True)
+            )
+            like_model.objects.bulk_create([
+                like_model(user_id=user_id, created_at=created_at, from_legacy=True, **{field: object_id})
+                for _, user_id, _, object_id, created_at in batch
+                if object_id in existing
+            ], ignore_conflicts=True)
+    copied = sum(like_model.objects.count() for like_model, _field in tables.values()) - before
+
+    deleted = 0
+    for content_type_id, (like_model, field) in tables.items():
+        orphans = like_model.objects.filter(from_legacy=True).exclude(
+            models.Exists(_legacy_row(apps, content_type_id, field))
+        )
+        deleted += orphans.delete()[0]
+    return copied, deleted
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('feed', '0016_outbox_like_created_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='commentlike',
+            name='from_legacy',
+            field=models.BooleanField(db_default=False),
+        ),
+        migrations.AddField(
+            model_name='postlike',
+            name='from_legacy',
+            field=models.BooleanField(db_default=False),
+        ),
+        migrations.RunPython(mark_copied_likes, migrations.RunPython.noop),
+    ]
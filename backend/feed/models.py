@@ -1,9 +1,20 @@
-from django.db import models
+import math
+
+from django.conf import settings
+from django.db import models, transaction, IntegrityError
+from django.db.models import F, Q, Sum
 from django.contrib.auth.models import User
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.contenttypes.fields import GenericForeignKey, GenericRelation
 from django.utils import timezone
-from datetime import timedelta
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+# A comment counts as this many likes in the hot and top feed rankings
+COMMENT_WEIGHT = 2
+
+# Deepest reply allowed (roots are depth 0); Comment.path stores one
+# PATH_SEGMENT_WIDTH-character segment per level in its 1024 characters
+MAX_COMMENT_DEPTH = 100
 
 
 class Post(models.Model):
@@ -12,24 +23,58 @@ class Post(models.Model):
     content = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
-    # Generic relation for likes
-    likes = GenericRelation('Like', related_query_name='post')
+    # Denormalized counters, maintained alongside Like/Comment writes
+    like_count = models.PositiveIntegerField(default=0)
+    comment_count = models.PositiveIntegerField(default=0)
+    # Rank in the ?ordering=hot feed, kept up to date by the counter writes
+    hot_score = models.FloatField(default=0)
+    # False once fan-out skipped the post because its author had too many
+    # followers: they read it directly rather than from timeline entries
+    fanned_out = models.BooleanField(default=True)
+    # Rows of the superseded generic Like table; likes now live in PostLike
+    legacy_likes = GenericRelation('Like', related_query_name='post')
+
+    HOT_EPOCH = datetime(2025, 1, 1, tzinfo=dt_timezone.utc)
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Backs keyset pagination of the feed on (created_at, id)
+            models.Index(fields=['-created_at', '-id']),
+            # ... and of one author's posts, read into followers' timelines
+            models.Index(fields=['author', '-created_at', '-id']),
+            models.Index(
+                fields=['author', '-created_at', '-id'], condition=Q(fanned_out=False), name='feed_post_read_direct_idx'
+            ),
+            # ... and of the hot and top rankings
+            models.Index(fields=['-hot_score', '-id']),
+            models.Index(
+                (F('like_count') + F('comment_count') * COMMENT_WEIGHT).desc(), F('id').desc(), name='feed_post_top_idx'
+            ),
+        ]
 
     def __str__(self):
         return f"Post by {self.author.username} - {self.content[:50]}"
 
-    @property
-    def like_count(self):
-        """Get the number of likes on this post"""
-        return self.likes.count()
+    @classmethod
+    def compute_hot_score(cls, created_at, like_count, comment_count):
+        """log2(1 + engagement) plus the post's age in half-lives since HOT_EPOCH.
+
+        That ranks posts exactly as engagement halving every
+        FEED_HOT_HALF_LIFE_HOURS would, but a stored score never has to
+        change just because time passes: only when the counters do.
+        """
+        half_life = settings.FEED_HOT_HALF_LIFE_HOURS * 3600
+        engagement = like_count + comment_count * COMMENT_WEIGHT
+        return math.log2(1 + engagement) + (created_at - cls.HOT_EPOCH).total_seconds() / half_life
 
-    @property
-    def comment_count(self):
-        """Get the total number of comments (including nested)"""
-        return self.comments.count()
+    def save(self, *args, **kwargs):
+        """Score a new post so it enters the hot feed at its place"""
+        if self._state.adding:
+            self.hot_score = self.compute_hot_score(
+                self.created_at or timezone.now(), self.like_count, self.comment_count
+            )
+        super().save(*args, **kwargs)
 
 
 class Comment(models.Model):
@@ -46,34 +91,99 @@ class Comment(models.Model):
     )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
-    # Generic relation for likes
-    likes = GenericRelation('Like', related_query_name='comment')
+    # Materialized path: the ancestors' ids then this comment's id, each as a
+    # fixed-width segment, so sorting by path yields depth-first display order
+    path = models.CharField(max_length=1024, blank=True, default='')
+    depth = models.PositiveIntegerField(default=0)
+    # Denormalized counters, maintained alongside Like/Comment writes
+    like_count = models.PositiveIntegerField(default=0)
+    reply_count = models.PositiveIntegerField(default=0)
+    # Rows of the superseded generic Like table; likes now live in CommentLike
+    legacy_likes = GenericRelation('Like', related_query_name='comment')
+
+    PATH_DIGITS = '0123456789abcdefghijklmnopqrstuvwxyz'
+    PATH_SEGMENT_WIDTH = 8
 
     class Meta:
         ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['post', 'path']),
+            # Next page of siblings: roots of a post, or replies of one comment
+            models.Index(fields=['post', 'parent', 'path']),
+        ]
 
     def __str__(self):
-        return f"Comment by {self.author.username} on {self.post.id}"
+        return f"Comment by {self.author.username} on {self.post_id}"
 
-    @property
-    def like_count(self):
-        """Get the number of likes on this comment"""
-        return self.likes.count()
+    @classmethod
+    def path_segment(cls, pk):
+        """Encode an id as a fixed-width base-36 segment (ids up to 36**8 - 1)"""
+        digits = cls.PATH_DIGITS
+        encoded = ''
+        while pk:
+            pk, remainder = divmod(pk, 36)
+            encoded = digits[remainder] + encoded
+        return encoded.rjust(cls.PATH_SEGMENT_WIDTH, '0')
+
+    @staticmethod
+    def _path_upper_bound(path):
+        """Smallest path that sorts after every path starting with ``path``"""
+        digits = Comment.PATH_DIGITS
+        stripped = path.rstrip('z')
+        if not stripped:
+            return None
+        return stripped[:-1] + digits[digits.index(stripped[-1]) + 1]
+
+    def save(self, *args, **kwargs):
+        """Set depth and materialized path when the comment is first inserted"""
+        if not self._state.adding or self.path:
+            return super().save(*args, **kwargs)
 
-    def get_depth(self):
-        """Calculate the depth of nested comments"""
-        depth = 0
         parent = self.parent
-        while parent:
-            depth += 1
-            parent = parent.parent
-            if depth > 10:  # Safety limit
-                break
-        return depth
+        self.depth = parent.depth + 1 if parent else 0
+        if self.depth > MAX_COMMENT_DEPTH:
+            raise ValueError(f'Comments can be nested at most {MAX_COMMENT_DEPTH} levels deep')
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            # The path ends with our own id, which only exists after the insert
+            self.path = (parent.path if parent else '') + self.path_segment(self.pk)
+            Comment.objects.filter(pk=self.pk).update(path=self.path)
+
+    def get_depth(self):
+        """Get the depth of this comment in its thread (0 for root comments)"""
+        return self.depth
+
+    def get_subtree(self, max_depth=None):
+        """This comment and all its descendants in display order, via one range scan"""
+        return Comment.get_thread(self.post_id, max_depth=max_depth, root_path=self.path)
+
+    @classmethod
+    def get_thread(cls, post_id, max_depth=None, root_path=''):
+        """Comments of a post (optionally one subtree) in display order.
+
+        Uses the (post, path) index: a path prefix is a contiguous key range,
+        so this is a single ordered range scan with no recursion.
+        """
+        queryset = cls.objects.filter(post_id=post_id)
+        if root_path:
+            # Expressed as a key range rather than LIKE 'prefix%' so the
+            # (post, path) btree serves it on every backend and collation
+            queryset = queryset.filter(path__gte=root_path)
+            upper = cls._path_upper_bound(root_path)
+            if upper:
+                queryset = queryset.filter(path__lt=upper)
+        if max_depth is not None:
+            queryset = queryset.filter(depth__lte=max_depth)
+        return queryset.order_by('path')
 
 
 class Like(models.Model):
-    """Generic Like model that can be used for both Posts and Comments"""
+    """Generic Like model that can be used for both Posts and Comments.
+
+    Superseded by PostLike and CommentLike, which the app reads and writes;
+    kept until every deployment has run the copy in migration 0010. The app
+    only deletes from it, when a like copied from here is unliked.
+    """
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='likes')
     content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
     object_id = models.PositiveIntegerField()
@@ -90,6 +200,84 @@ class Like(models.Model):
         return f"{self.user.username} liked {self.content_type.model} {self.object_id}"
 
 
+class BaseLike(models.Model):
+    """Shared behaviour of the typed like tables; ``target_field`` names the liked FK"""
+    target_field = None
+
+    # Copied from a generic Like row, which an older server may still delete;
+    # copy_legacy_likes then removes this row too. Unliking it deletes that
+    # row, so a later copy does not bring it back. A database default, since
+    # likes are also inserted with raw SQL.
+    from_legacy = models.BooleanField(db_default=False)
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def get_liked_ids(cls, user, object_ids):
+        """Return the subset of object_ids liked by user, in one query"""
+        if not user or not user.is_authenticated:
+            return set()
+        return set(cls._liked_ids_queryset(user, object_ids))
+
+    @classmethod
+    async def aget_liked_ids(cls, user, object_ids):
+        """get_liked_ids for async views"""
+        if not user or not user.is_authenticated:
+            return set()
+        return {pk async for pk in cls._liked_ids_queryset(user, object_ids)}
+
+    @classmethod
+    def _liked_ids_queryset(cls, user, object_ids):
+        return cls.objects.filter(
+            user=user,
+            **{f'{cls.target_field}__in': object_ids}
+        ).values_list(f'{cls.target_field}_id', flat=True)
+
+
+class PostLike(BaseLike):
+    """A user's like on a post"""
+    target_field = 'post'
+
+    # The unique (user, post) index covers lookups by user
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='post_likes', db_index=False)
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='likes')
+    # default rather than auto_now_add so copied legacy likes keep their time
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'post'], name='unique_post_like'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} liked post {self.post_id}"
+
+
+class CommentLike(BaseLike):
+    """A user's like on a comment"""
+    target_field = 'comment'
+
+    # The unique (user, comment) index covers lookups by user
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='comment_likes', db_index=False)
+    comment = models.ForeignKey(Comment, on_delete=models.CASCADE, related_name='likes')
+    # default rather than auto_now_add so copied legacy likes keep their time
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'comment'], name='unique_comment_like'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} liked comment {self.comment_id}"
+
+
+def truncate_to_hour(value):
+    """Floor an aware datetime to the start of its UTC hour"""
+    return value.astimezone(dt_timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+
 class KarmaTransaction(models.Model):
     """Tracks karma changes for leaderboard calculations"""
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='karma_transactions')
@@ -97,7 +285,18 @@ class KarmaTransaction(models.Model):
     content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
     object_id = models.PositiveIntegerField()
     content_object = GenericForeignKey('content_type', 'object_id')
-    created_at = models.DateTimeField(auto_now_add=True)
+    # The like that earned this karma, so an unlike reverses it by key. No
+    # database constraint: the like row is deleted before the outbox drain
+    # removes the transaction.
+    post_like = models.ForeignKey(
+        PostLike, null=True, blank=True, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+'
+    )
+    comment_like = models.ForeignKey(
+        CommentLike, null=True, blank=True, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+'
+    )
+    # default rather than auto_now_add so the hourly bucket always matches
+    # the stored timestamp, including back-dated rows
+    created_at = models.DateTimeField(default=timezone.now)
 
     class Meta:
         ordering = ['-created_at']
@@ -109,15 +308,252 @@ class KarmaTransaction(models.Model):
     def __str__(self):
         return f"{self.user.username}: {self.amount:+d} karma at {self.created_at}"
 
+    def save(self, *args, **kwargs):
+        """Insert the transaction and roll it into its hourly bucket atomically"""
+        if self._state.adding:
+            with transaction.atomic():
+                super().save(*args, **kwargs)
+                KarmaHourlyBucket.apply(self.user_id, self.created_at, self.amount, 1)
+        else:
+            super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        """Delete the transaction and take it back out of its hourly bucket"""
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            KarmaHourlyBucket.apply(self.user_id, self.created_at, -self.amount, -1)
+        return result
+
     @classmethod
-    def get_24h_karma_by_user(cls):
+    def get_karma_by_user_since(cls, cutoff_time=None):
+        """Sum karma per user for transactions at or after cutoff_time.
+
+        Whole hours come from the pre-aggregated hourly buckets (at most 24
+        rows per user for a day); only the partial oldest hour is read from
+        the raw ledger, so the result is exactly what a SUM over transactions
+        with created_at >= cutoff_time would return. A cutoff of None sums
+        every bucket plus the lifetime totals that expired days were folded
+        into (all-time karma); a cutoff older than the ledger retention only
+        sees what has not been folded yet. Returns {user_id: total}.
+        """
+        buckets = KarmaHourlyBucket.objects.filter(transaction_count__gt=0)
+        first_full_hour = cutoff_time
+        if cutoff_time is not None:
+            first_full_hour = truncate_to_hour(cutoff_time)
+            if first_full_hour < cutoff_time:
+                first_full_hour += timedelta(hours=1)
+            buckets = buckets.filter(hour__gte=first_full_hour)
+
+        totals = {}
+        if cutoff_time is None:
+            totals.update(KarmaLifetimeTotal.objects.exclude(amount=0).values_list('user', 'amount'))
+        buckets = buckets.values('user').annotate(total=Sum('amount'))
+        for row in buckets:
+            totals[row['user']] = totals.get(row['user'], 0) + row['total']
+
+        if cutoff_time is not None and first_full_hour > cutoff_time:
+            partial = cls.objects.filter(
+                created_at__gte=cutoff_time,
+                created_at__lt=first_full_hour
+            ).order_by().values('user').annotate(total=Sum('amount'))
+            for row in partial:
+                totals[row['user']] = totals.get(row['user'], 0) + row['total']
+        return totals
+
+    @classmethod
+    def get_24h_karma_by_user(cls, limit=5):
         """Calculate karma earned in the last 24 hours grouped by user"""
-        from django.db.models import Sum
-        from django.utils import timezone
-        
         cutoff_time = timezone.now() - timedelta(hours=24)
-        return cls.objects.filter(
-            created_at__gte=cutoff_time
-        ).values('user').annotate(
-            total_karma=Sum('amount')
-        ).order_by('-total_karma')[:5]
+        totals = cls.get_karma_by_user_since(cutoff_time)
+        ranked = sorted(totals.items(), key=lambda item: (-item[1], item[0]))[:limit]
+        return [{'user': user_id, 'total_karma': total} for user_id, total in ranked]
+
+
+class KarmaHourlyBucket(models.Model):
+    """Per-user karma rolled up by UTC hour, kept in step with KarmaTransaction"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='karma_buckets')
+    hour = models.DateTimeField()
+    amount = models.IntegerField(default=0)
+    transaction_count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'hour'], name='unique_karma_bucket_per_hour'),
+        ]
+        indexes = [
+            models.Index(fields=['hour']),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} @ {self.hour:%Y-%m-%d %H:00}: {self.amount:+d} karma"
+
+    @classmethod
+    def apply(cls, user_id, created_at, amount, transaction_delta):
+        """Add amount/transaction_delta to the bucket covering created_at"""
+        from .leaderboard import invalidate_leaderboards
+
+        invalidate_leaderboards()
+        hour = truncate_to_hour(created_at)
+        updates = {
+            'amount': F('amount') + amount,
+            'transaction_count': F('transaction_count') + transaction_delta,
+        }
+        if cls.objects.filter(user_id=user_id, hour=hour).update(**updates):
+            return
+        try:
+            with transaction.atomic():
+                cls.objects.create(
+                    user_id=user_id,
+                    hour=hour,
+                    amount=amount,
+                    transaction_count=transaction_delta
+                )
+        except IntegrityError:
+            # Another writer created the bucket first
+            cls.objects.filter(user_id=user_id, hour=hour).update(**updates)
+
+
+class KarmaLifetimeTotal(models.Model):
+    """Per-user karma folded out of ledger days older than the retention period"""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='karma_lifetime')
+    amount = models.IntegerField(default=0)
+    transaction_count = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.user_id}: {self.amount:+d} lifetime karma"
+
+    @classmethod
+    def apply(cls, user_id, amount, transaction_delta):
+        """Add folded karma to a user's lifetime total"""
+        updates = {
+            'amount': F('amount') + amount,
+            'transaction_count': F('transaction_count') + transaction_delta,
+        }
+        if cls.objects.filter(user_id=user_id).update(**updates):
+            return
+        try:
+            with transaction.atomic():
+                cls.objects.create(user_id=user_id, amount=amount, transaction_count=transaction_delta)
+        except IntegrityError:
+            # Another writer created the row first
+            cls.objects.filter(user_id=user_id).update(**updates)
+
+
+class KarmaOutboxEvent(models.Model):
+    """Pending karma side-effect of a like toggle, written in the like's transaction.
+
+    The drain_karma_outbox worker applies events in id order and deletes
+    them in the same transaction that writes the karma ledger, so each
+    event takes effect exactly once.
+    """
+    LIKE = 'like'
+    UNLIKE = 'unlike'
+    KIND_CHOICES = [(LIKE, 'Like'), (UNLIKE, 'Unlike')]
+
+    kind = models.CharField(max_length=8, choices=KIND_CHOICES)
+    recipient = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    amount = models.IntegerField()
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE, related_name='+')
+    object_id = models.PositiveIntegerField()
+    # Id of the PostLike/CommentLike (matching content_type) that was added or removed
+    like_id = models.BigIntegerField(null=True, blank=True)
+    # When a removed like was made, so an unlike whose ledger row has been
+    # folded into lifetime totals can be reversed there
+    like_created_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            # The inline drain claims the pending events of the objects it liked
+            models.Index(fields=['content_type', 'object_id']),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.content_type_id}:{self.object_id} -> {self.recipient_id} ({self.amount:+d})"
+
+
+class Follow(models.Model):
+    """follower sees followee's posts in their home timeline"""
+    follower = models.ForeignKey(User, on_delete=models.CASCADE, related_name='following')
+    followee = models.ForeignKey(User, on_delete=models.CASCADE, related_name='followers')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['follower', 'followee'], name='unique_follow'),
+            models.CheckConstraint(condition=~models.Q(follower=F('followee')), name='no_self_follow'),
+        ]
+        indexes = [
+            # Fan-out walks an author's followers in id order
+            models.Index(fields=['followee', 'id']),
+        ]
+
+    def __str__(self):
+        return f"{self.follower_id} follows {self.followee_id}"
+
+
+class FollowerCount(models.Model):
+    """Denormalized number of followers, maintained alongside Follow writes"""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='follower_count')
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['count']),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id}: {self.count} followers"
+
+    @classmethod
+    def apply(cls, user_id, delta):
+        """Add delta to a user's follower count"""
+        if cls.objects.filter(user_id=user_id).update(count=F('count') + delta):
+            return
+        try:
+            with transaction.atomic():
+                cls.objects.create(user_id=user_id, count=max(delta, 0))
+        except IntegrityError:
+            # Another writer created the row first
+            cls.objects.filter(user_id=user_id).update(count=F('count') + delta)
+
+
+class TimelineEntry(models.Model):
+    """A post materialized into one user's home timeline by fan-out on write.
+
+    created_at copies the post's, so a timeline pages on the same
+    (created_at, post id) key as posts read from their authors directly.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='+')
+    created_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'post'], name='unique_timeline_entry'),
+        ]
+        indexes = [
+            # Backs keyset pagination of a timeline
+            models.Index(fields=['user', '-created_at', '-post']),
+        ]
+
+    def __str__(self):
+        return f"post {self.post_id} in {self.user_id}'s timeline"
+
+
+class FanoutEvent(models.Model):
+    """A new post waiting to be copied into its author's followers' timelines.
+
+    Written in the post's transaction; the fan_out_timelines worker (or
+    the inline drain) processes events in id order and deletes each one
+    in the transaction that writes its timeline entries.
+    """
+    post = models.OneToOneField(Post, on_delete=models.CASCADE, related_name='+')
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['id']
+
+    def __str__(self):
+        return f"fan out post {self.post_id}"
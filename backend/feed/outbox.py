@@ -0,0 +1,148 @@
+from collections import defaultdict
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+from .leaderboard import invalidate_leaderboards
+from .models import (
+    Comment, KarmaOutboxEvent, KarmaTransaction, KarmaHourlyBucket, KarmaLifetimeTotal, truncate_to_hour
+)
+from .retention import get_retention_cutoff
+
+
+def enqueue_karma(kind, recipient_id, amount, content_type, object_id, like_id=None, like_created_at=None):
+    """Record a like/unlike karma side-effect in the caller's transaction.
+
+    like_id is the PostLike/CommentLike row that was added or removed; the
+    ledger row for a like points at it so the unlike removes it by key.
+    For an unlike, like_created_at is when the removed like was made.
+
+    With KARMA_OUTBOX_INLINE (the default) the event is drained right after
+    the surrounding transaction commits, outside the like row's locks; set
+    it to False when a drain_karma_outbox worker is running.
+    """
+    event = KarmaOutboxEvent.objects.create(
+        kind=kind,
+        recipient_id=recipient_id,
+        amount=amount,
+        content_type=content_type,
+        object_id=object_id,
+        like_id=like_id,
+        like_created_at=like_created_at
+    )
+    if getattr(settings, 'KARMA_OUTBOX_INLINE', True):
+        transaction.on_commit(lambda: drain_outbox(event_ids=[event.id]))
+
+
+def _like_field(content_type_id):
+    """KarmaTransaction column referencing the like for a content type"""
+    model = ContentType.objects.get_for_id(content_type_id).model_class()
+    return 'comment_like_id' if model is Comment else 'post_like_id'
+
+
+def _find_ledger_row(event, exclude_ids):
+    """The ledger row an unlike reverses: by like id, else the latest unlinked match"""
+    if event.like_id is not None:
+        karma_tx = KarmaTransaction.objects.filter(**{_like_field(event.content_type_id): event.like_id}).first()
+        if karma_tx:
+            return karma_tx
+    # Karma written before ledger rows referenced their like
+    return KarmaTransaction.objects.filter(
+        user_id=event.recipient_id,
+        content_type_id=event.content_type_id,
+        object_id=event.object_id,
+        amount=event.amount,
+        post_like__isnull=True,
+        comment_like__isnull=True
+    ).exclude(id__in=exclude_ids).order_by('-created_at').first()
+
+
+def drain_outbox(batch_size=500, event_ids=None):
+    """Apply one batch of pending events; returns how many were processed.
+
+    Events are claimed with SELECT ... FOR UPDATE in id order, so
+    concurrent workers serialize rather than reorder a like and its unlike.
+    Likes become one bulk_create of ledger rows, an unlike cancels its like
+    from the same batch or deletes the ledger row keyed by its like id, and
+    hourly buckets receive one aggregated delta per (user, hour). An unlike
+    of a like older than the retention cutoff whose row is gone (pruned
+    into lifetime totals) is subtracted from KarmaLifetimeTotal instead.
+
+    ``event_ids`` (the inline drain's own events) restricts the batch to
+    the pending events for the same liked objects, so a request locks only
+    those rows and still applies an earlier like before its unlike.
+    """
+    with transaction.atomic():
+        events = KarmaOutboxEvent.objects.select_for_update().order_by('id')
+        if event_ids is not None:
+            events = events.filter(Exists(KarmaOutboxEvent.objects.filter(
+                id__in=event_ids, content_type_id=OuterRef('content_type_id'), object_id=OuterRef('object_id')
+            )))
+        events = list(events[:batch_size])
+        if not events:
+            return 0
+
+        pending = defaultdict(list)  # like (or legacy object) key -> unsaved ledger rows
+        to_delete = []
+        folded = defaultdict(lambda: [0, 0])  # user -> lifetime delta of unlikes of pruned likes
+        cutoff = None
+        for event in events:
+            if event.like_id is not None:
+                key = (event.content_type_id, event.like_id)
+            else:
+                key = (event.recipient_id, event.content_type_id, event.object_id)
+            if event.kind == KarmaOutboxEvent.LIKE:
+                like_ref = {_like_field(event.content_type_id): event.like_id} if event.like_id else {}
+                pending[key].append(KarmaTransaction(
+                    user_id=event.recipient_id,
+                    amount=event.amount,
+                    content_type_id=event.content_type_id,
+                    object_id=event.object_id,
+                    created_at=event.created_at,
+                    **like_ref
+                ))
+            elif pending[key]:
+                # Liked and unliked within the batch: the pair never reaches the ledger
+                pending[key].pop()
+            else:
+                karma_tx = _find_ledger_row(event, [tx.id for tx in to_delete])
+                if karma_tx and karma_tx.id not in {tx.id for tx in to_delete}:
+                    to_delete.append(karma_tx)
+                elif karma_tx is None and event.like_created_at is not None:
+                    cutoff = cutoff or get_retention_cutoff()
+                    if event.like_created_at < cutoff:
+                        folded[event.recipient_id][0] -= event.amount
+                        folded[event.recipient_id][1] -= 1
+
+        created = [tx for rows in pending.values() for tx in rows]
+        KarmaTransaction.objects.bulk_create(created)
+        KarmaTransaction.objects.filter(id__in=[tx.id for tx in to_delete]).delete()
+
+        deltas = defaultdict(lambda: [0, 0])
+        for tx in created:
+            delta = deltas[(tx.user_id, truncate_to_hour(tx.created_at))]
+            delta[0] += tx.amount
+            delta[1] += 1
+        for tx in to_delete:
+            delta = deltas[(tx.user_id, truncate_to_hour(tx.created_at))]
+            delta[0] -= tx.amount
+            delta[1] -= 1
+        for (user_id, hour), (amount, count) in deltas.items():
+            if amount or count:
+                KarmaHourlyBucket.apply(user_id, hour, amount, count)
+        if folded:
+            invalidate_leaderboards()
+        for user_id, (amount, count) in folded.items():
+            KarmaLifetimeTotal.apply(user_id, amount, count)
+
+        KarmaOutboxEvent.objects.filter(id__in=[event.id for event in events]).delete()
+        return len(events)
+
+
+def get_outbox_stats():
+    """Pending event count and lag (seconds since the oldest pending event)"""
+    oldest = KarmaOutboxEvent.objects.order_by('id').values_list('created_at', flat=True).first()
+    lag = (timezone.now() - oldest).total_seconds() if oldest else 0.0
+    return {'pending': KarmaOutboxEvent.objects.count(), 'lag_seconds': lag}
@@ -0,0 +1,160 @@
+import base64
+import binascii
+from datetime import datetime
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def encode_cursor(value, pk, reverse=False):
+    """Encode a (created_at or score, id) position into an opaque URL-safe token"""
+    value = value.isoformat() if isinstance(value, datetime) else repr(value)
+    raw = f"{'r' if reverse else 'f'}|{value}|{pk}"
+    return base64.urlsafe_b64encode(raw.encode('ascii')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token, parse_value=datetime.fromisoformat):
+    """Decode a cursor token back into (value, id, reverse)"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode('ascii')).decode('ascii')
+        direction, value, pk = raw.split('|')
+        if direction not in ('f', 'r'):
+            raise ValueError(direction)
+        return parse_value(value), int(pk), direction == 'r'
+    except (TypeError, ValueError, UnicodeError, binascii.Error):
+        raise NotFound('Invalid cursor')
+
+
+class KeysetPagination(BasePagination):
+    """Keyset (cursor) pagination on (created_at, id), newest first.
+
+    Each page is a single indexed range scan: no COUNT(*) and no OFFSET,
+    so the cost is the same at any depth and pages stay stable when new
+    posts are inserted at the head of the feed. Pass ``ordering_field``
+    (and the ``parse_value`` that reads it back from a cursor) to page by
+    another descending column, such as a ranking score.
+    """
+    page_size = api_settings.PAGE_SIZE
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+
+    def __init__(self, ordering_field='created_at', parse_value=datetime.fromisoformat):
+        self.ordering_field = ordering_field
+        self.parse_value = parse_value
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+            if size > 0:
+                return min(size, self.max_page_size)
+        except (KeyError, ValueError):
+            pass
+        return self.page_size
+
+    def _page_queryset(self, queryset, request):
+        """Apply the cursor and page size; returns the slice to fetch and the cursor token"""
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+
+        field = self.ordering_field
+        token = request.query_params.get(self.cursor_query_param)
+        self.reverse = False
+        if token:
+            value, pk, self.reverse = decode_cursor(token, self.parse_value)
+            if self.reverse:
+                queryset = queryset.filter(
+                    Q(**{f'{field}__gt': value}) | Q(**{field: value, 'id__gt': pk})
+                ).order_by(field, 'id')
+            else:
+                queryset = queryset.filter(
+                    Q(**{f'{field}__lt': value}) | Q(**{field: value, 'id__lt': pk})
+                ).order_by(f'-{field}', '-id')
+        else:
+            queryset = queryset.order_by(f'-{field}', '-id')
+
+        # Fetch one extra row to know whether another page exists
+        return queryset[:self.page_size + 1], token
+
+    def _set_page(self, rows, token):
+        self.has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if self.reverse:
+            rows.reverse()
+
+        self.page = rows
+        self.has_next = bool(token) if self.reverse else self.has_more
+        self.has_previous = self.has_more if self.reverse else bool(token)
+        return rows
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset, token = self._page_queryset(queryset, request)
+        return self._set_page(list(queryset), token)
+
+    async def apaginate_queryset(self, queryset, request):
+        """paginate_queryset for async views, fetching the page with the async ORM"""
+        queryset, token = self._page_queryset(queryset, request)
+        return self._set_page([row async for row in queryset], token)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        last = self.page[-1]
+        return replace_query_param(
+            self.base_url, self.cursor_query_param, encode_cursor(getattr(last, self.ordering_field), last.id)
+        )
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        first = self.page[0]
+        return replace_query_param(
+            self.base_url, self.cursor_query_param,
+            encode_cursor(getattr(first, self.ordering_field), first.id, reverse=True)
+        )
+
+    def get_paginated_data(self, data):
+        return {
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        }
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+def encode_thread_cursor(parent_id, after_path):
+    """Encode a comment-thread continuation: siblings under parent_id after after_path"""
+    raw = f"{parent_id or ''}|{after_path}"
+    return base64.urlsafe_b64encode(raw.encode('ascii')).decode('ascii').rstrip('=')
+
+
+def decode_thread_cursor(token):
+    """Decode a thread cursor back into (parent_id or None, after_path)"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode('ascii')).decode('ascii')
+        parent_id, after_path = raw.split('|')
+        return (int(parent_id) if parent_id else None), after_path
+    except (TypeError, ValueError, UnicodeError, binascii.Error):
+        raise NotFound('Invalid cursor')
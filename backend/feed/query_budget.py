@@ -0,0 +1,150 @@
+from collections import defaultdict
+
+from django.contrib.auth.models import User
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from .counters import rebuild_counters
+from .leaderboard import WINDOWS as LEADERBOARD_WINDOWS, invalidate_leaderboards
+from .models import (
+    Comment, CommentLike, Follow, FollowerCount, KarmaHourlyBucket, KarmaTransaction, Post, PostLike,
+    TimelineEntry, truncate_to_hour
+)
+
+# (posts, comments on the measured post); the feed page holds up to 20 posts
+SCALES = ((1, 1), (20, 100), (20, 10000))
+
+# (name, method, path, body, query budget) for an authenticated viewer with
+# cold caches, counting the session read of the database session engine
+# (the cache engine used with REDIS_URL saves that query). Paths are
+# formatted with the ids returned by seed(); write endpoints run in the
+# order listed; seed() leaves the measured post and comment liked, so each
+# scale unlikes then likes them again.
+ENDPOINTS = [
+    ('feed', 'GET', '/api/posts/', None, 4),
+    ('feed page-number', 'GET', '/api/posts/?page=1', None, 5),
+    ('feed hot', 'GET', '/api/posts/?ordering=hot', None, 4),
+    ('feed top', 'GET', '/api/posts/?ordering=top&window=all', None, 4),
+    ('post detail', 'GET', '/api/posts/{post}/', None, 7),
+    ('thread continuation', 'GET', '{comments_next}', None, 7),
+    ('comment list', 'GET', '/api/comments/', None, 5),
+    ('comment detail', 'GET', '/api/comments/{comment}/', None, 4),
+    ('check auth', 'GET', '/api/check-auth/', None, 2),
+    ('current user', 'GET', '/api/current-user/', None, 2),
+    ('create post', 'POST', '/api/posts/', {'content': 'Budget post'}, 7),
+    ('create comment', 'POST', '/api/posts/{post}/comments/', {'content': 'Budget reply', 'parent_id': '{comment}'}, 12),
+    ('unlike post', 'DELETE', '/api/posts/{post}/like/', None, 9),
+    ('like post', 'PUT', '/api/posts/{post}/like/', None, 8),
+    ('unlike comment', 'DELETE', '/api/comments/{comment}/like/', None, 9),
+    ('like comment', 'PUT', '/api/comments/{comment}/like/', None, 9),
+    ('home timeline', 'GET', '/api/timeline/', None, 5),
+    ('unfollow author', 'DELETE', '/api/users/{author}/follow/', None, 8),
+    ('follow author', 'PUT', '/api/users/{author}/follow/', None, 12),
+] + [
+    (f'leaderboard {window}', 'GET', f'/api/leaderboard/?window={window}', None, 5)
+    for window in LEADERBOARD_WINDOWS
+]
+
+
+def _create_comments(post, authors, count):
+    """Bulk-create a thread: a tenth roots, the rest replies two levels deep"""
+    created = []
+    parents = [None]
+    remaining = count
+    for depth in range(3):
+        size = remaining if depth == 2 else max(1, min(remaining, count // 10 if depth == 0 else remaining // 2))
+        if size <= 0 or not parents:
+            break
+        level = Comment.objects.bulk_create([
+            Comment(
+                post=post, author=authors[i % len(authors)], content=f'Comment {depth}.{i}',
+                parent=parents[i % len(parents)], depth=depth, path='-',
+            )
+            for i in range(size)
+        ])
+        for comment in level:
+            parent = comment.parent
+            comment.path = (parent.path if parent else '') + Comment.path_segment(comment.pk)
+        Comment.objects.bulk_update(level, ['path'], batch_size=1000)
+        created.extend(level)
+        parents = level
+        remaining -= size
+    return created
+
+
+def seed(viewer, posts, comments, existing=None):
+    """Grow the data set to ``posts`` posts and ``comments`` comments on the first.
+
+    The viewer likes every other post and comment, follows every author
+    with each post in their timeline, and karma rows exist, so viewer
+    state, timelines and leaderboards have something to resolve. Returns
+    the ids the ENDPOINTS paths refer to.
+    """
+    existing = existing or {'posts': [], 'comments': 0}
+    authors = list(User.objects.filter(username__startswith='budget_author_'))
+    if not authors:
+        authors = User.objects.bulk_create([User(username=f'budget_author_{i}') for i in range(5)])
+        Follow.objects.bulk_create([Follow(follower=viewer, followee=author) for author in authors])
+        FollowerCount.objects.bulk_create([FollowerCount(user=author, count=1) for author in authors])
+
+    new_posts = Post.objects.bulk_create([
+        Post(author=authors[i % len(authors)], content=f'Budget post {i}')
+        for i in range(len(existing['posts']), posts)
+    ])
+    all_posts = existing['posts'] + new_posts
+    post = all_posts[0]
+    new_comments = _create_comments(post, authors, comments - existing['comments'])
+
+    TimelineEntry.objects.bulk_create(
+        [TimelineEntry(user=viewer, post=p, created_at=p.created_at) for p in new_posts], ignore_conflicts=True
+    )
+    PostLike.objects.bulk_create(
+        [PostLike(user=viewer, post=p) for p in new_posts[::2]], ignore_conflicts=True
+    )
+    CommentLike.objects.bulk_create(
+        [CommentLike(user=viewer, comment=c) for c in new_comments[::2]], ignore_conflicts=True
+    )
+    comment_type = ContentType.objects.get_for_model(Comment)
+    karma = KarmaTransaction.objects.bulk_create([
+        KarmaTransaction(user=comment.author, amount=1, content_type=comment_type, object_id=comment.id)
+        for comment in new_comments
+    ])
+    # The leaderboards read the hourly buckets, so they must match the ledger
+    buckets = defaultdict(lambda: [0, 0])
+    for tx in karma:
+        total = buckets[(tx.user_id, truncate_to_hour(tx.created_at))]
+        total[0] += tx.amount
+        total[1] += 1
+    for (user_id, hour), (amount, count) in buckets.items():
+        KarmaHourlyBucket.apply(user_id, hour, amount, count)
+    rebuild_counters()
+
+    first_comment = Comment.objects.filter(post=post, parent=None).order_by('path').first()
+    return {
+        'posts': all_posts,
+        'comments': comments,
+        'post': post.id,
+        'comment': first_comment.id,
+        'author': authors[0].id,
+    }
+
+
+def measure(client, endpoints, ids):
+    """Run each endpoint once with cold caches; returns [(name, status, queries)]"""
+    results = []
+    for name, method, path, body, _budget in endpoints:
+        path = path.format(**ids)
+        if body is not None:
+            body = {key: value.format(**ids) if isinstance(value, str) else value for key, value in body.items()}
+        cache.clear()
+        invalidate_leaderboards()
+        with CaptureQueriesContext(connection) as queries:
+            if method == 'GET':
+                response = client.get(path)
+            else:
+                response = getattr(client, method.lower())(path, body, content_type='application/json')
+        results.append((name, response.status_code, len(queries)))
+        if name == 'post detail':
+            ids['comments_next'] = response.json()['comments_next'] or path
+    return results
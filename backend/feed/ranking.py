@@ -0,0 +1,105 @@
+import math
+from datetime import datetime, timedelta
+
+from django.db import transaction
+from django.db.models import F, Value
+from django.db.models.functions import Log
+from django.utils import timezone
+from .models import COMMENT_WEIGHT, Post
+
+# Feed orderings (?ordering=) and the windows (?window=) of the top ranking;
+# None means all-time
+ORDERINGS = ('recent', 'hot', 'top')
+DEFAULT_ORDERING = 'recent'
+TOP_WINDOWS = {
+    '24h': timedelta(hours=24),
+    '7d': timedelta(days=7),
+    '30d': timedelta(days=30),
+    'all': None,
+}
+DEFAULT_TOP_WINDOW = '7d'
+
+# Ordering -> (keyset column, parser for its value in a cursor)
+KEYSET_FIELDS = {
+    'recent': ('created_at', datetime.fromisoformat),
+    'hot': ('hot_score', float),
+    'top': ('top_score', int),
+}
+
+
+class _Literal(Value):
+    """An integer written into the SQL instead of bound as a parameter.
+
+    Indexes on expressions only serve queries that spell the expression the
+    same way, and SQLite never matches a bound parameter against one.
+    """
+
+    def as_sql(self, compiler, connection):
+        return str(int(self.value)), []
+
+
+def _engagement():
+    # Must match the expression of the feed_post_top_idx index
+    return F('like_count') + F('comment_count') * _Literal(COMMENT_WEIGHT)
+
+
+def hot_score_change(like_delta=0, comment_delta=0):
+    """Expression for a post's hot_score after a counter change, for use in
+    the same UPDATE that applies the change: it reads the old counters"""
+    before = _engagement() + 1
+    after = before + like_delta + comment_delta * COMMENT_WEIGHT
+    return F('hot_score') + Log(Value(2), after) - Log(Value(2), before)
+
+
+def rank_posts(queryset, ordering, window=DEFAULT_TOP_WINDOW):
+    """Order a post queryset for the feed: newest, hottest, or most engaged
+    within ``window``. Ties fall back to the newest id, as keyset paging needs.
+
+    All-time top walks feed_post_top_idx and stops after a page. A windowed
+    top reads the window's posts as one range of the created_at index and
+    sorts them, so its cost follows the posts created within the window, not
+    the table size; an index can't order by engagement within a time range.
+    """
+    if ordering == 'hot':
+        return queryset.order_by('-hot_score', '-id')
+    if ordering == 'top':
+        if TOP_WINDOWS[window] is None:
+            return queryset.annotate(top_score=_engagement()).order_by('-top_score', '-id')
+        # "+ 0" keeps the planner from walking feed_post_top_idx and skipping
+        # posts outside the window, which reads every older popular post
+        # whenever the window is quiet
+        queryset = queryset.annotate(top_score=_engagement() + _Literal(0))
+        queryset = queryset.filter(created_at__gte=timezone.now() - TOP_WINDOWS[window])
+        return queryset.order_by('-top_score', '-id')
+    return queryset.order_by('-created_at', '-id')
+
+
+def refresh_hot_scores(batch_size=5000):
+    """Recompute every post's hot_score from its counters.
+
+    The in-place updates keep scores current; this reconciles posts whose
+    counters were rebuilt or bulk-loaded and applies a changed half-life.
+    Posts are locked and rescored ``batch_size`` at a time, so a like that
+    lands meanwhile waits for its batch instead of being overwritten.
+    Returns the number of posts processed.
+    """
+    processed = 0
+    last_pk = 0
+    while True:
+        with transaction.atomic():
+            rows = list(
+                Post.objects.select_for_update().filter(pk__gt=last_pk).order_by('pk').values_list(
+                    'pk', 'created_at', 'like_count', 'comment_count', 'hot_score'
+                )[:batch_size]
+            )
+            if not rows:
+                break
+            changed = []
+            for pk, created_at, like_count, comment_count, current in rows:
+                score = Post.compute_hot_score(created_at, like_count, comment_count)
+                if not math.isclose(score, current, rel_tol=0, abs_tol=1e-6):
+                    changed.append(Post(pk=pk, hot_score=score))
+            Post.objects.bulk_update(changed, ['hot_score'])
+        processed += len(rows)
+        last_pk = rows[-1][0]
+    return processed
@@ -0,0 +1,81 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Min, Sum
+from django.utils import timezone
+from .models import KarmaTransaction, KarmaHourlyBucket, KarmaLifetimeTotal, truncate_to_hour
+from .leaderboard import WINDOWS
+
+
+def truncate_to_day(value):
+    """Floor an aware datetime to the start of its UTC day"""
+    return truncate_to_hour(value).replace(hour=0)
+
+
+def get_retention_cutoff(retention_days=None, now=None):
+    """Start of the oldest UTC day still kept in the ledger.
+
+    The retention must cover the longest windowed leaderboard, since those
+    windows are computed from the hourly buckets and raw rows that pruning
+    removes.
+    """
+    if retention_days is None:
+        retention_days = getattr(settings, 'KARMA_LEDGER_RETENTION_DAYS', 30)
+    retention = timedelta(days=retention_days)
+    longest_window = max(span for span in WINDOWS.values() if span is not None)
+    if retention <= longest_window:
+        raise ValueError(f'Retention must be longer than the {longest_window.days} day leaderboard window')
+    return truncate_to_day((now or timezone.now()) - retention)
+
+
+def expired_days(cutoff):
+    """UTC days before cutoff that still hold ledger rows or hourly buckets, oldest first"""
+    oldest = [
+        KarmaHourlyBucket.objects.filter(hour__lt=cutoff).aggregate(first=Min('hour'))['first'],
+        KarmaTransaction.objects.filter(created_at__lt=cutoff).aggregate(first=Min('created_at'))['first'],
+    ]
+    oldest = [value for value in oldest if value is not None]
+    if not oldest:
+        return []
+    day = truncate_to_day(min(oldest))
+    days = []
+    while day < cutoff:
+        days.append(day)
+        day += timedelta(days=1)
+    return days
+
+
+def fold_day(day):
+    """Fold one expired UTC day into lifetime totals and drop its rows.
+
+    The day's hourly buckets already hold the exact per-user sums of its
+    ledger rows, so they are added to KarmaLifetimeTotal and then the
+    buckets and raw transactions are deleted, all in one transaction.
+    Returns (users folded, transactions deleted).
+    """
+    end = day + timedelta(days=1)
+    with transaction.atomic():
+        buckets = KarmaHourlyBucket.objects.filter(hour__gte=day, hour__lt=end)
+        per_user = buckets.order_by().values('user').annotate(
+            amount=Sum('amount'), count=Sum('transaction_count')
+        )
+        folded = 0
+        for row in per_user:
+            if row['amount'] or row['count']:
+                KarmaLifetimeTotal.apply(row['user'], row['amount'], row['count'])
+                folded += 1
+        buckets.delete()
+        deleted, _ = KarmaTransaction.objects.filter(created_at__gte=day, created_at__lt=end).delete()
+    return folded, deleted
+
+
+def prune_karma_ledger(retention_days=None, now=None):
+    """Fold every day older than the retention period, one day per transaction.
+
+    Keeps the ledger and its indexes at roughly retention_days of rows so
+    window queries and inserts stay on a small working set. Returns a list
+    of (day, users folded, transactions deleted).
+    """
+    cutoff = get_retention_cutoff(retention_days, now)
+    return [(day, *fold_day(day)) for day in expired_days(cutoff)]
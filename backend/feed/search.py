@@ -0,0 +1,173 @@
+import base64
+import binascii
+import re
+
+from django.db import connection
+from rest_framework import status
+from rest_framework.decorators import api_view
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+from .models import Comment, CommentLike, Post, PostLike
+from .serializers import CommentSerializer, PostListSerializer
+
+# ?type= value -> searched kinds, and the table behind each kind
+TYPES = {
+    'all': ('comment', 'post'),
+    'posts': ('post',),
+    'comments': ('comment',),
+}
+TABLES = {'post': 'feed_post', 'comment': 'feed_comment'}
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 50
+MAX_TERMS = 16
+
+_WORD = re.compile(r'\w+', re.UNICODE)
+
+
+class SearchUnavailable(Exception):
+    """The database has no full-text index (see migration 0011)"""
+
+
+def encode_search_cursor(score, kind, pk):
+    """Encode a (score, kind, id) position into an opaque URL-safe token"""
+    raw = f'{score!r}|{kind}|{pk}'
+    return base64.urlsafe_b64encode(raw.encode('ascii')).decode('ascii').rstrip('=')
+
+
+def decode_search_cursor(token):
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        score, kind, pk = base64.urlsafe_b64decode(padded.encode('ascii')).decode('ascii').split('|')
+        if kind not in TABLES:
+            raise ValueError(kind)
+        return float(score), kind, int(pk)
+    except (TypeError, ValueError, UnicodeError, binascii.Error):
+        raise NotFound('Invalid cursor')
+
+
+def _sqlite_match(query):
+    """FTS5 query for free text: every word must match, as a quoted term so
+    user input cannot inject FTS syntax; the last word also matches as a prefix"""
+    words = _WORD.findall(query)[:MAX_TERMS]
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def _sqlite_branch(kind, match):
+    table = f'{TABLES[kind]}_fts'
+    # bm25() is lower for better matches
+    return f"SELECT '{kind}' AS kind, rowid AS id, -bm25({table}) AS score FROM {table} WHERE {table} MATCH %s", [match]
+
+
+def _postgres_branch(kind, query):
+    table = TABLES[kind]
+    return (
+        f"SELECT '{kind}' AS kind, t.id, ts_rank_cd(t.search_vector, q.query) AS score "
+        f"FROM {table} t, websearch_to_tsquery('english', %s) q(query) WHERE t.search_vector @@ q.query",
+        [query],
+    )
+
+
+def search_ids(query, kinds, limit, after=None):
+    """Ranked matches as [(kind, id, score)], best first, at most ``limit``.
+
+    ``after`` is the (score, kind, id) of the last row of the previous
+    page. Matching uses the full-text index (FTS5 on SQLite, a GIN index
+    over a tsvector column on PostgreSQL); only the matching rows are
+    scored and sorted.
+    """
+    vendor = connection.vendor
+    if vendor == 'sqlite':
+        match = _sqlite_match(query)
+        if match is None:
+            return []
+        branches = [_sqlite_branch(kind, match) for kind in kinds]
+    elif vendor == 'postgresql':
+        branches = [_postgres_branch(kind, query) for kind in kinds]
+    else:
+        raise SearchUnavailable(vendor)
+
+    sql = ' UNION ALL '.join(branch for branch, _params in branches)
+    params = [param for _branch, branch_params in branches for param in branch_params]
+    sql = f'SELECT kind, id, score FROM ({sql}) AS matches'
+    if after is not None:
+        # Rows after the cursor in (score DESC, kind ASC, id DESC) order
+        score, kind, pk = after
+        sql += ' WHERE score < %s OR (score = %s AND (kind > %s OR (kind = %s AND id < %s)))'
+        params += [score, score, kind, kind, pk]
+    sql += ' ORDER BY score DESC, kind ASC, id DESC LIMIT %s'
+    params.append(limit)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [(kind, pk, float(score)) for kind, pk, score in cursor.fetchall()]
+
+
+def _serialize(request, rows):
+    """Result entries in rank order, with the viewer's likes resolved per kind"""
+    post_ids = [pk for kind, pk, _score in rows if kind == 'post']
+    comment_ids = [pk for kind, pk, _score in rows if kind == 'comment']
+    posts = Post.objects.select_related('author').in_bulk(post_ids)
+    comments = Comment.objects.select_related('author').in_bulk(comment_ids)
+    context = {
+        'request': request,
+        'liked_post_ids': PostLike.get_liked_ids(request.user, post_ids),
+        'liked_comment_ids': CommentLike.get_liked_ids(request.user, comment_ids),
+    }
+
+    results = []
+    for kind, pk, score in rows:
+        if kind == 'post' and pk in posts:
+            results.append({'type': 'post', 'score': score, 'post': PostListSerializer(posts[pk], context=context).data})
+        elif kind == 'comment' and pk in comments:
+            comment = comments[pk]
+            data = CommentSerializer(comment, context=context).data
+            results.append({'type': 'comment', 'score': score, 'post_id': comment.post_id, 'comment': data})
+    return results
+
+
+@api_view(['GET'])
+def search_view(request):
+    """Full-text search over post and comment content.
+
+    ``?q=`` free text (all words must match); ``type=all|posts|comments``
+    (default all); ``limit`` up to 50. Results are ranked best first and
+    paged with the opaque ``next`` cursor.
+    """
+    query = request.query_params.get('q', '').strip()
+    if not query:
+        return Response({'error': 'q is required'}, status=status.HTTP_400_BAD_REQUEST)
+    kinds = TYPES.get(request.query_params.get('type', 'all'))
+    if kinds is None:
+        return Response(
+            {'error': f"type must be one of: {', '.join(TYPES)}"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    try:
+        limit = min(MAX_LIMIT, max(1, int(request.query_params.get('limit', DEFAULT_LIMIT))))
+    except ValueError:
+        limit = DEFAULT_LIMIT
+    token = request.query_params.get('cursor')
+    after = decode_search_cursor(token) if token else None
+
+    try:
+        rows = search_ids(query, kinds, limit + 1, after)
+    except SearchUnavailable:
+        return Response(
+            {'error': 'Search is not available on this database'},
+            status=status.HTTP_503_SERVICE_UNAVAILABLE
+        )
+
+    next_url = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        kind, pk, score = rows[-1]
+        next_url = replace_query_param(request.build_absolute_uri(), 'cursor', encode_search_cursor(score, kind, pk))
+    return Response({
+        'next': next_url,
+        'results': _serialize(request, rows),
+    })
@@ -0,0 +1,207 @@
+import random
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.color import no_style
+from django.db import connection
+from django.db.models import Max
+from django.utils import timezone
+from .counters import rebuild_counters
+from .models import (
+    Comment, CommentLike, KarmaHourlyBucket, KarmaTransaction, Post, PostLike, truncate_to_hour
+)
+from .likes import LIKE_KARMA, LIKE_MODELS
+
+SEED_PASSWORD = 'seed-password'
+
+DEFAULTS = {
+    'users': 1000,
+    'posts': 5000,
+    'comments_per_post': 20,
+    'max_depth': 12,
+    'likes_per_post': 15,
+    'likes_per_comment': 2,
+    'days': 7,
+    'batch_size': 500,
+    'seed': None,
+}
+
+
+@contextmanager
+def _backdating(*models):
+    """Let bulk_create keep explicit created_at/updated_at values.
+
+    auto_now_add/auto_now fill those fields in pre_save, which bulk_create
+    also calls; they are switched off for the duration of the seeding.
+    """
+    fields = [
+        field for model in models for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+    ]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def _heavy_tailed(rng, mean, cap):
+    """A Pareto-distributed count with roughly the given mean: most small, a few huge"""
+    if mean <= 0:
+        return 0
+    alpha = 2.0
+    # The mean of paretovariate(alpha) is alpha / (alpha - 1)
+    return min(cap, int(rng.paretovariate(alpha) * mean * (alpha - 1) / alpha))
+
+
+def _comment_tree(rng, post, authors, count, max_depth, next_id, now):
+    """Comments for one post with realistic fan-out.
+
+    A fifth start new top-level threads, some continue the latest reply
+    (deep back-and-forth chains) and the rest reply to an earlier comment
+    chosen by preferential attachment: every reply makes its parent more
+    likely to be picked again, so a few comments collect most replies.
+    """
+    comments = []
+    candidates = []
+    created_at = post.created_at
+    for _ in range(count):
+        created_at = min(now, created_at + timedelta(seconds=rng.expovariate(1 / 600)))
+        roll = rng.random()
+        parent = None
+        if comments and roll < 0.15:
+            parent = comments[-1]
+        elif candidates and roll > 0.35:
+            parent = rng.choice(candidates)
+        if parent is not None and parent.depth + 1 > max_depth:
+            parent = None
+
+        comment = Comment(
+            id=next_id, post=post, author_id=rng.choice(authors), parent=parent,
+            content=f'Synthetic comment {next_id}', created_at=created_at, updated_at=created_at,
+            depth=parent.depth + 1 if parent else 0,
+            path=(parent.path if parent else '') + Comment.path_segment(next_id),
+        )
+        next_id += 1
+        comments.append(comment)
+        candidates.append(comment)
+        if parent is not None:
+            candidates.append(parent)
+    return comments
+
+
+def _like_rows(rng, like_model, targets, user_ids, mean, now):
+    """Likes from distinct random users, each after its target was created"""
+    target_field = like_model.target_field
+    rows = []
+    for target in targets:
+        for user_id in rng.sample(user_ids, _heavy_tailed(rng, mean, len(user_ids))):
+            created_at = target.created_at + (now - target.created_at) * rng.random()
+            rows.append(like_model(user_id=user_id, created_at=created_at, **{target_field: target}))
+    return rows
+
+
+def _karma_rows(likes, model, buckets):
+    """Back-dated karma for each like, accumulated into per-hour buckets too"""
+    amount = LIKE_KARMA[model]
+    content_type = ContentType.objects.get_for_model(model)
+    target_field = LIKE_MODELS[model].target_field
+    link_field = f'{target_field}_like'
+    rows = []
+    for like in likes:
+        target = getattr(like, target_field)
+        rows.append(KarmaTransaction(
+            user_id=target.author_id, amount=amount, content_type=content_type,
+            object_id=target.id, created_at=like.created_at, **{f'{link_field}_id': like.id},
+        ))
+        key = (target.author_id, truncate_to_hour(like.created_at))
+        total = buckets.setdefault(key, [0, 0])
+        total[0] += amount
+        total[1] += 1
+    return rows
+
+
+def seed_feed(progress=None, **options):
+    """Bulk-create a synthetic community and return row counts by model.
+
+    Posts are spread over the last ``days`` days and created ``batch_size``
+    at a time with their comment trees, likes and karma, so memory stays
+    flat however many rows are requested. Users share the password
+    SEED_PASSWORD. Denormalized counters are rebuilt at the end.
+    """
+    options = {**DEFAULTS, **{key: value for key, value in options.items() if value is not None}}
+    rng = random.Random(options['seed'])
+    now = timezone.now()
+    batch_size = options['batch_size']
+    counts = dict.fromkeys(['users', 'posts', 'comments', 'post_likes', 'comment_likes', 'karma'], 0)
+
+    run = f'{time.time_ns():x}'
+    password = make_password(SEED_PASSWORD)
+    users = User.objects.bulk_create([
+        User(username=f'seed_{run}_{i}', password=password) for i in range(options['users'])
+    ], batch_size=batch_size)
+    user_ids = [user.id for user in users]
+    counts['users'] = len(users)
+
+    # Comments get explicit ids so their materialized paths can be built
+    # before the insert; the id sequence is reset afterwards
+    next_comment_id = (Comment.objects.aggregate(last=Max('id'))['last'] or 0) + 1
+    buckets = {}
+
+    with _backdating(Post, Comment):
+        for start in range(0, options['posts'], batch_size):
+            size = min(batch_size, options['posts'] - start)
+            post_times = sorted(now - timedelta(days=options['days']) * rng.random() for _ in range(size))
+            posts = Post.objects.bulk_create([
+                Post(author_id=rng.choice(user_ids), content=f'Synthetic post {start + i}',
+                     created_at=created_at, updated_at=created_at)
+                for i, created_at in enumerate(post_times)
+            ])
+
+            comments = []
+            for post in posts:
+                count = _heavy_tailed(rng, options['comments_per_post'], 100 * options['comments_per_post'])
+                tree = _comment_tree(rng, post, user_ids, count, options['max_depth'], next_comment_id, now)
+                next_comment_id += len(tree)
+                comments.extend(tree)
+            Comment.objects.bulk_create(comments, batch_size=batch_size)
+
+            post_likes = PostLike.objects.bulk_create(
+                _like_rows(rng, PostLike, posts, user_ids, options['likes_per_post'], now), batch_size=batch_size
+            )
+            comment_likes = CommentLike.objects.bulk_create(
+                _like_rows(rng, CommentLike, comments, user_ids, options['likes_per_comment'], now),
+                batch_size=batch_size,
+            )
+            karma = (
+                _karma_rows(post_likes, Post, buckets)
+                + _karma_rows(comment_likes, Comment, buckets)
+            )
+            KarmaTransaction.objects.bulk_create(karma, batch_size=batch_size)
+
+            counts['posts'] += len(posts)
+            counts['comments'] += len(comments)
+            counts['post_likes'] += len(post_likes)
+            counts['comment_likes'] += len(comment_likes)
+            counts['karma'] += len(karma)
+            if progress is not None:
+                progress(counts)
+
+    with connection.cursor() as cursor:
+        for sql in connection.ops.sequence_reset_sql(no_style(), [Comment]):
+            cursor.execute(sql)
+
+    # Seed users are new, so none of these buckets exist yet
+    KarmaHourlyBucket.objects.bulk_create([
+        KarmaHourlyBucket(user_id=user_id, hour=hour, amount=amount, transaction_count=count)
+        for (user_id, hour), (amount, count) in buckets.items()
+    ], batch_size=batch_size)
+    rebuild_counters()
+    return counts
@@ -1,7 +1,6 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
-from django.contrib.contenttypes.models import ContentType
-from .models import Post, Comment, Like, KarmaTransaction
+from .models import Post, Comment, KarmaTransaction
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -11,147 +10,125 @@ class UserSerializer(serializers.ModelSerializer):
         fields = ['id', 'username']
 
 
-class CommentSerializer(serializers.ModelSerializer):
-    """Serializer for Comment with nested replies"""
+class ViewerLikeMixin:
+    """Resolve is_liked from a liked-id set placed in the serializer context.
+
+    Views batch the viewer's likes for a whole page into one query and pass
+    the result as ``context[liked_ids_context_key]``. Without it we fall back
+    to a single EXISTS query for the object.
+    """
+    liked_ids_context_key = None
+
+    def get_is_liked(self, obj):
+        """Check if current user has liked this object"""
+        liked_ids = self.context.get(self.liked_ids_context_key)
+        if liked_ids is not None:
+            return obj.id in liked_ids
+        request = self.context.get('request')
+        if request and request.user.is_authenticated:
+            return obj.likes.filter(user=request.user).exists()
+        return False
+
+
+class CommentSerializer(ViewerLikeMixin, serializers.ModelSerializer):
+    """Serializer for a single Comment (threads are rendered by feed.threads)"""
     author = UserSerializer(read_only=True)
     like_count = serializers.SerializerMethodField()
     replies = serializers.SerializerMethodField()
     depth = serializers.IntegerField(read_only=True)
+    is_liked = serializers.SerializerMethodField()
+    more_replies = serializers.SerializerMethodField()
+
+    liked_ids_context_key = 'liked_comment_ids'
 
     class Meta:
         model = Comment
-        fields = ['id', 'author', 'content', 'parent', 'created_at', 'like_count', 'replies', 'depth']
-        read_only_fields = ['author', 'created_at']
+        fields = [
+            'id', 'author', 'content', 'parent', 'created_at', 'like_count',
+            'replies', 'depth', 'is_liked', 'reply_count', 'more_replies'
+        ]
+        read_only_fields = ['author', 'created_at', 'reply_count']
 
     def get_like_count(self, obj):
-        """Get like count from annotation or property"""
-        if hasattr(obj, 'annotated_like_count'):
-            return obj.annotated_like_count
+        """Get like count from the denormalized column"""
         return obj.like_count
 
     def get_replies(self, obj):
-        """Recursively serialize nested replies"""
-        if hasattr(obj, '_replies'):
-            return CommentSerializer(obj._replies, many=True).data
+        """A comment serialized on its own carries no replies; threads are
+        rendered with the same fields by feed.threads"""
         return []
 
-    def build_tree(self, comments_dict, parent_id=None):
-        """Helper method to build comment tree (not used directly, but kept for reference)"""
-        return [
-            {
-                **CommentSerializer(comment).data,
-                'replies': self.build_tree(comments_dict, comment.id)
-            }
-            for comment in comments_dict.get(parent_id, [])
-        ]
+    def get_more_replies(self, obj):
+        """Continuation URLs are only produced by the thread renderer"""
+        return None
 
 
-class PostSerializer(serializers.ModelSerializer):
-    """Serializer for Post with comment tree"""
+class PostSerializer(ViewerLikeMixin, serializers.ModelSerializer):
+    """Serializer for Post with the first page of its comment tree"""
     author = UserSerializer(read_only=True)
     like_count = serializers.SerializerMethodField()
     comment_count = serializers.SerializerMethodField()
     comments = serializers.SerializerMethodField()
+    comments_next = serializers.SerializerMethodField()
     is_liked = serializers.SerializerMethodField()
 
+    liked_ids_context_key = 'liked_post_ids'
+
     class Meta:
         model = Post
-        fields = ['id', 'author', 'content', 'created_at', 'like_count', 'comment_count', 'comments', 'is_liked']
+        fields = [
+            'id', 'author', 'content', 'created_at', 'like_count', 'comment_count',
+            'comments', 'comments_next', 'is_liked'
+        ]
         read_only_fields = ['author', 'created_at']
 
     def get_like_count(self, obj):
-        """Get like count from annotation or property"""
-        if hasattr(obj, 'annotated_like_count'):
-            return obj.annotated_like_count
+        """Get like count from the denormalized column"""
         return obj.like_count
 
     def get_comment_count(self, obj):
-        """Get comment count from annotation or property"""
-        if hasattr(obj, 'annotated_comment_count'):
-            return obj.annotated_comment_count
+        """Get comment count from the denormalized column"""
         return obj.comment_count
 
     def get_comments(self, obj):
-        """Build and return nested comment tree efficiently"""
-        if not hasattr(obj, '_prefetched_comments'):
-            return []
-        
-        # Build a dictionary of comments by parent_id
-        comments_by_parent = {}
-        root_comments = []
-        
-        for comment in obj._prefetched_comments:
-            if comment.parent_id is None:
-                root_comments.append(comment)
-            else:
-                if comment.parent_id not in comments_by_parent:
-                    comments_by_parent[comment.parent_id] = []
-                comments_by_parent[comment.parent_id].append(comment)
-        
-        # Attach replies to each comment
-        def attach_replies(comment):
-            if comment.id in comments_by_parent:
-                comment._replies = sorted(comments_by_parent[comment.id], key=lambda x: x.created_at)
-                for reply in comment._replies:
-                    attach_replies(reply)
-            else:
-                comment._replies = []
-        
-        # Build tree starting from root comments
-        for root_comment in root_comments:
-            attach_replies(root_comment)
-        
-        return CommentSerializer(root_comments, many=True).data
+        """Return the comment tree page rendered by the view (see feed.threads)"""
+        return getattr(obj, '_comment_tree', [])
 
-    def get_is_liked(self, obj):
-        """Check if current user has liked this post"""
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            return Like.objects.filter(
-                user=request.user,
-                content_type=ContentType.objects.get_for_model(Post),
-                object_id=obj.id
-            ).exists()
-        return False
+    def get_comments_next(self, obj):
+        """URL that loads the next page of root comments, if any"""
+        return getattr(obj, '_comments_next', None)
 
 
-class PostListSerializer(serializers.ModelSerializer):
+class PostListSerializer(ViewerLikeMixin, serializers.ModelSerializer):
     """Lightweight serializer for post list view"""
     author = UserSerializer(read_only=True)
     like_count = serializers.SerializerMethodField()
     comment_count = serializers.SerializerMethodField()
     is_liked = serializers.SerializerMethodField()
 
+    liked_ids_context_key = 'liked_post_ids'
+
     class Meta:
         model = Post
         fields = ['id', 'author', 'content', 'created_at', 'like_count', 'comment_count', 'is_liked']
 
     def get_like_count(self, obj):
-        """Get like count from annotation or property"""
-        if hasattr(obj, 'annotated_like_count'):
-            return obj.annotated_like_count
+        """Get like count from the denormalized column"""
         return obj.like_count
 
     def get_comment_count(self, obj):
-        """Get comment count from annotation or property"""
-        if hasattr(obj, 'annotated_comment_count'):
-            return obj.annotated_comment_count
+        """Get comment count from the denormalized column"""
         return obj.comment_count
 
-    def get_is_liked(self, obj):
-        """Check if current user has liked this post"""
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            return Like.objects.filter(
-                user=request.user,
-                content_type=ContentType.objects.get_for_model(Post),
-                object_id=obj.id
-            ).exists()
-        return False
-
 
 class LeaderboardEntrySerializer(serializers.Serializer):
-    """Serializer for leaderboard entries"""
+    """Serializer for leaderboard entries.
+
+    ``rank`` is a dense rank: users with equal karma share a rank and the
+    next distinct score takes the following rank. ``tied`` marks entries
+    that share their rank with at least one other user.
+    """
     user = UserSerializer()
     total_karma = serializers.IntegerField()
     rank = serializers.IntegerField()
+    tied = serializers.BooleanField(default=False)
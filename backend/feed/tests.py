@@ -1,11 +1,15 @@
-from django.test import TestCase, Client
+import os
+from unittest import skipUnless
+
+from django.conf import settings
+from django.test import TestCase, Client, override_settings, tag
 from django.contrib.auth.models import User
 from django.utils import timezone
 from django.db.models import Sum
 from datetime import timedelta
 from rest_framework.test import APIClient
 from rest_framework import status
-from .models import Post, Comment, Like, KarmaTransaction
+from .models import Post, Comment, Like, PostLike, CommentLike, KarmaTransaction
 from django.contrib.contenttypes.models import ContentType
 
 
@@ -394,3 +398,2073 @@ class NestedCommentsTestCase(TestCase):
         
         # Post should have 3 comments total (1 root + 2 replies)
         self.assertEqual(self.post.comments.count(), 3)
+
+
+class FeedKeysetPaginationTestCase(TestCase):
+    """Test cursor pagination of the post feed"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='author', password='test123')
+        self.posts = [
+            Post.objects.create(author=self.user, content=f'Post {i}')
+            for i in range(5)
+        ]
+
+    def test_cursor_pages_are_stable_when_new_posts_arrive(self):
+        """Test that following the next cursor skips nothing and repeats nothing"""
+        response = self.client.get('/api/posts/?page_size=2')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.json()
+        self.assertNotIn('count', data)
+        first_ids = [post['id'] for post in data['results']]
+        self.assertEqual(first_ids, [self.posts[4].id, self.posts[3].id])
+
+        # A new post at the head of the feed must not shift the next page
+        Post.objects.create(author=self.user, content='Newest')
+
+        data = self.client.get(data['next']).json()
+        self.assertEqual(
+            [post['id'] for post in data['results']],
+            [self.posts[2].id, self.posts[1].id]
+        )
+        self.assertIsNotNone(data['previous'])
+
+        data = self.client.get(data['next']).json()
+        self.assertEqual([post['id'] for post in data['results']], [self.posts[0].id])
+        self.assertIsNone(data['next'])
+
+    def test_previous_cursor_returns_prior_page(self):
+        """Test that the previous cursor walks back towards the head"""
+        first = self.client.get('/api/posts/?page_size=2').json()
+        second = self.client.get(first['next']).json()
+        back = self.client.get(second['previous']).json()
+        self.assertEqual(
+            [post['id'] for post in back['results']],
+            [post['id'] for post in first['results']]
+        )
+
+    def test_invalid_cursor_returns_404(self):
+        """Test that a malformed cursor is rejected"""
+        response = self.client.get('/api/posts/?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_page_number_mode_is_opt_in(self):
+        """Test that ?page=N still returns the page-number response"""
+        response = self.client.get('/api/posts/?page=1')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.json()
+        self.assertEqual(data['count'], 5)
+        self.assertEqual(len(data['results']), 5)
+
+
+class DenormalizedCounterTestCase(TestCase):
+    """Test the stored like/comment counters"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.author = User.objects.create_user(username='author', password='test123')
+        self.reader = User.objects.create_user(username='reader', password='test123')
+        self.post = Post.objects.create(author=self.author, content='Test post')
+        self.client.force_authenticate(user=self.reader)
+
+    def test_like_toggle_updates_post_counter(self):
+        """Test that like/unlike keeps Post.like_count in step"""
+        self.client.post(f'/api/posts/{self.post.id}/like/')
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.like_count, 1)
+
+        self.client.post(f'/api/posts/{self.post.id}/like/')
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.like_count, 0)
+
+    def test_comment_creation_updates_counters(self):
+        """Test that new comments bump comment_count and the parent's reply_count"""
+        response = self.client.post(
+            f'/api/posts/{self.post.id}/comments/', {'content': 'Root'}, format='json'
+        )
+        root_id = response.json()['id']
+        self.client.post(
+            f'/api/posts/{self.post.id}/comments/',
+            {'content': 'Reply', 'parent_id': root_id},
+            format='json'
+        )
+        self.client.post(f'/api/comments/{root_id}/like/')
+
+        self.post.refresh_from_db()
+        root = Comment.objects.get(id=root_id)
+        self.assertEqual(self.post.comment_count, 2)
+        self.assertEqual(root.reply_count, 1)
+        self.assertEqual(root.like_count, 1)
+
+        data = self.client.get(f'/api/posts/{self.post.id}/').json()
+        self.assertEqual(data['comment_count'], 2)
+        self.assertEqual(data['comments'][0]['like_count'], 1)
+
+    def test_rebuild_counters_command_repairs_drift(self):
+        """Test that rebuild_counters recomputes counters from source rows"""
+        from django.core.management import call_command
+        from io import StringIO
+
+        comment = Comment.objects.create(post=self.post, author=self.reader, content='Hi')
+        PostLike.objects.create(user=self.reader, post=self.post)
+        Post.objects.filter(id=self.post.id).update(like_count=42, comment_count=7)
+
+        call_command('rebuild_counters', batch_size=1, stdout=StringIO())
+
+        self.post.refresh_from_db()
+        comment.refresh_from_db()
+        self.assertEqual(self.post.like_count, 1)
+        self.assertEqual(self.post.comment_count, 1)
+        self.assertEqual(comment.like_count, 0)
+        self.assertEqual(comment.reply_count, 0)
+
+
+class ViewerLikedStateTestCase(TestCase):
+    """Test batched is_liked resolution for posts and comments"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.author = User.objects.create_user(username='author', password='test123')
+        self.reader = User.objects.create_user(username='reader', password='test123')
+        self.post_type = ContentType.objects.get_for_model(Post)
+        self.comment_type = ContentType.objects.get_for_model(Comment)
+        self.client.force_authenticate(user=self.reader)
+
+    def _make_posts(self, count):
+        return [Post.objects.create(author=self.author, content=f'Post {i}') for i in range(count)]
+
+    def test_feed_is_liked_uses_constant_queries(self):
+        """Test that is_liked costs the same number of queries for 1 or 20 posts"""
+        posts = self._make_posts(1)
+        PostLike.objects.create(user=self.reader, post=posts[0])
+        with self.assertNumQueries(2):
+            data = self.client.get('/api/posts/').json()
+        self.assertTrue(data['results'][0]['is_liked'])
+
+        self._make_posts(19)
+        with self.assertNumQueries(2):
+            data = self.client.get('/api/posts/').json()
+        self.assertEqual(len(data['results']), 20)
+        liked = [post['id'] for post in data['results'] if post['is_liked']]
+        self.assertEqual(liked, [posts[0].id])
+
+    def test_comment_is_liked_in_thread(self):
+        """Test that comments in a retrieved thread carry the viewer's liked flag"""
+        post = self._make_posts(1)[0]
+        root = Comment.objects.create(post=post, author=self.author, content='Root')
+        reply = Comment.objects.create(post=post, author=self.author, content='Reply', parent=root)
+        CommentLike.objects.create(user=self.reader, comment=reply)
+
+        data = self.client.get(f'/api/posts/{post.id}/').json()
+        self.assertFalse(data['is_liked'])
+        self.assertFalse(data['comments'][0]['is_liked'])
+        self.assertTrue(data['comments'][0]['replies'][0]['is_liked'])
+
+    def test_anonymous_viewer_sees_nothing_liked(self):
+        """Test that anonymous users get is_liked=False without extra queries"""
+        post = self._make_posts(1)[0]
+        PostLike.objects.create(user=self.reader, post=post)
+        self.client.force_authenticate(user=None)
+        data = self.client.get('/api/posts/').json()
+        self.assertFalse(data['results'][0]['is_liked'])
+
+
+class KarmaHourlyBucketTestCase(TestCase):
+    """Test the hourly karma rollup used by the leaderboard"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.author = User.objects.create_user(username='author', password='test123')
+        self.reader = User.objects.create_user(username='reader', password='test123')
+        self.post = Post.objects.create(author=self.author, content='Test post')
+        self.content_type = ContentType.objects.get_for_model(Post)
+
+    def _karma(self, user, amount, created_at):
+        return KarmaTransaction.objects.create(
+            user=user,
+            amount=amount,
+            content_type=self.content_type,
+            object_id=self.post.id,
+            created_at=created_at
+        )
+
+    def _raw_totals(self, cutoff_time):
+        return dict(
+            KarmaTransaction.objects.filter(created_at__gte=cutoff_time)
+            .order_by().values_list('user').annotate(total=Sum('amount'))
+        )
+
+    def test_buckets_follow_like_and_unlike(self):
+        """Test that the like toggle adds to and removes from the author's bucket"""
+        from .models import KarmaHourlyBucket
+
+        self.client.force_authenticate(user=self.reader)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/api/posts/{self.post.id}/like/')
+        bucket = KarmaHourlyBucket.objects.get(user=self.author)
+        self.assertEqual((bucket.amount, bucket.transaction_count), (5, 1))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/api/posts/{self.post.id}/like/')
+        bucket.refresh_from_db()
+        self.assertEqual((bucket.amount, bucket.transaction_count), (0, 0))
+        self.assertEqual(KarmaTransaction.get_24h_karma_by_user(), [])
+
+    def test_partial_oldest_hour_matches_raw_sum(self):
+        """Test exact edge handling for the hour that straddles the cutoff"""
+        now = timezone.now()
+        cutoff_time = now - timedelta(hours=24)
+        # Same hour as the cutoff, on either side of it
+        self._karma(self.author, 5, cutoff_time - timedelta(seconds=1))
+        self._karma(self.author, 1, cutoff_time + timedelta(seconds=1))
+        self._karma(self.reader, 5, cutoff_time)
+        # Well inside and well outside the window
+        self._karma(self.reader, 5, now - timedelta(hours=2))
+        self._karma(self.author, 100, now - timedelta(hours=30))
+
+        totals = KarmaTransaction.get_karma_by_user_since(cutoff_time)
+        self.assertEqual(totals, self._raw_totals(cutoff_time))
+        self.assertEqual(totals, {self.author.id: 1, self.reader.id: 10})
+
+
+class LeaderboardWindowTestCase(TestCase):
+    """Test windowed, paged leaderboard with dense ranks and viewer lookup"""
+
+    def setUp(self):
+        from django.core.cache import cache
+        from . import leaderboard
+
+        cache.clear()
+        leaderboard._snapshots.clear()
+        self.client = APIClient()
+        self.users = [
+            User.objects.create_user(username=f'ranked{i}', password='test123')
+            for i in range(7)
+        ]
+        self.post = Post.objects.create(author=self.users[0], content='Test post')
+        self.content_type = ContentType.objects.get_for_model(Post)
+        now = timezone.now()
+        # 24h karma: 30, 20, 20, 10, 5, 5, 1 -> dense ranks 1, 2, 2, 3, 4, 4, 5
+        for user, amount in zip(self.users, [30, 20, 20, 10, 5, 5, 1]):
+            self._karma(user, amount, now - timedelta(hours=2))
+        # Older karma only visible in the 7d and all-time windows
+        self._karma(self.users[6], 100, now - timedelta(days=3))
+        self._karma(self.users[5], 500, now - timedelta(days=30))
+
+    def _karma(self, user, amount, created_at):
+        KarmaTransaction.objects.create(
+            user=user,
+            amount=amount,
+            content_type=self.content_type,
+            object_id=self.post.id,
+            created_at=created_at
+        )
+
+    def test_legacy_response_is_top_5_list(self):
+        """Test that the bare endpoint still returns a top-5 list"""
+        data = self.client.get('/api/leaderboard/').json()
+        self.assertIsInstance(data, list)
+        self.assertEqual([entry['rank'] for entry in data], [1, 2, 2, 3, 4])
+        self.assertEqual([entry['tied'] for entry in data], [False, True, True, False, True])
+
+    def test_windows_and_paging(self):
+        """Test the window parameter and offset paging"""
+        data = self.client.get('/api/leaderboard/?window=7d&limit=2').json()
+        self.assertEqual(data['count'], 7)
+        self.assertEqual(data['results'][0]['user']['username'], 'ranked6')
+        self.assertEqual(data['results'][0]['total_karma'], 101)
+
+        data = self.client.get(data['next']).json()
+        self.assertEqual([entry['total_karma'] for entry in data['results']], [20, 20])
+        self.assertEqual([entry['rank'] for entry in data['results']], [3, 3])
+
+        data = self.client.get('/api/leaderboard/?window=all').json()
+        self.assertEqual(data['results'][0]['user']['username'], 'ranked5')
+
+        data = self.client.get('/api/leaderboard/?window=1h').json()
+        self.assertEqual(data['count'], 0)
+
+    def test_viewer_rank_lookup(self):
+        """Test that the requesting user's own rank is returned beyond the page"""
+        self.client.force_authenticate(user=self.users[6])
+        data = self.client.get('/api/leaderboard/?window=24h&limit=1').json()
+        self.assertEqual(len(data['results']), 1)
+        self.assertEqual(data['me']['user']['username'], 'ranked6')
+        self.assertEqual(data['me']['rank'], 5)
+        self.assertEqual(data['me']['total_karma'], 1)
+
+    def test_snapshot_refreshes_after_karma_write(self):
+        """Test that a new karma transaction invalidates the ranked snapshot"""
+        self.client.get('/api/leaderboard/?window=24h')
+        self._karma(self.users[6], 50, timezone.now())
+        data = self.client.get('/api/leaderboard/?window=24h').json()
+        self.assertEqual(data['results'][0]['user']['username'], 'ranked6')
+
+    def test_unknown_window_is_rejected(self):
+        """Test that an unsupported window returns 400"""
+        response = self.client.get('/api/leaderboard/?window=1y')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class CommentMaterializedPathTestCase(TestCase):
+    """Test stored path/depth on comments"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='user1', password='test123')
+        self.post = Post.objects.create(author=self.user, content='Test post')
+
+    def _comment(self, parent=None):
+        return Comment.objects.create(post=self.post, author=self.user, content='c', parent=parent)
+
+    def test_path_and_depth_set_on_insert(self):
+        """Test that path extends the parent's path and depth is parent + 1"""
+        root = self._comment()
+        reply = self._comment(root)
+        nested = self._comment(reply)
+        self.assertEqual(root.path, Comment.path_segment(root.id))
+        self.assertTrue(nested.path.startswith(reply.path))
+        self.assertEqual([root.depth, reply.depth, nested.depth], [0, 1, 2])
+        nested.refresh_from_db()
+        self.assertEqual(nested.path, reply.path + Comment.path_segment(nested.id))
+
+    def test_subtree_and_depth_limited_thread_in_display_order(self):
+        """Test single-scan subtree and depth-limited thread loading"""
+        first = self._comment()
+        first_reply = self._comment(first)
+        first_nested = self._comment(first_reply)
+        second = self._comment()
+        first_late_reply = self._comment(first)
+
+        with self.assertNumQueries(1):
+            subtree = [c.id for c in first.get_subtree()]
+        self.assertEqual(subtree, [first.id, first_reply.id, first_nested.id, first_late_reply.id])
+
+        thread = [c.id for c in Comment.get_thread(self.post.id, max_depth=1)]
+        self.assertEqual(thread, [first.id, first_reply.id, first_late_reply.id, second.id])
+
+    def test_api_reply_exposes_depth(self):
+        """Test that comments created through the API report their depth"""
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        root = client.post(f'/api/posts/{self.post.id}/comments/', {'content': 'Root'}, format='json').json()
+        reply = client.post(
+            f'/api/posts/{self.post.id}/comments/',
+            {'content': 'Reply', 'parent_id': root['id']},
+            format='json'
+        ).json()
+        self.assertEqual(root['depth'], 0)
+        self.assertEqual(reply['depth'], 1)
+
+    def test_replies_past_max_depth_are_rejected(self):
+        """Test that the deepest reply's path fits and nothing nests below it"""
+        from .models import MAX_COMMENT_DEPTH
+
+        comment = None
+        for _ in range(MAX_COMMENT_DEPTH + 1):
+            comment = self._comment(comment)
+        self.assertEqual(comment.depth, MAX_COMMENT_DEPTH)
+        comment.refresh_from_db()
+        self.assertEqual(len(comment.path), (MAX_COMMENT_DEPTH + 1) * Comment.PATH_SEGMENT_WIDTH)
+        with self.assertRaises(ValueError):
+            self._comment(comment)
+
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        url = f'/api/posts/{self.post.id}/comments/'
+        response = client.post(url, {'content': 'Too deep', 'parent_id': comment.id}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('error', response.json())
+        response = client.post(url, {'content': 'Deepest', 'parent_id': comment.parent_id}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Comment.objects.count(), MAX_COMMENT_DEPTH + 2)
+
+
+class CommentTreePagingTestCase(TestCase):
+    """Test bounded, cursor-continued comment tree loading"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='user1', password='test123')
+        self.post = Post.objects.create(author=self.user, content='Test post')
+
+    def _comment(self, parent=None):
+        comment = Comment.objects.create(post=self.post, author=self.user, content='c', parent=parent)
+        if parent:
+            Comment.objects.filter(id=parent.id).update(reply_count=parent.replies.count())
+        return comment
+
+    def _collect_ids(self, nodes):
+        ids = []
+        for node in nodes:
+            ids.append(node['id'])
+            ids.extend(self._collect_ids(node['replies']))
+        return ids
+
+    def test_retrieve_limits_roots_and_continues_with_cursor(self):
+        """Test that roots beyond the limit are served by the thread cursor"""
+        roots = [self._comment() for _ in range(5)]
+        data = self.client.get(f'/api/posts/{self.post.id}/?limit=2').json()
+        self.assertEqual([c['id'] for c in data['comments']], [roots[0].id, roots[1].id])
+        self.assertIsNotNone(data['comments_next'])
+
+        page = self.client.get(data['comments_next']).json()
+        self.assertEqual([c['id'] for c in page['results']], [roots[2].id, roots[3].id])
+        page = self.client.get(page['next']).json()
+        self.assertEqual([c['id'] for c in page['results']], [roots[4].id])
+        self.assertIsNone(page['next'])
+
+    def test_depth_and_reply_limits_expose_more_replies(self):
+        """Test that truncated branches resume from their more_replies cursor"""
+        root = self._comment()
+        children = [self._comment(root) for _ in range(3)]
+        grandchild = self._comment(children[0])
+
+        data = self.client.get(f'/api/posts/{self.post.id}/?depth=1&replies=2').json()
+        tree_root = data['comments'][0]
+        self.assertEqual([c['id'] for c in tree_root['replies']], [children[0].id, children[1].id])
+        self.assertEqual(tree_root['reply_count'], 3)
+        # Depth limit: the first child's own reply is not loaded
+        self.assertEqual(tree_root['replies'][0]['replies'], [])
+        self.assertIsNotNone(tree_root['replies'][0]['more_replies'])
+
+        more = self.client.get(tree_root['more_replies']).json()
+        self.assertEqual([c['id'] for c in more['results']], [children[2].id])
+
+        deeper = self.client.get(tree_root['replies'][0]['more_replies']).json()
+        self.assertEqual([c['id'] for c in deeper['results']], [grandchild.id])
+
+    def test_full_walk_visits_every_comment_once(self):
+        """Test that following every cursor reaches each comment exactly once"""
+        root = self._comment()
+        level1 = [self._comment(root) for _ in range(3)]
+        for parent in level1:
+            for _ in range(3):
+                self._comment(parent)
+        self._comment()
+
+        seen = self._walk(self.client.get(f'/api/posts/{self.post.id}/?limit=1&depth=1&replies=2').json())
+        self.assertEqual(sorted(seen), sorted(Comment.objects.values_list('id', flat=True)))
+
+    def _walk(self, data):
+        """Ids of every comment reached from a post detail by following all cursors"""
+        seen = []
+        pending = [data['comments_next']]
+        nodes = data['comments']
+        while True:
+            stack = list(nodes)
+            while stack:
+                node = stack.pop()
+                seen.append(node['id'])
+                if node['more_replies']:
+                    pending.append(node['more_replies'])
+                stack.extend(node['replies'])
+            pending = [url for url in pending if url]
+            if not pending:
+                return seen
+            page = self.client.get(pending.pop()).json()
+            nodes = page['results']
+            pending.append(page['next'])
+
+    def test_page_is_capped_at_max_nodes(self):
+        """Test that a deep, wide thread page stops at the node total and continues by cursor"""
+        from unittest import mock
+        from .views import PostViewSet
+
+        for _ in range(3):
+            root = self._comment()
+            for _ in range(4):
+                child = self._comment(root)
+                for _ in range(4):
+                    self._comment(child)
+
+        with mock.patch.object(PostViewSet, 'comment_max_nodes', 20):
+            data = self.client.get(f'/api/posts/{self.post.id}/?limit=3&depth=2&replies=4').json()
+            self.assertEqual(len(self._collect_ids(data['comments'])), 20)
+            self.assertEqual(len(data['comments']), 3)
+            # The cut-off branches resume from cursors, reaching every comment once
+            seen = self._walk(data)
+        self.assertEqual(sorted(seen), sorted(Comment.objects.values_list('id', flat=True)))
+
+    def test_invalid_thread_cursor_returns_404(self):
+        """Test that a malformed thread cursor is rejected"""
+        response = self.client.get(f'/api/posts/{self.post.id}/thread/?cursor=%%%')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class CompactThreadRendererTestCase(TestCase):
+    """Test the value-row comment tree engine"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='user1', password='test123')
+        self.post = Post.objects.create(author=self.user, content='Test post')
+
+    def test_rendered_node_matches_comment_serializer(self):
+        """Test that rendered nodes have the same fields and values as CommentSerializer"""
+        from .serializers import CommentSerializer
+        from .threads import load_thread_page
+
+        comment = Comment.objects.create(post=self.post, author=self.user, content='Root')
+        node = load_thread_page(self.post).render()[0]
+        self.assertEqual(node, dict(CommentSerializer(comment).data))
+
+    def test_deep_chain_renders_in_display_order(self):
+        """Test that a long reply chain is rendered without recursion"""
+        from .threads import load_thread_page
+
+        parent = None
+        chain = []
+        for _ in range(60):
+            parent = Comment.objects.create(post=self.post, author=self.user, content='c', parent=parent)
+            chain.append(parent.id)
+
+        with self.assertNumQueries(2):
+            page = load_thread_page(self.post, depth=100)
+        node = page.render()[0]
+        visited = []
+        while node:
+            visited.append(node['id'])
+            node = node['replies'][0] if node['replies'] else None
+        self.assertEqual(visited, chain)
+
+
+class ThreadCacheTestCase(TestCase):
+    """Test the shared cache of rendered comment threads"""
+
+    def setUp(self):
+        from django.core.cache import cache
+
+        cache.clear()
+        self.client = APIClient()
+        self.author = User.objects.create_user(username='author', password='test123')
+        self.reader = User.objects.create_user(username='reader', password='test123')
+        self.post = Post.objects.create(author=self.author, content='Test post')
+        self.comment = Comment.objects.create(post=self.post, author=self.author, content='Root')
+
+    def test_second_read_skips_comment_queries(self):
+        """Test that a warm thread is served without touching the comment table"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        self.client.get(f'/api/posts/{self.post.id}/')
+        with CaptureQueriesContext(connection) as queries:
+            data = self.client.get(f'/api/posts/{self.post.id}/').json()
+        self.assertEqual(data['comments'][0]['id'], self.comment.id)
+        self.assertFalse(any('feed_comment' in query['sql'] for query in queries.captured_queries))
+
+    def test_viewer_state_is_overlaid_on_shared_entry(self):
+        """Test that is_liked differs per viewer while the cached body is shared"""
+        CommentLike.objects.create(user=self.reader, comment=self.comment)
+        anonymous = self.client.get(f'/api/posts/{self.post.id}/').json()
+        self.client.force_authenticate(user=self.reader)
+        viewer = self.client.get(f'/api/posts/{self.post.id}/').json()
+        self.assertFalse(anonymous['comments'][0]['is_liked'])
+        self.assertTrue(viewer['comments'][0]['is_liked'])
+
+    def test_comment_writes_invalidate_cached_thread(self):
+        """Test that new comments and comment likes show up on the next read"""
+        self.client.get(f'/api/posts/{self.post.id}/')
+        self.client.force_authenticate(user=self.reader)
+
+        self.client.post(f'/api/posts/{self.post.id}/comments/', {'content': 'New'}, format='json')
+        data = self.client.get(f'/api/posts/{self.post.id}/').json()
+        self.assertEqual(len(data['comments']), 2)
+
+        self.client.post(f'/api/comments/{self.comment.id}/like/')
+        data = self.client.get(f'/api/posts/{self.post.id}/').json()
+        self.assertEqual(data['comments'][0]['like_count'], 1)
+        self.assertTrue(data['comments'][0]['is_liked'])
+
+    def test_writes_in_another_process_invalidate_cached_thread(self):
+        """Test that a worker with its own cache stops serving a thread changed elsewhere"""
+        from unittest import mock
+        from django.core.cache.backends.locmem import LocMemCache
+
+        other_worker = LocMemCache('other-worker', {})
+        with mock.patch('feed.thread_cache.cache', other_worker):
+            self.client.get(f'/api/posts/{self.post.id}/')
+
+        # This worker handles the writes; the other worker's cache never hears of them
+        self.client.force_authenticate(user=self.reader)
+        self.client.post(f'/api/posts/{self.post.id}/comments/', {'content': 'New'}, format='json')
+        with mock.patch('feed.thread_cache.cache', other_worker):
+            data = self.client.get(f'/api/posts/{self.post.id}/').json()
+        self.assertEqual(len(data['comments']), 2)
+
+        self.client.put(f'/api/comments/{self.comment.id}/like/')
+        with mock.patch('feed.thread_cache.cache', other_worker):
+            data = self.client.get(f'/api/posts/{self.post.id}/').json()
+        self.assertEqual(data['comments'][0]['like_count'], 1)
+
+
+class ConditionalGetTestCase(TestCase):
+    """Test ETag / Last-Modified handling on read endpoints"""
+
+    def setUp(self):
+        from django.core.cache import cache
+
+        cache.clear()
+        self.client = APIClient()
+        self.author = User.objects.create_user(username='author', password='test123')
+        self.reader = User.objects.create_user(username='reader', password='test123')
+        self.post = Post.objects.create(author=self.author, content='Test post')
+        self.comment = Comment.objects.create(post=self.post, author=self.author, content='Root')
+        self.client.force_authenticate(user=self.reader)
+
+    def _assert_not_modified_without_thread_tables(self, url, etag):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        for query in queries.captured_queries:
+            self.assertNotIn('feed_comment', query['sql'])
+            self.assertNotIn('feed_like', query['sql'])
+
+    def test_post_detail_revalidation(self):
+        """Test that post detail answers 304 until its thread changes"""
+        url = f'/api/posts/{self.post.id}/'
+        response = self.client.get(url)
+        etag = response['ETag']
+        self.assertIn('Last-Modified', response)
+        self._assert_not_modified_without_thread_tables(url, etag)
+
+        self.client.post(f'/api/comments/{self.comment.id}/like/')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_feed_revalidation(self):
+        """Test that the feed answers 304 until a post on the page changes"""
+        response = self.client.get('/api/posts/')
+        etag = response['ETag']
+        self._assert_not_modified_without_thread_tables('/api/posts/', etag)
+
+        self.client.post(f'/api/posts/{self.post.id}/comments/', {'content': 'New'}, format='json')
+        response = self.client.get('/api/posts/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # The setUp comment bypassed the counters; only the API comment is counted
+        self.assertEqual(response.json()['results'][0]['comment_count'], 1)
+
+    def test_etag_differs_per_viewer(self):
+        """Test that another user cannot reuse a viewer-specific ETag"""
+        etag = self.client.get('/api/posts/')['ETag']
+        self.client.force_authenticate(user=self.author)
+        response = self.client.get('/api/posts/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_leaderboard_revalidation(self):
+        """Test that the leaderboard answers 304 until karma changes"""
+        etag = self.client.get('/api/leaderboard/')['ETag']
+        response = self.client.get('/api/leaderboard/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/api/posts/{self.post.id}/like/')
+        response = self.client.get('/api/leaderboard/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class KarmaOutboxTestCase(TestCase):
+    """Test that like side-effects reach the karma ledger through the outbox"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.author = User.objects.create_user(username='author', password='test123')
+        self.reader = User.objects.create_user(username='reader', password='test123')
+        self.post = Post.objects.create(author=self.author, content='Test post')
+        self.client.force_authenticate(user=self.reader)
+
+    def test_like_writes_event_not_karma(self):
+        """Test that the request path only records an outbox event"""
+        from .models import KarmaOutboxEvent
+
+        self.client.post(f'/api/posts/{self.post.id}/like/')
+        event = KarmaOutboxEvent.objects.get()
+        self.assertEqual((event.kind, event.recipient, event.amount), ('like', self.author, 5))
+        self.assertFalse(KarmaTransaction.objects.exists())
+
+    def test_inline_drain_after_commit(self):
+        """Test that the event is applied once the like commits"""
+        from .models import KarmaOutboxEvent
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/api/posts/{self.post.id}/like/')
+        self.assertFalse(KarmaOutboxEvent.objects.exists())
+        self.assertEqual(KarmaTransaction.objects.get().amount, 5)
+
+    def test_inline_drain_claims_only_its_own_objects(self):
+        """Test that the inline drain leaves other objects' events to the worker
+        but applies an earlier pending like before its unlike"""
+        from django.test import override_settings
+        from .models import KarmaOutboxEvent
+
+        other = Post.objects.create(author=self.author, content='Other post')
+        with override_settings(KARMA_OUTBOX_INLINE=False):
+            self.client.post(f'/api/posts/{other.id}/like/')
+            self.client.post(f'/api/posts/{self.post.id}/like/')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/api/posts/{self.post.id}/like/')
+        self.assertEqual(list(KarmaOutboxEvent.objects.values_list('object_id', flat=True)), [other.id])
+        self.assertFalse(KarmaTransaction.objects.exists())
+
+    def test_drain_applies_each_event_once(self):
+        """Test that re-draining does not duplicate karma"""
+        from .outbox import drain_outbox
+
+        self.client.post(f'/api/posts/{self.post.id}/like/')
+        self.assertEqual(drain_outbox(), 1)
+        self.assertEqual(drain_outbox(), 0)
+        self.assertEqual(KarmaTransaction.objects.count(), 1)
+        self.assertEqual(KarmaTransaction.get_karma_by_user_since(), {self.author.id: 5})
+
+    def test_like_unlike_in_one_batch_cancels(self):
+        """Test that a like and its unlike drained together leave no ledger rows"""
+        from .models import KarmaHourlyBucket
+        from .outbox import drain_outbox
+
+        self.client.post(f'/api/posts/{self.post.id}/like/')
+        self.client.post(f'/api/posts/{self.post.id}/like/')
+        self.assertEqual(drain_outbox(), 2)
+        self.assertFalse(KarmaTransaction.objects.exists())
+        self.assertFalse(KarmaHourlyBucket.objects.exclude(transaction_count=0).exists())
+
+    def test_unlike_across_batches_removes_karma(self):
+        """Test that an unlike drained later removes the earlier award"""
+        from .outbox import drain_outbox
+
+        self.client.post(f'/api/posts/{self.post.id}/like/')
+        drain_outbox()
+        self.client.post(f'/api/posts/{self.post.id}/like/')
+        drain_outbox()
+        self.assertFalse(KarmaTransaction.objects.exists())
+        self.assertEqual(KarmaTransaction.get_karma_by_user_since(), {})
+
+    def test_stats_report_lag(self):
+        """Test that stats expose pending count and the oldest event's age"""
+        from .models import KarmaOutboxEvent
+        from .outbox import get_outbox_stats
+
+        self.assertEqual(get_outbox_stats(), {'pending': 0, 'lag_seconds': 0.0})
+        self.client.post(f'/api/posts/{self.post.id}/like/')
+        KarmaOutboxEvent.objects.update(created_at=timezone.now() - timedelta(seconds=30))
+        stats = get_outbox_stats()
+        self.assertEqual(stats['pending'], 1)
+        self.assertGreaterEqual(stats['lag_seconds'], 30)
+
+
+class IdempotentLikeTestCase(TestCase):
+    """Test the PUT/DELETE like endpoints"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.author = User.objects.create_user(username='author', password='test123')
+        self.reader = User.objects.create_user(username='reader', password='test123')
+        self.post = Post.objects.create(author=self.author, content='Test post')
+        self.comment = Comment.objects.create(post=self.post, author=self.author, content='Root')
+        self.client.force_authenticate(user=self.reader)
+
+    def test_put_is_idempotent(self):
+        """Test that repeating PUT keeps a single like and a single karma event"""
+        from .models import KarmaOutboxEvent
+
+        url = f'/api/posts/{self.post.id}/like/'
+        first = self.client.put(url)
+        second = self.client.put(url)
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual((first.data['changed'], second.data['changed']), (True, False))
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.like_count, 1)
+        self.assertEqual(PostLike.objects.count(), 1)
+        self.assertEqual(KarmaOutboxEvent.objects.count(), 1)
+
+    def test_delete_is_idempotent(self):
+        """Test that repeating DELETE unlikes once and then does nothing"""
+        url = f'/api/comments/{self.comment.id}/like/'
+        self.client.put(url)
+        first = self.client.delete(url)
+        second = self.client.delete(url)
+        self.assertEqual((first.status_code, second.status_code), (status.HTTP_200_OK, status.HTTP_200_OK))
+        self.assertEqual((first.data['changed'], second.data['changed']), (True, False))
+        self.comment.refresh_from_db()
+        self.assertEqual(self.comment.like_count, 0)
+        self.assertFalse(CommentLike.objects.exists())
+
+    def test_put_then_toggle_interoperate(self):
+        """Test that the legacy toggle sees a like made with PUT"""
+        url = f'/api/posts/{self.post.id}/like/'
+        self.client.put(url)
+        response = self.client.post(url)
+        self.assertFalse(response.data['liked'])
+
+    def test_karma_applied_once(self):
+        """Test that retried PUTs award karma exactly once"""
+        url = f'/api/posts/{self.post.id}/like/'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.put(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.put(url)
+        self.assertEqual(KarmaTransaction.get_karma_by_user_since(), {self.author.id: 5})
+
+    def test_unknown_object(self):
+        """Test that liking a missing post is a 404"""
+        self.assertEqual(self.client.put('/api/posts/999999/like/').status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_repeat_put_is_two_queries(self):
+        """Test that a no-op PUT costs the author lookup and one insert"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        url = f'/api/posts/{self.post.id}/like/'
+        self.client.put(url)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.put(url)
+        writes = [
+            query for query in queries.captured_queries
+            if 'feed_' in query['sql'] and 'SAVEPOINT' not in query['sql']
+        ]
+        self.assertEqual(len(writes), 2)
+
+
+class KarmaLedgerRetentionTestCase(TestCase):
+    """Test folding expired ledger days into lifetime totals"""
+
+    def setUp(self):
+        self.author = User.objects.create_user(username='author', password='test123')
+        self.other = User.objects.create_user(username='other', password='test123')
+        self.post = Post.objects.create(author=self.author, content='Test post')
+        self.content_type = ContentType.objects.get_for_model(Post)
+        self.now = timezone.now()
+
+    def _karma(self, user, amount, age):
+        return KarmaTransaction.objects.create(
+            user=user,
+            amount=amount,
+            content_type=self.content_type,
+            object_id=self.post.id,
+            created_at=self.now - age
+        )
+
+    def test_prune_keeps_all_time_and_window_totals(self):
+        """Test that folding drops old rows without changing any leaderboard total"""
+        from .models import KarmaHourlyBucket
+        from .retention import prune_karma_ledger
+
+        self._karma(self.author, 5, timedelta(days=40))
+        self._karma(self.author, 1, timedelta(days=35))
+        self._karma(self.other, 5, timedelta(days=35))
+        self._karma(self.author, 5, timedelta(hours=2))
+        all_time = KarmaTransaction.get_karma_by_user_since()
+        day = KarmaTransaction.get_karma_by_user_since(self.now - timedelta(hours=24))
+
+        results = prune_karma_ledger(retention_days=30, now=self.now)
+        self.assertEqual(sum(deleted for _, _, deleted in results), 3)
+        self.assertEqual(KarmaTransaction.objects.count(), 1)
+        self.assertFalse(KarmaHourlyBucket.objects.filter(hour__lt=self.now - timedelta(days=30)).exists())
+        self.assertEqual(KarmaTransaction.get_karma_by_user_since(), all_time)
+        self.assertEqual(KarmaTransaction.get_karma_by_user_since(self.now - timedelta(hours=24)), day)
+
+    def test_prune_is_repeatable(self):
+        """Test that a second run folds nothing twice"""
+        from .retention import prune_karma_ledger
+
+        self._karma(self.author, 5, timedelta(days=40))
+        prune_karma_ledger(retention_days=30, now=self.now)
+        self.assertEqual(prune_karma_ledger(retention_days=30, now=self.now), [])
+        self.assertEqual(KarmaTransaction.get_karma_by_user_since(), {self.author.id: 5})
+
+    def test_unlike_after_prune_reverses_lifetime_karma(self):
+        """Test that unliking a like whose ledger row was folded takes its karma back"""
+        from .models import KarmaHourlyBucket, KarmaLifetimeTotal
+        from .outbox import drain_outbox
+        from .retention import prune_karma_ledger
+
+        client = APIClient()
+        client.force_authenticate(user=self.other)
+        for method, model, target in (('put', PostLike, 'posts'), ('post', CommentLike, 'comments')):
+            with self.subTest(method=method):
+                item = self.post if model is PostLike else Comment.objects.create(
+                    post=self.post, author=self.author, content='Old comment'
+                )
+                getattr(client, method)(f'/api/{target}/{item.id}/like/')
+                drain_outbox()
+                # Age the like and its karma past the retention period and fold them
+                old = self.now - timedelta(days=40)
+                model.objects.update(created_at=old)
+                KarmaTransaction.objects.update(created_at=old)
+                KarmaHourlyBucket.objects.update(hour=old.replace(minute=0, second=0, microsecond=0))
+                prune_karma_ledger(now=self.now)
+                self.assertFalse(KarmaTransaction.objects.exists())
+                self.assertNotEqual(KarmaLifetimeTotal.objects.get(user=self.author).amount, 0)
+
+                unlike = 'delete' if method == 'put' else 'post'
+                getattr(client, unlike)(f'/api/{target}/{item.id}/like/')
+                drain_outbox()
+                self.assertEqual(KarmaLifetimeTotal.objects.get(user=self.author).amount, 0)
+                self.assertEqual(KarmaTransaction.get_karma_by_user_since(), {})
+
+    def test_retention_must_cover_windows(self):
+        """Test that a retention shorter than the 7-day window is rejected"""
+        from .retention import get_retention_cutoff
+
+        with self.assertRaises(ValueError):
+            get_retention_cutoff(7)
+
+
+class TypedLikeTablesTestCase(TestCase):
+    """Test the PostLike/CommentLike tables and the ledger's link to them"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.author = User.objects.create_user(username='author', password='test123')
+        self.reader = User.objects.create_user(username='reader', password='test123')
+        self.post = Post.objects.create(author=self.author, content='Test post')
+        self.comment = Comment.objects.create(post=self.post, author=self.author, content='Root')
+        self.client.force_authenticate(user=self.reader)
+
+    def test_ledger_row_points_at_like(self):
+        """Test that drained karma references the like that earned it"""
+        from .outbox import drain_outbox
+
+        self.client.put(f'/api/comments/{self.comment.id}/like/')
+        drain_outbox()
+        like = CommentLike.objects.get()
+        self.assertEqual(KarmaTransaction.objects.get().comment_like_id, like.id)
+
+    def test_unlike_removes_only_its_own_karma(self):
+        """Test that one liker's unlike leaves another liker's karma row"""
+        from .outbox import drain_outbox
+
+        other = User.objects.create_user(username='other', password='test123')
+        self.client.put(f'/api/posts/{self.post.id}/like/')
+        drain_outbox()
+        self.client.force_authenticate(user=other)
+        self.client.put(f'/api/posts/{self.post.id}/like/')
+        drain_outbox()
+        kept = PostLike.objects.get(user=other)
+
+        self.client.force_authenticate(user=self.reader)
+        self.client.delete(f'/api/posts/{self.post.id}/like/')
+        drain_outbox()
+        self.assertEqual(list(KarmaTransaction.objects.values_list('post_like_id', flat=True)), [kept.id])
+
+    def test_unlike_reverses_unlinked_legacy_karma(self):
+        """Test that karma written before the like link is still reversed"""
+        from .outbox import drain_outbox
+
+        PostLike.objects.create(user=self.reader, post=self.post)
+        KarmaTransaction.objects.create(
+            user=self.author, amount=5, content_type=ContentType.objects.get_for_model(Post), object_id=self.post.id
+        )
+        self.client.delete(f'/api/posts/{self.post.id}/like/')
+        drain_outbox()
+        self.assertFalse(KarmaTransaction.objects.exists())
+
+    def test_copy_legacy_likes(self):
+        """Test that generic Like rows are copied once into the typed tables"""
+        from django.apps import apps
+        from importlib import import_module
+
+        copy_likes = import_module('feed.migrations.0010_copy_legacy_likes').copy_likes
+        Like.objects.create(user=self.reader, content_type=ContentType.objects.get_for_model(Post), object_id=self.post.id)
+        Like.objects.create(
+            user=self.reader, content_type=ContentType.objects.get_for_model(Comment), object_id=self.comment.id
+        )
+        # A like whose post was deleted is dropped
+        Like.objects.create(user=self.author, content_type=ContentType.objects.get_for_model(Post), object_id=999999)
+
+        copy_likes(apps, None)
+        copy_likes(apps, None)
+        self.assertEqual(list(PostLike.objects.values_list('user', 'post')), [(self.reader.id, self.post.id)])
+        self.assertEqual(list(CommentLike.objects.values_list('user', 'comment')), [(self.reader.id, self.comment.id)])
+
+    def test_recopy_reconciles_unlikes_from_older_servers(self):
+        """Test that re-copying drops copied likes an older server has since removed, but not native ones"""
+        from io import StringIO
+        from django.core.management import call_command
+
+        post_type = ContentType.objects.get_for_model(Post)
+        legacy = Like.objects.create(user=self.reader, content_type=post_type, object_id=self.post.id)
+        call_command('copy_legacy_likes', stdout=StringIO())
+        self.assertTrue(PostLike.objects.get(user=self.reader).from_legacy)
+        self.assertEqual(Post.objects.get(pk=self.post.pk).like_count, 1)
+
+        # An older server unlikes (legacy row gone) and likes another post;
+        # a new server writes its own like
+        other_post = Post.objects.create(author=self.author, content='Other post')
+        legacy.delete()
+        Like.objects.create(user=self.reader, content_type=post_type, object_id=other_post.id)
+        self.client.put(f'/api/comments/{self.comment.id}/like/')
+
+        out = StringIO()
+        call_command('copy_legacy_likes', stdout=out)
+        self.assertIn('Copied 1 likes, removed 1', out.getvalue())
+        self.assertEqual(list(PostLike.objects.values_list('post', flat=True)), [other_post.id])
+        self.assertEqual(CommentLike.objects.get().user, self.reader)
+        self.assertEqual(Post.objects.get(pk=self.post.pk).like_count, 0)
+        self.assertEqual(Post.objects.get(pk=other_post.pk).like_count, 1)
+
+
+    def test_recopy_keeps_unliked_copied_likes_removed(self):
+        """Test that unliking a copied like, by either endpoint, survives copy_legacy_likes"""
+        from io import StringIO
+        from django.core.management import call_command
+
+        post_type = ContentType.objects.get_for_model(Post)
+        comment_type = ContentType.objects.get_for_model(Comment)
+        Like.objects.create(user=self.reader, content_type=post_type, object_id=self.post.id)
+        Like.objects.create(user=self.reader, content_type=comment_type, object_id=self.comment.id)
+        call_command('copy_legacy_likes', stdout=StringIO())
+        self.assertEqual(PostLike.objects.count() + CommentLike.objects.count(), 2)
+
+        self.client.delete(f'/api/posts/{self.post.id}/like/')
+        self.client.post(f'/api/comments/{self.comment.id}/like/')
+        self.assertFalse(Like.objects.exists())
+
+        out = StringIO()
+        call_command('copy_legacy_likes', stdout=out)
+        self.assertIn('Copied 0 likes, removed 0', out.getvalue())
+        self.assertFalse(PostLike.objects.exists())
+        self.assertFalse(CommentLike.objects.exists())
+        self.assertEqual(Post.objects.get(pk=self.post.pk).like_count, 0)
+        self.assertEqual(Comment.objects.get(pk=self.comment.pk).like_count, 0)
+
+
+class BatchEndpointTestCase(TestCase):
+    """Test /api/batch/"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.author = User.objects.create_user(username='author', password='test123')
+        self.reader = User.objects.create_user(username='reader', password='test123')
+        self.post = Post.objects.create(author=self.author, content='Test post')
+        self.client.force_authenticate(user=self.reader)
+
+    def _batch(self, requests, **extra):
+        return self.client.post('/api/batch/', {'requests': requests, **extra}, format='json')
+
+    def test_runs_requests_in_order_as_viewer(self):
+        """Test that sub-requests see the batch's user and each other's writes"""
+        response = self._batch([
+            {'method': 'PUT', 'path': f'/api/posts/{self.post.id}/like/'},
+            {'method': 'GET', 'path': f'/api/posts/{self.post.id}/'},
+            {'method': 'POST', 'path': f'/api/posts/{self.post.id}/comments/', 'body': {'content': 'Hi'}},
+            {'method': 'GET', 'path': '/api/check-auth/'},
+        ])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.json()['results']
+        self.assertEqual([result['status'] for result in results], [201, 200, 201, 200])
+        self.assertTrue(results[1]['body']['is_liked'])
+        self.assertIn('ETag', results[1]['headers'])
+        self.assertEqual(Comment.objects.get().author, self.reader)
+
+    def test_conditional_sub_request(self):
+        """Test that per-item headers reach the view"""
+        etag = self.client.get(f'/api/posts/{self.post.id}/')['ETag']
+        response = self._batch([
+            {'path': f'/api/posts/{self.post.id}/', 'headers': {'If-None-Match': etag}},
+        ])
+        self.assertEqual(response.json()['results'][0]['status'], 304)
+
+    def test_atomic_batch_rolls_back(self):
+        """Test that a failing item undoes earlier writes in an atomic batch"""
+        response = self._batch([
+            {'method': 'PUT', 'path': f'/api/posts/{self.post.id}/like/'},
+            {'method': 'PUT', 'path': '/api/posts/999999/like/'},
+            {'method': 'GET', 'path': '/api/posts/'},
+        ], atomic=True)
+        data = response.json()
+        self.assertTrue(data['rolled_back'])
+        self.assertEqual([result['status'] for result in data['results']], [201, 404])
+        self.assertFalse(PostLike.objects.exists())
+
+    def test_atomic_rollback_drops_cached_reads(self):
+        """Test that a thread cached inside a rolled-back batch does not show its writes"""
+        from django.core.cache import cache
+
+        cache.clear()
+        response = self._batch([
+            {'method': 'POST', 'path': f'/api/posts/{self.post.id}/comments/', 'body': {'content': 'Ghost'}},
+            {'method': 'GET', 'path': f'/api/posts/{self.post.id}/'},
+            {'method': 'PUT', 'path': '/api/posts/999999/like/'},
+        ], atomic=True)
+        data = response.json()
+        self.assertTrue(data['rolled_back'])
+        self.assertEqual(len(data['results'][1]['body']['comments']), 1)
+
+        self.client.force_authenticate(user=None)
+        detail = self.client.get(f'/api/posts/{self.post.id}/').json()
+        self.assertEqual(detail['comments'], [])
+        self.assertEqual(detail['comment_count'], 0)
+
+    def test_permissions_apply_per_item(self):
+        """Test that anonymous batches can read but not write"""
+        self.client.force_authenticate(user=None)
+        response = self._batch([
+            {'path': '/api/posts/'},
+            {'method': 'PUT', 'path': f'/api/posts/{self.post.id}/like/'},
+        ])
+        self.assertEqual([result['status'] for result in response.json()['results']], [200, 403])
+
+    def test_limits_and_validation(self):
+        """Test batch size, cost, path and nesting checks"""
+        with self.settings(BATCH_MAX_REQUESTS=2):
+            response = self._batch([{'path': '/api/posts/'}] * 3)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        with self.settings(BATCH_MAX_COST=5):
+            response = self._batch([{'method': 'DELETE', 'path': f'/api/posts/{self.post.id}/like/'}] * 2)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self._batch([{'path': '/admin/'}]).status_code, status.HTTP_400_BAD_REQUEST)
+        results = self._batch([{'method': 'POST', 'path': '/api/batch/'}, {'path': '/api/nope/'}]).json()['results']
+        self.assertEqual([result['status'] for result in results], [400, 404])
+
+    def test_plain_django_responses_keep_their_body(self):
+        """Test that JsonResponse and text sub-responses come back decoded"""
+        results = self._batch([{'path': '/api/events/'}, {'path': '/api/metrics/'}]).json()['results']
+        self.assertEqual(results[0], {'status': 503, 'headers': {}, 'body': {'error': 'Live updates require an ASGI server'}})
+        self.assertEqual(results[1]['body'], {'error': 'Forbidden'})
+
+        self.reader.is_staff = True
+        self.reader.save()
+        results = self._batch([{'path': '/api/metrics/'}]).json()['results']
+        self.assertEqual(results[0]['status'], 200)
+        self.assertIn('# TYPE', results[0]['body'])
+
+
+class LiveEventStreamTestCase(TestCase):
+    """Test the pub/sub bus and the /api/events/ stream"""
+
+    def setUp(self):
+        import asyncio
+        from .events import LocalEventBus
+
+        self.loop = asyncio.new_event_loop()
+        self.bus = LocalEventBus()
+        self.author = User.objects.create_user(username='author', password='test123')
+        self.post = Post.objects.create(author=self.author, content='Test post')
+
+    def tearDown(self):
+        self.loop.close()
+
+    def _subscribe(self, topics, **kwargs):
+        async def subscribe():
+            return self.bus.subscribe(topics, **kwargs)
+        return self.loop.run_until_complete(subscribe())
+
+    def _receive(self, subscription):
+        return self.loop.run_until_complete(subscription.get(timeout=0.1))
+
+    def test_counter_events_coalesce(self):
+        """Test that rapid counter updates collapse into one summed event"""
+        subscription = self._subscribe({'posts'})
+        for delta in (1, 1, -1, 1):
+            self.bus.publish({'type': 'post.counters', 'id': self.post.id, 'like_count_delta': delta})
+        self.bus.publish({'type': 'leaderboard.changed'})
+        self.assertEqual(self._receive(subscription), [
+            {'type': 'post.counters', 'id': self.post.id, 'like_count_delta': 2},
+        ])
+        self.assertEqual(self._receive(subscription), [])
+
+    def test_overflow_asks_for_resync(self):
+        """Test that a slow reader gets one resync instead of an unbounded backlog"""
+        subscription = self._subscribe({'posts'}, max_pending=3)
+        for pk in range(10):
+            self.bus.publish({'type': 'post.counters', 'id': pk, 'like_count_delta': 1})
+        self.assertEqual(self._receive(subscription), [{'type': 'resync'}])
+        self.bus.publish({'type': 'post.counters', 'id': 1, 'like_count_delta': 1})
+        self.assertEqual(len(self._receive(subscription)), 1)
+
+    def test_writes_publish_after_commit(self):
+        """Test that like, comment and new-post writes reach subscribers"""
+        from unittest import mock
+
+        subscription = self._subscribe({'posts', 'leaderboard'})
+        client = APIClient()
+        client.force_authenticate(user=self.author)
+        with mock.patch('feed.events.get_bus', return_value=self.bus), self.settings(LEADERBOARD_EVENT_INTERVAL=0):
+            with self.captureOnCommitCallbacks(execute=True):
+                client.put(f'/api/posts/{self.post.id}/like/')
+            with self.captureOnCommitCallbacks(execute=True):
+                client.post(f'/api/posts/{self.post.id}/comments/', {'content': 'Hi'}, format='json')
+            with self.captureOnCommitCallbacks(execute=True):
+                client.post('/api/posts/', {'content': 'New'}, format='json')
+
+        events = {event['type']: event for event in self._receive(subscription)}
+        self.assertEqual(events['post.counters']['like_count_delta'], 1)
+        self.assertEqual(events['post.counters']['comment_count_delta'], 1)
+        self.assertEqual(events['post.created']['post']['content'], 'New')
+        self.assertIn('leaderboard.changed', events)
+
+    def test_leaderboard_event_is_throttled(self):
+        """Test that a burst of karma writes sends one leaderboard.changed now and one at the interval's end"""
+        import time
+        from unittest import mock
+        from .leaderboard import invalidate_leaderboards
+
+        subscription = self._subscribe({'leaderboard'})
+        with mock.patch('feed.events.get_bus', return_value=self.bus), self.settings(LEADERBOARD_EVENT_INTERVAL=0.3):
+            time.sleep(0.3)  # past any interval started by an earlier test
+            for _ in range(5):
+                with self.captureOnCommitCallbacks(execute=True):
+                    invalidate_leaderboards()
+            self.assertEqual(self._receive(subscription), [{'type': 'leaderboard.changed'}])
+            self.assertEqual(self.loop.run_until_complete(subscription.get(timeout=1)), [{'type': 'leaderboard.changed'}])
+            self.assertEqual(self._receive(subscription), [])
+
+    async def test_stream_endpoint(self):
+        """Test that the SSE endpoint frames published events and unsubscribes on disconnect"""
+        import asyncio
+        from django.test import AsyncClient
+        from .events import get_bus
+
+        response = await AsyncClient().get('/api/events/?topics=posts')
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        chunks = aiter(response.streaming_content)
+        self.assertEqual(await anext(chunks), b'retry: 3000\n\n')
+        get_bus().publish({'type': 'post.counters', 'id': 7, 'like_count_delta': 1})
+        frame = (await anext(chunks)).decode()
+        self.assertTrue(frame.startswith('event: post.counters\ndata: '))
+
+        # A client disconnect cancels the task waiting on the stream
+        waiting = asyncio.ensure_future(anext(chunks))
+        await asyncio.sleep(0)
+        waiting.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await waiting
+        self.assertEqual(get_bus().subscriber_count(), 0)
+
+    def test_stream_refused_under_wsgi(self):
+        """Test that a WSGI deployment answers 503 rather than hanging"""
+        response = Client().get('/api/events/')
+        self.assertEqual(response.status_code, 503)
+
+
+class AsyncReadPathTestCase(TestCase):
+    """Test the async feed, post detail and leaderboard views"""
+
+    def setUp(self):
+        self.author = User.objects.create_user(username='async_author', password='pass')
+        self.viewer = User.objects.create_user(username='async_viewer', password='pass')
+        self.posts = [Post.objects.create(author=self.author, content=f'Post {i}') for i in range(3)]
+        PostLike.objects.create(user=self.viewer, post=self.posts[0])
+        Comment.objects.create(post=self.posts[0], author=self.viewer, content='Reply')
+
+    def test_routes_resolve_to_async_views(self):
+        """Test that the read endpoints are served by coroutine views"""
+        from asgiref.sync import iscoroutinefunction
+        from django.urls import resolve
+
+        for path in ('/api/posts/', f'/api/posts/{self.posts[0].id}/', '/api/leaderboard/'):
+            self.assertTrue(iscoroutinefunction(resolve(path).func), path)
+
+    def _sync_response(self, viewset_action, path, **kwargs):
+        """The same request answered by the plain DRF viewset"""
+        from rest_framework.test import APIRequestFactory, force_authenticate
+
+        view_class, actions = viewset_action
+        request = APIRequestFactory().get(path)
+        force_authenticate(request, user=self.viewer)
+        response = view_class.as_view(actions)(request, **kwargs)
+        response.render()
+        return response
+
+    async def test_feed_matches_viewset(self):
+        """Test that the async feed returns what PostViewSet.list does"""
+        from asgiref.sync import sync_to_async
+        from django.test import AsyncClient
+        from .views import PostViewSet
+
+        client = AsyncClient()
+        await client.aforce_login(self.viewer)
+        response = await client.get('/api/posts/')
+        expected = await sync_to_async(self._sync_response)((PostViewSet, {'get': 'list'}), '/api/posts/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), expected.data)
+        self.assertEqual(response['ETag'], expected['ETag'])
+        self.assertTrue(response.json()['results'][-1]['is_liked'])
+
+        not_modified = await client.get('/api/posts/', headers={'If-None-Match': response['ETag']})
+        self.assertEqual(not_modified.status_code, 304)
+
+    async def test_detail_matches_viewset(self):
+        """Test that the async detail view returns the thread and the viewer's like"""
+        from asgiref.sync import sync_to_async
+        from django.test import AsyncClient
+        from .views import PostViewSet
+
+        client = AsyncClient()
+        await client.aforce_login(self.viewer)
+        pk = self.posts[0].id
+        response = await client.get(f'/api/posts/{pk}/')
+        expected = await sync_to_async(self._sync_response)(
+            (PostViewSet, {'get': 'retrieve'}), f'/api/posts/{pk}/', pk=pk
+        )
+        self.assertEqual(response.json(), expected.data)
+        self.assertTrue(response.json()['is_liked'])
+        self.assertEqual(len(response.json()['comments']), 1)
+
+        missing = await client.get('/api/posts/999999/')
+        self.assertEqual(missing.status_code, 404)
+
+    async def test_leaderboard_matches_viewset(self):
+        """Test that the async leaderboard ranks as LeaderboardViewSet does"""
+        from asgiref.sync import sync_to_async
+        from django.test import AsyncClient
+        from .views import LeaderboardViewSet
+
+        client = AsyncClient()
+        await client.aforce_login(self.viewer)
+        response = await client.get('/api/leaderboard/')
+        expected = await sync_to_async(self._sync_response)(
+            (LeaderboardViewSet, {'get': 'list'}), '/api/leaderboard/'
+        )
+        self.assertEqual(response.json(), expected.data)
+
+        invalid = await client.get('/api/leaderboard/?window=1y')
+        self.assertEqual(invalid.status_code, 400)
+
+    def test_writes_and_batch_still_reach_viewsets(self):
+        """Test that POSTs are delegated and batches can call the async views"""
+        client = APIClient()
+        client.force_authenticate(user=self.viewer)
+        created = client.post('/api/posts/', {'content': 'Fresh'}, format='json')
+        self.assertEqual(created.status_code, status.HTTP_201_CREATED)
+
+        response = client.post('/api/batch/', {'requests': [
+            {'method': 'GET', 'path': '/api/posts/'},
+            {'method': 'GET', 'path': f'/api/posts/{self.posts[0].id}/'},
+        ]}, format='json')
+        results = response.json()['results']
+        self.assertEqual([r['status'] for r in results], [200, 200])
+        self.assertEqual(results[0]['body']['results'][0]['content'], 'Fresh')
+
+
+@override_settings(SESSION_ENGINE='django.contrib.sessions.backends.cache')
+class UserSnapshotAuthTestCase(TestCase):
+    """Test the cached user snapshot behind check-auth and current-user,
+    with the cache session engine used when REDIS_URL is set"""
+
+    def setUp(self):
+        from django.core.cache import cache
+
+        cache.clear()
+        self.user = User.objects.create_user(username='snapshot_user', password='pass12345')
+        self.client = Client()
+        self.client.post('/api/login/', {'username': 'snapshot_user', 'password': 'pass12345'},
+                         content_type='application/json')
+
+    def test_check_auth_without_queries(self):
+        """Test that a warm snapshot answers check-auth and current-user with no queries"""
+        self.client.get('/api/check-auth/')
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/check-auth/')
+            current = self.client.get('/api/current-user/')
+        self.assertEqual(response.json(), {'authenticated': True, 'user': {'id': self.user.id, 'username': 'snapshot_user'}})
+        self.assertEqual(current.json()['user']['username'], 'snapshot_user')
+
+    def test_anonymous(self):
+        """Test that an anonymous session is not authenticated"""
+        with self.assertNumQueries(0):
+            response = Client().get('/api/check-auth/')
+        self.assertEqual(response.json(), {'authenticated': False})
+        self.assertEqual(Client().get('/api/current-user/').status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_logout_invalidates(self):
+        """Test that logging out ends the snapshot-backed session"""
+        self.client.get('/api/check-auth/')
+        self.client.post('/api/logout/')
+        self.assertEqual(self.client.get('/api/check-auth/').json(), {'authenticated': False})
+
+    def test_logout_revokes_replayed_cookie(self):
+        """Test that a session cookie replayed after logout is rejected, with
+        both the cache and the default database session engine"""
+        for engine in ('django.contrib.sessions.backends.cache', 'django.contrib.sessions.backends.db'):
+            with self.subTest(engine=engine), override_settings(SESSION_ENGINE=engine):
+                client = Client()
+                client.post('/api/login/', {'username': 'snapshot_user', 'password': 'pass12345'},
+                            content_type='application/json')
+                cookie = client.cookies[settings.SESSION_COOKIE_NAME].value
+                self.assertTrue(client.get('/api/check-auth/').json()['authenticated'])
+                client.post('/api/logout/')
+
+                replay = Client()
+                replay.cookies[settings.SESSION_COOKIE_NAME] = cookie
+                self.assertEqual(replay.get('/api/check-auth/').json(), {'authenticated': False})
+                response = replay.post('/api/posts/', {'content': 'Replayed'}, content_type='application/json')
+                self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_password_change_invalidates(self):
+        """Test that a password change logs out sessions holding the old hash"""
+        self.client.get('/api/check-auth/')
+        self.user.set_password('another-pass')
+        self.user.save()
+        self.assertEqual(self.client.get('/api/check-auth/').json(), {'authenticated': False})
+
+    def test_rename_and_deactivate_refresh(self):
+        """Test that saving the user refreshes the snapshot"""
+        self.client.get('/api/check-auth/')
+        self.user.username = 'renamed_user'
+        self.user.save()
+        self.assertEqual(self.client.get('/api/check-auth/').json()['user']['username'], 'renamed_user')
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get('/api/check-auth/').json(), {'authenticated': False})
+
+    def test_deleted_user_invalidates(self):
+        """Test that deleting the user ends the session"""
+        self.client.get('/api/check-auth/')
+        self.user.delete()
+        self.assertEqual(self.client.get('/api/check-auth/').json(), {'authenticated': False})
+
+    def test_writes_still_get_a_real_user(self):
+        """Test that other views keep authenticating with a full User instance"""
+        response = self.client.post('/api/posts/', {'content': 'Hello'}, content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Post.objects.get().author, self.user)
+
+
+class RequestMetricsTestCase(TestCase):
+    """Test the request metrics middleware and /api/metrics/"""
+
+    def setUp(self):
+        self.staff = User.objects.create_user(username='metrics_staff', password='pass', is_staff=True)
+        self.author = User.objects.create_user(username='metrics_author', password='pass')
+        self.post = Post.objects.create(author=self.author, content='Measured')
+
+    def _series(self):
+        client = Client()
+        client.force_login(self.staff)
+        response = client.get('/api/metrics/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        series = {}
+        for line in response.content.decode().splitlines():
+            if line and not line.startswith('#'):
+                name, value = line.rsplit(' ', 1)
+                series[name] = float(value)
+        return series
+
+    def _delta(self, before, after, name):
+        return after.get(name, 0) - before.get(name, 0)
+
+    def test_records_route_latency_queries_and_size(self):
+        """Test that a request shows up under its URL pattern with its SQL count"""
+        route = '/api/posts/<int:pk>/'
+        before = self._series()
+        self.client.get(f'/api/posts/{self.post.id}/')
+        after = self._series()
+
+        self.assertEqual(self._delta(before, after, f'feed_http_requests_total{{route="{route}",method="GET",status="200"}}'), 1)
+        self.assertEqual(self._delta(before, after, f'feed_http_request_duration_seconds_count{{route="{route}",method="GET"}}'), 1)
+        self.assertEqual(self._delta(before, after, f'feed_http_response_size_bytes_count{{route="{route}"}}'), 1)
+        self.assertGreater(self._delta(before, after, f'feed_http_request_queries_sum{{route="{route}"}}'), 0)
+        self.assertGreater(self._delta(before, after, f'feed_db_query_duration_seconds_total{{route="{route}"}}'), 0)
+
+    async def test_counts_queries_in_async_views(self):
+        """Test that ORM calls made from async views are attributed to the request"""
+        from asgiref.sync import sync_to_async
+        from django.test import AsyncClient
+
+        before = await sync_to_async(self._series)()
+        await AsyncClient().get('/api/posts/')
+        after = await sync_to_async(self._series)()
+        self.assertGreater(self._delta(before, after, 'feed_http_request_queries_sum{route="/api/posts/"}'), 0)
+
+    def test_cache_hits_and_misses(self):
+        """Test that leaderboard snapshot reuse is counted as a hit"""
+        from .leaderboard import invalidate_leaderboards
+
+        invalidate_leaderboards()
+        before = self._series()
+        self.client.get('/api/leaderboard/')
+        self.client.get('/api/leaderboard/')
+        after = self._series()
+        self.assertEqual(self._delta(before, after, 'feed_cache_requests_total{cache="leaderboard",result="miss"}'), 1)
+        self.assertEqual(self._delta(before, after, 'feed_cache_requests_total{cache="leaderboard",result="hit"}'), 1)
+
+    def test_histogram_buckets_are_cumulative(self):
+        """Test the exposition of a histogram"""
+        from . import metrics
+
+        totals = {}
+        for value in (0.003, 0.04, 20):
+            bucket = metrics.bisect.bisect_left(metrics.LATENCY_BUCKETS, value)
+            key = ('feed_http_request_duration_seconds', (('route', '/x'),), bucket)
+            totals[key] = totals.get(key, 0) + 1
+        text = metrics.render_prometheus(totals)
+        self.assertIn('feed_http_request_duration_seconds_bucket{route="/x",le="0.005"} 1', text)
+        self.assertIn('feed_http_request_duration_seconds_bucket{route="/x",le="0.05"} 2', text)
+        self.assertIn('feed_http_request_duration_seconds_bucket{route="/x",le="+Inf"} 3', text)
+
+    def test_sums_worker_files(self):
+        """Test that totals flushed by other workers are added in multiprocess mode"""
+        import json
+        import os
+        import tempfile
+        from django.test import override_settings
+        from . import metrics
+
+        with tempfile.TemporaryDirectory() as directory:
+            name = 'feed_http_requests_total'
+            labels = [['route', '/api/posts/'], ['method', 'GET'], ['status', '200']]
+            for pid in (999998, 999999):
+                with open(os.path.join(directory, f'metrics_{pid}.json'), 'w') as handle:
+                    json.dump([[name, labels, '', 5]], handle)
+            key = (name, tuple(tuple(pair) for pair in labels), '')
+            with override_settings(METRICS_DIR=directory):
+                metrics._flush(force=True)
+                self.assertTrue(os.path.exists(os.path.join(directory, f'metrics_{os.getpid()}.json')))
+                self.assertEqual(metrics.collect_all()[key], metrics.collect().get(key, 0) + 10)
+
+    def test_endpoint_is_internal(self):
+        """Test that only staff, the bearer token or allowed networks can scrape"""
+        from django.test import override_settings
+
+        self.assertEqual(self.client.get('/api/metrics/').status_code, 403)
+        with override_settings(METRICS_TOKEN='s3cret'):
+            self.assertEqual(self.client.get('/api/metrics/', headers={'Authorization': 'Bearer s3cret'}).status_code, 200)
+            self.assertEqual(self.client.get('/api/metrics/', headers={'Authorization': 'Bearer nope'}).status_code, 403)
+        with override_settings(METRICS_ALLOWED_NETWORKS=['127.0.0.0/8']):
+            self.assertEqual(self.client.get('/api/metrics/').status_code, 200)
+
+
+class QueryBudgetTestCase(TestCase):
+    """Test that no endpoint's query count grows with the amount of data"""
+
+    def _assert_within_budget(self, scales):
+        from .query_budget import ENDPOINTS, measure, seed
+
+        viewer = User.objects.create_user(username='budget_viewer', password='pass')
+        client = Client()
+        client.force_login(viewer)
+        budgets = {name: budget for name, _method, _path, _body, budget in ENDPOINTS}
+        counts = {}
+        ids = None
+        for posts, comments in scales:
+            ids = seed(viewer, posts, comments, ids)
+            for name, status_code, queries in measure(client, ENDPOINTS, dict(ids)):
+                counts.setdefault(name, []).append(queries)
+                with self.subTest(endpoint=name, posts=posts, comments=comments):
+                    self.assertLess(status_code, 400)
+                    self.assertLessEqual(queries, budgets[name])
+
+        # The largest scale may never cost more than the smallest
+        for name, per_scale in counts.items():
+            with self.subTest(endpoint=name):
+                self.assertLessEqual(per_scale[-1], per_scale[0])
+
+    def test_endpoints_within_budget(self):
+        """Test every endpoint in feed.query_budget at 1/100 comments and 1/20 posts"""
+        from .query_budget import SCALES
+        self._assert_within_budget([scale for scale in SCALES if scale[1] <= 100])
+
+    @tag('slow')
+    @skipUnless(os.getenv('RUN_SLOW_TESTS'), 'set RUN_SLOW_TESTS=1 to seed 10k comments')
+    def test_endpoints_within_budget_at_every_scale(self):
+        """Test every endpoint in feed.query_budget at 1/100/10k comments and 1/20 posts"""
+        from .query_budget import SCALES
+        self._assert_within_budget(SCALES)
+
+    def test_report_command(self):
+        """Test that the report lists every endpoint and leaves no data behind"""
+        from io import StringIO
+        from django.core.management import call_command
+        from .query_budget import ENDPOINTS
+
+        out = StringIO()
+        call_command('query_budget_report', max_comments=1, stdout=out)
+        report = out.getvalue()
+        for name, *_rest in ENDPOINTS:
+            self.assertIn(name, report)
+        self.assertNotIn('OVER', report)
+        self.assertFalse(Post.objects.exists())
+
+
+class SyntheticSeedTestCase(TestCase):
+    """Test the seed_feed data generator and the benchmark_load runner"""
+
+    def _seed(self, **options):
+        from .seeding import seed_feed
+
+        defaults = {'users': 12, 'posts': 15, 'comments_per_post': 8, 'max_depth': 4,
+                    'likes_per_post': 4, 'likes_per_comment': 2, 'days': 3, 'batch_size': 7, 'seed': 42}
+        return seed_feed(**{**defaults, **options})
+
+    def test_seeded_data_is_consistent(self):
+        """Test that trees, counters, karma and buckets agree with each other"""
+        from .models import KarmaHourlyBucket
+
+        counts = self._seed()
+        self.assertEqual(Post.objects.count(), counts['posts'])
+        self.assertEqual(Comment.objects.count(), counts['comments'])
+        self.assertGreater(counts['comments'], 0)
+
+        for comment in Comment.objects.select_related('parent'):
+            self.assertLessEqual(comment.depth, 4)
+            self.assertTrue(comment.path.endswith(Comment.path_segment(comment.id)))
+            if comment.parent is not None:
+                self.assertTrue(comment.path.startswith(comment.parent.path))
+                self.assertEqual(comment.depth, comment.parent.depth + 1)
+                self.assertGreaterEqual(comment.created_at, comment.parent.created_at)
+
+        for post in Post.objects.all():
+            self.assertEqual(post.like_count, post.likes.count())
+            self.assertEqual(post.comment_count, post.comments.count())
+
+        ledger = KarmaTransaction.objects.aggregate(total=Sum('amount'))['total']
+        self.assertEqual(ledger, 5 * counts['post_likes'] + counts['comment_likes'])
+        self.assertEqual(KarmaHourlyBucket.objects.aggregate(total=Sum('amount'))['total'], ledger)
+
+    def test_back_dated_and_reproducible(self):
+        """Test that content spreads over the requested days and the seed fixes the shape"""
+        first = self._seed()
+        oldest = Post.objects.order_by('created_at').first().created_at
+        self.assertLess(oldest, timezone.now() - timedelta(hours=12))
+        self.assertGreater(oldest, timezone.now() - timedelta(days=3, minutes=1))
+        self.assertEqual(self._seed(), first)
+
+    def test_regular_writes_after_seeding(self):
+        """Test that explicit comment ids leave the id sequence usable"""
+        self._seed()
+        post = Post.objects.first()
+        comment = Comment.objects.create(post=post, author=post.author, content='After seeding')
+        self.assertEqual(comment.path, Comment.path_segment(comment.id))
+
+    def test_benchmark_load_report(self):
+        """Test that the load runner reports every endpoint as JSON"""
+        import json
+        from io import StringIO
+        from django.core.management import call_command
+        from .management.commands.benchmark_load import MIX
+
+        self._seed()
+        out = StringIO()
+        call_command('benchmark_load', concurrency=1, requests=40, seed=1, stdout=out)
+        report = json.loads(out.getvalue())
+        self.assertEqual(set(report['endpoints']), set(MIX))
+        self.assertEqual(report['total']['requests'], 40)
+        self.assertEqual(report['total']['errors'], 0)
+        self.assertIn('p99_ms', report['total'])
+
+
+class FullTextSearchTestCase(TestCase):
+    """Test /api/search/ over the full-text index"""
+
+    def setUp(self):
+        self.author = User.objects.create_user(username='search_author', password='pass')
+        self.viewer = User.objects.create_user(username='search_viewer', password='pass')
+        self.strong = Post.objects.create(author=self.author, content='Gardening tips: gardening in winter gardens')
+        self.weak = Post.objects.create(author=self.author, content='A long post that mentions gardening once among many other words')
+        self.other = Post.objects.create(author=self.author, content='Nothing relevant here')
+        self.comment = Comment.objects.create(post=self.other, author=self.viewer, content='I love gardening too')
+        self.client = APIClient()
+
+    def _search(self, **params):
+        response = self.client.get('/api/search/', params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.json()
+
+    def test_ranks_posts_and_comments(self):
+        """Test that matches across both kinds come back best first, with stemming"""
+        results = self._search(q='garden')['results']
+        found = {(r['type'], r['post']['id'] if r['type'] == 'post' else r['comment']['id']) for r in results}
+        self.assertEqual(found, {('post', self.strong.id), ('post', self.weak.id), ('comment', self.comment.id)})
+        scores = [r['score'] for r in results]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+        posts = [r['post']['id'] for r in results if r['type'] == 'post']
+        self.assertEqual(posts, [self.strong.id, self.weak.id])
+        comment = next(r for r in results if r['type'] == 'comment')
+        self.assertEqual(comment['post_id'], self.other.id)
+
+    def test_type_filter_and_all_words(self):
+        """Test type=posts/comments and that every word must match"""
+        self.assertEqual({r['type'] for r in self._search(q='gardening', type='comments')['results']}, {'comment'})
+        self.assertEqual(len(self._search(q='gardening', type='posts')['results']), 2)
+        self.assertEqual([r['post']['id'] for r in self._search(q='gardening winter')['results']], [self.strong.id])
+
+    def test_keyset_paging(self):
+        """Test that following next visits every match exactly once, in rank order"""
+        for i in range(7):
+            Post.objects.create(author=self.author, content=f'Gardening note {i}')
+        seen, url = [], '/api/search/?q=gardening&limit=3'
+        while url:
+            page = self.client.get(url).json()
+            self.assertLessEqual(len(page['results']), 3)
+            seen.extend((r['type'], r.get('post', r.get('comment'))['id'], r['score']) for r in page['results'])
+            url = page['next']
+        self.assertEqual(len(seen), 10)
+        self.assertEqual(len({(kind, pk) for kind, pk, _ in seen}), 10)
+        self.assertEqual([s for _, _, s in seen], sorted((s for _, _, s in seen), reverse=True))
+
+    def test_index_follows_writes(self):
+        """Test that inserts, edits and deletes, including bulk ones, update the index"""
+        Post.objects.bulk_create([Post(author=self.author, content='Bulk inserted orchids')])
+        self.assertEqual(len(self._search(q='orchids')['results']), 1)
+
+        self.weak.content = 'Now about orchids instead'
+        self.weak.save()
+        self.assertEqual(len(self._search(q='orchids')['results']), 2)
+        self.assertNotIn(self.weak.id, [r['post']['id'] for r in self._search(q='gardening', type='posts')['results']])
+
+        self.comment.delete()
+        self.assertEqual(self._search(q='gardening', type='comments')['results'], [])
+        Post.objects.filter(pk=self.strong.pk).update(like_count=3)
+        self.assertEqual(self._search(q='winter')['results'][0]['post']['like_count'], 3)
+
+    def test_viewer_state_and_input_handling(self):
+        """Test is_liked, hostile input, prefix matching and validation"""
+        PostLike.objects.create(user=self.viewer, post=self.strong)
+        self.client.force_authenticate(user=self.viewer)
+        first = self._search(q='winter')['results'][0]
+        self.assertTrue(first['post']['is_liked'])
+
+        # FTS operators are matched as plain words, never parsed
+        self.assertEqual(self._search(q='"garden* OR NEAR(')['results'], [])
+        self.assertEqual(self._search(q='winter*')['results'][0]['post']['id'], self.strong.id)
+        self.assertEqual(len(self._search(q='garde', type='posts')['results']), 2)
+        self.assertEqual(self._search(q='!!!')['results'], [])
+        self.assertEqual(self.client.get('/api/search/').status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get('/api/search/?q=x&type=users').status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get('/api/search/?q=x&cursor=bogus').status_code, status.HTTP_404_NOT_FOUND)
+
+
+class AdminScalabilityTestCase(TestCase):
+    """Test that admin changelists stay flat as tables grow"""
+
+    CHANGELISTS = ['post', 'comment', 'like', 'postlike', 'commentlike', 'karmatransaction']
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser(username='admin', password='pass123')
+        self.client = Client()
+        self.client.force_login(self.admin)
+
+    def _grow(self, count):
+        for i in range(count):
+            author = User.objects.create_user(username=f'author_{User.objects.count()}', password='pass123')
+            post = Post.objects.create(author=author, content=f'Post about tomatoes {i}')
+            parent = Comment.objects.create(post=post, author=author, content='Top level')
+            Comment.objects.create(post=post, author=self.admin, parent=parent, content='Reply')
+            PostLike.objects.create(user=self.admin, post=post)
+            CommentLike.objects.create(user=author, comment=parent)
+            Like.objects.create(user=author, content_type=ContentType.objects.get_for_model(Post), object_id=post.id)
+            KarmaTransaction.objects.create(
+                user=author, amount=5, content_type=ContentType.objects.get_for_model(Post), object_id=post.id
+            )
+
+    def _query_count(self, path):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(path)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        """Test that no changelist issues per-row queries"""
+        self._grow(2)
+        small = {name: self._query_count(f'/admin/feed/{name}/') for name in self.CHANGELISTS}
+        self._grow(10)
+        large = {name: self._query_count(f'/admin/feed/{name}/') for name in self.CHANGELISTS}
+        self.assertEqual(small, large)
+
+    def test_estimated_count_for_unfiltered_large_tables(self):
+        """Test that the planner estimate replaces COUNT(*) only for unfiltered lists"""
+        from unittest import mock
+        from .admin import EstimatedCountPaginator, ESTIMATED_COUNT_THRESHOLD
+        self._grow(3)
+        estimate = ESTIMATED_COUNT_THRESHOLD * 5
+        with mock.patch('feed.admin.estimate_row_count', return_value=estimate):
+            self.assertEqual(EstimatedCountPaginator(Post.objects.all(), 100).count, estimate)
+            filtered = Post.objects.filter(author=self.admin)
+            self.assertEqual(EstimatedCountPaginator(filtered, 100).count, 0)
+            response = self.client.get('/admin/feed/post/')
+            self.assertContains(response, str(estimate))
+        with mock.patch('feed.admin.estimate_row_count', return_value=10):
+            self.assertEqual(EstimatedCountPaginator(Post.objects.all(), 100).count, 3)
+
+    def test_search_uses_full_text_index_and_username(self):
+        """Test that admin and autocomplete search match content and exact usernames"""
+        self._grow(2)
+        Post.objects.create(author=self.admin, content='Nothing relevant')
+        response = self.client.get('/admin/feed/post/?q=tomatoes')
+        self.assertEqual(len(response.context['cl'].result_list), 2)
+        response = self.client.get('/admin/feed/post/?q=admin')
+        self.assertEqual([p.author_id for p in response.context['cl'].result_list], [self.admin.id])
+        response = self.client.get('/admin/feed/comment/?q=reply')
+        self.assertEqual(len(response.context['cl'].result_list), 2)
+
+        response = self.client.get('/admin/autocomplete/', {
+            'term': 'tomatoes', 'app_label': 'feed', 'model_name': 'comment', 'field_name': 'post',
+        })
+        self.assertEqual(len(response.json()['results']), 2)
+
+
+class HotRankingTestCase(TestCase):
+    """Test the hot and top feed orderings and the stored hot score"""
+
+    def setUp(self):
+        self.author = User.objects.create_user(username='author', password='pass123')
+        self.fans = [User.objects.create_user(username=f'fan{i}', password='pass123') for i in range(8)]
+        self.client = APIClient()
+
+    def _posts(self, path):
+        return [post['id'] for post in self.client.get(path).json()['results']]
+
+    def _like(self, post, count):
+        for fan in self.fans[:count]:
+            self.client.force_authenticate(user=fan)
+            self.client.put(f'/api/posts/{post.id}/like/')
+        self.client.force_authenticate(user=None)
+
+    def test_top_query_plans(self):
+        """Test that all-time top pages walk feed_post_top_idx and windowed top
+        reads only the window's created_at range"""
+        from django.db import connection
+        from django.db.models import Q
+        from .ranking import rank_posts
+
+        if connection.vendor != 'sqlite':
+            self.skipTest('EXPLAIN QUERY PLAN is SQLite syntax')
+
+        def plan(queryset):
+            sql, params = queryset.query.sql_with_params()
+            with connection.cursor() as cursor:
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+                return ' | '.join(row[-1] for row in cursor.fetchall())
+
+        top = rank_posts(Post.objects.all(), 'top', 'all')
+        for queryset in (top, top.filter(Q(top_score__lt=5) | Q(top_score=5, id__lt=10))):
+            steps = plan(queryset[:21])
+            self.assertIn('USING INDEX feed_post_top_idx', steps)
+            self.assertNotIn('TEMP B-TREE', steps)
+        for window in ('24h', '7d', '30d'):
+            steps = plan(rank_posts(Post.objects.all(), 'top', window)[:21])
+            self.assertRegex(steps, r'SEARCH feed_post USING INDEX \w+ \(created_at>\?\)')
+
+    def test_score_follows_likes_and_comments(self):
+        """Test that counter writes keep hot_score equal to a fresh computation"""
+        post = Post.objects.create(author=self.author, content='Scored')
+        self._like(post, 3)
+        self.client.force_authenticate(user=self.fans[0])
+        self.client.post(f'/api/posts/{post.id}/comments/', {'content': 'Hi'}, format='json')
+        self.client.delete(f'/api/posts/{post.id}/like/')
+        post.refresh_from_db()
+        self.assertEqual((post.like_count, post.comment_count), (2, 1))
+        self.assertAlmostEqual(post.hot_score, Post.compute_hot_score(post.created_at, 2, 1), places=6)
+
+    def test_hot_and_top_orderings(self):
+        """Test that engagement outranks recency within the half-life, and top's window"""
+        old = Post.objects.create(author=self.author, content='Old but popular')
+        Post.objects.filter(pk=old.pk).update(created_at=timezone.now() - timedelta(days=10))
+        popular = Post.objects.create(author=self.author, content='Popular')
+        Post.objects.filter(pk=popular.pk).update(created_at=timezone.now() - timedelta(hours=6))
+        fresh = Post.objects.create(author=self.author, content='Fresh')
+        from .ranking import refresh_hot_scores
+        refresh_hot_scores()
+        self._like(popular, 4)
+        self._like(old, 8)
+
+        self.assertEqual(self._posts('/api/posts/')[:3], [fresh.id, popular.id, old.id])
+        self.assertEqual(self._posts('/api/posts/?ordering=hot')[:3], [popular.id, fresh.id, old.id])
+        self.assertEqual(self._posts('/api/posts/?ordering=top'), [popular.id, fresh.id])
+        self.assertEqual(self._posts('/api/posts/?ordering=top&window=all'), [old.id, popular.id, fresh.id])
+
+        response = self.client.get('/api/posts/?ordering=best')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('error', response.json())
+        response = self.client.get('/api/posts/?ordering=top&window=1y')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get('/api/posts/?ordering=hot&cursor=' + 'x' * 8)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_keyset_paging_costs_the_same_as_recency(self):
+        """Test that hot and top pages cover every post once, at the recent feed's query cost"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        posts = [Post.objects.create(author=self.author, content=f'Post {i}') for i in range(25)]
+        for i, post in enumerate(posts[:8]):
+            self._like(post, i % 4)
+
+        def walk(path):
+            seen, costs = [], []
+            while path:
+                with CaptureQueriesContext(connection) as queries:
+                    page = self.client.get(path).json()
+                costs.append(len(queries))
+                seen.extend(post['id'] for post in page['results'])
+                path = page['next']
+            return seen, costs
+
+        _, recent_costs = walk('/api/posts/?page_size=10')
+        for ordering in ('hot', 'top&window=all'):
+            seen, costs = walk(f'/api/posts/?page_size=10&ordering={ordering}')
+            self.assertEqual(sorted(seen), sorted(post.id for post in posts))
+            self.assertEqual(costs, recent_costs)
+        hot = [post['id'] for post in self.client.get('/api/posts/?ordering=hot&page_size=30').json()['results']]
+        scores = dict(Post.objects.values_list('id', 'hot_score'))
+        self.assertEqual([scores[pk] for pk in hot], sorted(scores.values(), reverse=True))
+
+    def test_refresh_reconciles_drift(self):
+        """Test that refresh_hot_scores rescores posts whose counters changed behind its back"""
+        from django.core.management import call_command
+        from io import StringIO
+        post = Post.objects.create(author=self.author, content='Drifted')
+        Post.objects.filter(pk=post.pk).update(like_count=5, hot_score=0)
+        out = StringIO()
+        call_command('refresh_hot_scores', stdout=out)
+        self.assertIn('1 posts rescored', out.getvalue())
+        post.refresh_from_db()
+        self.assertAlmostEqual(post.hot_score, Post.compute_hot_score(post.created_at, 5, 0), places=9)
+
+
+class FollowTimelineTestCase(TestCase):
+    """Test follows and fan-out-on-write home timelines"""
+
+    def setUp(self):
+        self.reader = User.objects.create_user(username='reader', password='pass123')
+        self.friend = User.objects.create_user(username='friend', password='pass123')
+        self.stranger = User.objects.create_user(username='stranger', password='pass123')
+        self.client = APIClient()
+
+    def _as(self, user):
+        self.client.force_authenticate(user=user)
+        return self.client
+
+    def _post(self, user, content):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self._as(user).post('/api/posts/', {'content': content}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response.json()['id']
+
+    def _timeline(self, user, path='/api/timeline/'):
+        response = self._as(user).get(path)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.json()
+
+    def _walk(self, user, page_size):
+        seen, path = [], f'/api/timeline/?page_size={page_size}'
+        while path:
+            page = self._timeline(user, path)
+            self.assertLessEqual(len(page['results']), page_size)
+            seen.extend(post['id'] for post in page['results'])
+            path = page['next']
+        return seen
+
+    def test_follow_is_idempotent(self):
+        """Test follow/unfollow status codes, counts and validation"""
+        from .models import Follow, FollowerCount
+        client = self._as(self.reader)
+        url = f'/api/users/{self.friend.id}/follow/'
+        self.assertEqual(client.put(url).status_code, status.HTTP_201_CREATED)
+        response = client.put(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(response.json()['changed'])
+        self.assertEqual(FollowerCount.objects.get(user=self.friend).count, 1)
+        self.assertTrue(client.delete(url).json()['changed'])
+        self.assertFalse(client.delete(url).json()['changed'])
+        self.assertEqual(FollowerCount.objects.get(user=self.friend).count, 0)
+        self.assertFalse(Follow.objects.exists())
+
+        self.assertEqual(client.put(f'/api/users/{self.reader.id}/follow/').status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(client.put('/api/users/999999/follow/').status_code, status.HTTP_404_NOT_FOUND)
+        self.client.force_authenticate(user=None)
+        self.assertEqual(self.client.put(url).status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(self.client.get('/api/timeline/').status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_new_posts_fan_out_to_followers(self):
+        """Test that the timeline holds own and followed posts only, newest first"""
+        earlier = self._post(self.friend, 'Before the follow')
+        self._as(self.reader).put(f'/api/users/{self.friend.id}/follow/')
+        own = self._post(self.reader, 'My own post')
+        later = self._post(self.friend, 'After the follow')
+        other = self._post(self.stranger, 'Not followed')
+
+        ids = [post['id'] for post in self._timeline(self.reader)['results']]
+        self.assertEqual(ids, [later, own, earlier])
+        self.assertEqual([post['id'] for post in self._timeline(self.stranger)['results']], [other])
+
+        self._as(self.reader).delete(f'/api/users/{self.friend.id}/follow/')
+        self.assertEqual([post['id'] for post in self._timeline(self.reader)['results']], [own])
+
+    def test_worker_fans_out_when_not_inline(self):
+        """Test that with FEED_FANOUT_INLINE off posts wait for fan_out_timelines"""
+        from django.core.management import call_command
+        from django.test import override_settings
+        from io import StringIO
+        self._as(self.reader).put(f'/api/users/{self.friend.id}/follow/')
+        with override_settings(FEED_FANOUT_INLINE=False):
+            post_id = self._post(self.friend, 'Queued')
+        self.assertEqual(self._timeline(self.reader)['results'], [])
+        out = StringIO()
+        call_command('fan_out_timelines', stdout=out)
+        self.assertIn('Fanned out 1 posts', out.getvalue())
+        self.assertEqual([post['id'] for post in self._timeline(self.reader)['results']], [post_id])
+
+    def test_high_follower_authors_are_read_on_demand(self):
+        """Test fan-out on read above the threshold, merged and paged with the entries"""
+        from django.test import override_settings
+        from .models import TimelineEntry
+        celebrity = User.objects.create_user(username='celebrity', password='pass123')
+        for user in (self.reader, self.stranger):
+            self._as(user).put(f'/api/users/{celebrity.id}/follow/')
+        self._as(self.reader).put(f'/api/users/{self.friend.id}/follow/')
+
+        with override_settings(FEED_FANOUT_MAX_FOLLOWERS=2):
+            expected = []
+            for i in range(12):
+                author = celebrity if i % 3 == 0 else self.friend
+                expected.append(self._post(author, f'Post {i}'))
+            # The celebrity's posts reach only the celebrity's own timeline
+            self.assertFalse(TimelineEntry.objects.filter(user=self.reader, post__author=celebrity).exists())
+            self.assertEqual(self._walk(self.reader, 5), expected[::-1])
+            self.assertEqual(self._walk(self.stranger, 2), [pk for i, pk in enumerate(expected) if i % 3 == 0][::-1])
+
+    def test_read_on_demand_posts_stay_after_dropping_below_threshold(self):
+        """Test that the fan-out decision sticks to each post when the follower count changes"""
+        from django.test import override_settings
+        from .models import TimelineEntry
+        celebrity = User.objects.create_user(username='celebrity', password='pass123')
+        for user in (self.reader, self.stranger):
+            self._as(user).put(f'/api/users/{celebrity.id}/follow/')
+
+        with override_settings(FEED_FANOUT_MAX_FOLLOWERS=2):
+            before = self._post(celebrity, 'Read on demand')
+            self._as(self.stranger).delete(f'/api/users/{celebrity.id}/follow/')
+            after = self._post(celebrity, 'Fanned out')
+            self.assertEqual([post['id'] for post in self._timeline(self.reader)['results']], [after, before])
+            self.assertEqual(
+                list(TimelineEntry.objects.filter(user=self.reader).values_list('post_id', flat=True)), [after]
+            )
+
+            # A new follower gets the fanned-out post as an entry and reads the other
+            self._as(self.stranger).put(f'/api/users/{celebrity.id}/follow/')
+            self.assertEqual([post['id'] for post in self._timeline(self.stranger)['results']], [after, before])
+
+    def test_inline_drain_fans_out_only_its_own_post(self):
+        """Test that the inline drain leaves other queued posts to the worker"""
+        from django.test import override_settings
+        from .models import FanoutEvent
+        with override_settings(FEED_FANOUT_INLINE=False):
+            queued = self._post(self.stranger, 'Queued')
+        own = self._post(self.friend, 'Inline')
+        self.assertEqual(list(FanoutEvent.objects.values_list('post_id', flat=True)), [queued])
+        self.assertEqual([post['id'] for post in self._timeline(self.friend)['results']], [own])
+
+    def test_timeline_pages_cost_the_same(self):
+        """Test that every timeline page costs the same number of queries"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        self._as(self.reader).put(f'/api/users/{self.friend.id}/follow/')
+        for i in range(25):
+            self._post(self.friend, f'Post {i}')
+        costs, path = [], '/api/timeline/?page_size=10'
+        while path:
+            with CaptureQueriesContext(connection) as queries:
+                path = self._timeline(self.reader, path)['next']
+            costs.append(len(queries))
+        self.assertEqual(len(costs), 3)
+        self.assertEqual(len(set(costs)), 1)
+        response = self._as(self.reader).get('/api/timeline/?cursor=bogus')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
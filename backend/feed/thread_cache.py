@@ -0,0 +1,43 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from .metrics import record_cache
+from .threads import load_thread_page
+
+
+def _page_key(post, parent, after_path, limits):
+    # Every comment write and comment like bumps the post's updated_at in the
+    # same transaction (see feed.counters), so a write moves readers in every
+    # process to a new key; no per-process version counter has to be told.
+    # created_at guards against a recycled post id picking up stale entries.
+    raw = '|'.join(str(part) for part in (
+        post.created_at.timestamp(), post.updated_at.timestamp(), parent.id if parent else '', after_path,
+        limits['limit'], limits['depth'], limits['replies'], limits.get('max_nodes'),
+    ))
+    digest = hashlib.md5(raw.encode('utf-8')).hexdigest()
+    return f'thread:page:{post.id}:{digest}'
+
+
+def get_thread_page(post, parent=None, after_path='', **limits):
+    """Return a viewer-neutral rendered thread page, from the cache when possible.
+
+    The result is a dict with ``tree`` (see ThreadPage.render), ``next_cursor``
+    and ``comment_ids``; callers overlay viewer state with apply_viewer_state().
+    Entries are keyed by the post's updated_at, so ``post`` must be freshly
+    loaded.
+    """
+    key = _page_key(post, parent, after_path, limits)
+    cached = cache.get(key)
+    record_cache('thread', cached is not None)
+    if cached is not None:
+        return cached
+
+    page = load_thread_page(post, parent=parent, after_path=after_path, **limits)
+    cached = {
+        'tree': page.render(),
+        'next_cursor': page.next_cursor,
+        'comment_ids': page.comment_ids,
+    }
+    cache.set(key, cached, timeout=getattr(settings, 'THREAD_CACHE_TIMEOUT', 300))
+    return cached
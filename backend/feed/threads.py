@@ -0,0 +1,151 @@
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+from rest_framework import serializers
+from .models import Comment
+from .pagination import encode_thread_cursor
+from .serializers import CommentSerializer
+
+# Narrow projection read for every comment in a thread page; the row tuples
+# are the only per-comment state held before the JSON is emitted
+COMMENT_ROW_FIELDS = (
+    'id', 'parent_id', 'path', 'depth', 'content', 'created_at',
+    'like_count', 'reply_count', 'author_id', 'author__username',
+)
+(ID, PARENT_ID, PATH, DEPTH, CONTENT, CREATED_AT,
+ LIKE_COUNT, REPLY_COUNT, AUTHOR_ID, AUTHOR_USERNAME) = range(len(COMMENT_ROW_FIELDS))
+
+# Rendered nodes hold exactly CommentSerializer's fields, in its order; a
+# field added there without a value here fails on the first render
+NODE_FIELDS = tuple(CommentSerializer.Meta.fields)
+
+_datetime_field = serializers.DateTimeField()
+
+
+class ThreadPage:
+    """One bounded slice of a comment thread, held as plain value rows.
+
+    ``top_rows`` are up to ``limit`` siblings (roots, or replies of one
+    comment) and ``descendant_rows`` their replies down to ``depth`` extra
+    levels, at most ``replies`` children per comment and ``max_nodes`` rows
+    in all, in path order.
+    ``next_cursor`` continues after the last top-level sibling.
+    """
+
+    def __init__(self, top_rows, descendant_rows, next_cursor):
+        self.top_rows = top_rows
+        self.descendant_rows = descendant_rows
+        self.next_cursor = next_cursor
+
+    @property
+    def comment_ids(self):
+        return [row[ID] for row in self.top_rows] + [row[ID] for row in self.descendant_rows]
+
+    def render(self):
+        """Emit the nested comment JSON in one iterative pass.
+
+        Produces the fields of CommentSerializer, but viewer-neutral:
+        ``is_liked`` is False and ``more_replies`` holds a bare thread cursor,
+        so the result can be cached and shared. apply_viewer_state() fills
+        both in per request. Path order guarantees that a parent is emitted
+        before its children, so each row is appended to its parent's
+        ``replies`` without recursion.
+        """
+        nodes = {}
+        last_child_path = {}
+        top = []
+
+        def emit(row):
+            values = {
+                'id': row[ID],
+                'author': {'id': row[AUTHOR_ID], 'username': row[AUTHOR_USERNAME]},
+                'content': row[CONTENT],
+                'parent': row[PARENT_ID],
+                'created_at': _datetime_field.to_representation(row[CREATED_AT]),
+                'like_count': row[LIKE_COUNT],
+                'replies': [],
+                'depth': row[DEPTH],
+                'is_liked': False,
+                'reply_count': row[REPLY_COUNT],
+                'more_replies': None,
+            }
+            node = {field: values[field] for field in NODE_FIELDS}
+            nodes[row[ID]] = node
+            return node
+
+        for row in self.top_rows:
+            top.append(emit(row))
+        for row in self.descendant_rows:
+            parent = nodes.get(row[PARENT_ID])
+            if parent is None:
+                # Its parent was itself cut off by the per-comment reply limit
+                continue
+            parent['replies'].append(emit(row))
+            last_child_path[row[PARENT_ID]] = row[PATH]
+
+        for pk, node in nodes.items():
+            if node['reply_count'] > len(node['replies']):
+                node['more_replies'] = encode_thread_cursor(pk, last_child_path.get(pk, ''))
+        return top
+
+
+def apply_viewer_state(tree, liked_ids, thread_url):
+    """Overlay per-request fields on a rendered tree, in place and iteratively.
+
+    Sets ``is_liked`` from the viewer's liked comment ids and turns bare
+    ``more_replies`` cursors into URLs via ``thread_url(cursor)``.
+    """
+    stack = list(tree)
+    while stack:
+        node = stack.pop()
+        node['is_liked'] = node['id'] in liked_ids
+        if node['more_replies']:
+            node['more_replies'] = thread_url(node['more_replies'])
+        stack.extend(node['replies'])
+    return tree
+
+
+def load_thread_page(post, parent=None, after_path='', limit=20, depth=3, replies=5, max_nodes=500):
+    """Load a depth-limited page of a post's comment tree in two queries.
+
+    Both queries are range scans on the materialized path. At most
+    ``max_nodes`` rows are read into memory however large the thread and
+    the other limits are: descendants are read in path order up to what
+    the siblings leave of that total, and the comments whose replies were
+    cut off get a ``more_replies`` cursor as for the other limits.
+    """
+    base = Comment.objects.filter(post=post)
+
+    siblings = base.filter(parent=parent) if parent else base.filter(parent__isnull=True)
+    if after_path:
+        siblings = siblings.filter(path__gt=after_path)
+    top_rows = list(siblings.order_by('path').values_list(*COMMENT_ROW_FIELDS)[:limit + 1])
+    has_more = len(top_rows) > limit
+    top_rows = top_rows[:limit]
+
+    descendant_rows = []
+    remaining = max_nodes - len(top_rows)
+    if top_rows and depth > 0 and remaining > 0:
+        # Consecutive siblings' subtrees form one contiguous path range
+        base_depth = top_rows[0][DEPTH]
+        queryset = base.filter(
+            path__gt=top_rows[0][PATH],
+            depth__gt=base_depth,
+            depth__lte=base_depth + depth
+        )
+        upper = Comment._path_upper_bound(top_rows[-1][PATH])
+        if upper:
+            queryset = queryset.filter(path__lt=upper)
+        descendant_rows = list(
+            queryset.annotate(
+                sibling_rank=Window(
+                    RowNumber(),
+                    partition_by=[F('parent_id')],
+                    order_by=F('path').asc()
+                )
+            ).filter(sibling_rank__lte=replies).order_by('path').values_list(*COMMENT_ROW_FIELDS)[:remaining]
+        )
+
+    next_cursor = None
+    if has_more:
+        next_cursor = encode_thread_cursor(parent.id if parent else None, top_rows[-1][PATH])
+    return ThreadPage(top_rows, descendant_rows, next_cursor)
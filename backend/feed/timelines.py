@@ -0,0 +1,202 @@
+from heapq import merge
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.exceptions import NotFound
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+from .models import FanoutEvent, Follow, FollowerCount, Post, PostLike, TimelineEntry
+from .pagination import decode_cursor, encode_cursor
+from .serializers import PostListSerializer
+
+MAX_PAGE_SIZE = 100
+
+
+def fans_out(author_id):
+    """Whether an author's new posts are copied into followers' timelines;
+    drain_fanout records the answer on each post as Post.fanned_out"""
+    count = FollowerCount.objects.filter(user_id=author_id).values_list('count', flat=True).first() or 0
+    return count < settings.FEED_FANOUT_MAX_FOLLOWERS
+
+
+def enqueue_fanout(post):
+    """Queue a new post for fan-out in the caller's transaction.
+
+    With FEED_FANOUT_INLINE (the default) this event is fanned out right
+    after the surrounding transaction commits; set it to False when a
+    fan_out_timelines worker is running.
+    """
+    event = FanoutEvent.objects.create(post=post)
+    if getattr(settings, 'FEED_FANOUT_INLINE', True):
+        transaction.on_commit(lambda: drain_fanout(event_ids=[event.id]))
+
+
+def _add_entries(user_ids, posts, batch_size=1000):
+    TimelineEntry.objects.bulk_create([
+        TimelineEntry(user_id=user_id, post_id=post.id, created_at=post.created_at)
+        for user_id in user_ids for post in posts
+    ], batch_size=batch_size, ignore_conflicts=True)
+
+
+def _follower_ids(author_id, chunk_size):
+    """An author's follower ids in chunks, walking the (followee, id) index"""
+    last_id = 0
+    while True:
+        rows = list(
+            Follow.objects.filter(followee_id=author_id, id__gt=last_id).order_by('id').values_list(
+                'id', 'follower_id'
+            )[:chunk_size]
+        )
+        if not rows:
+            return
+        yield [follower_id for _id, follower_id in rows]
+        last_id = rows[-1][0]
+
+
+def drain_fanout(batch_size=20, chunk_size=1000, event_ids=None):
+    """Fan out one batch of new posts; returns how many were processed.
+
+    Every post lands in its author's own timeline. Authors below
+    FEED_FANOUT_MAX_FOLLOWERS also have it copied to each follower,
+    ``chunk_size`` followers per INSERT; above it the post is marked
+    fanned_out=False and their followers read it directly (fan-out on
+    read), whatever the author's follower count later becomes. Events are
+    claimed with SELECT ... FOR UPDATE and deleted in the same
+    transaction, so concurrent workers never fan a post out twice.
+    ``event_ids`` restricts the batch to those events, as the inline
+    drain does to leave the rest of the queue to the worker.
+    """
+    with transaction.atomic():
+        events = FanoutEvent.objects.select_for_update(of=('self',)).select_related('post').order_by('id')
+        if event_ids is not None:
+            events = events.filter(id__in=event_ids)
+        events = list(events[:batch_size])
+        if not events:
+            return 0
+        read_directly = []
+        for event in events:
+            post = event.post
+            _add_entries([post.author_id], [post])
+            if fans_out(post.author_id):
+                for follower_ids in _follower_ids(post.author_id, chunk_size):
+                    _add_entries(follower_ids, [post], batch_size=chunk_size)
+            else:
+                read_directly.append(post.id)
+        if read_directly:
+            Post.objects.filter(id__in=read_directly).update(fanned_out=False)
+        FanoutEvent.objects.filter(id__in=[event.id for event in events]).delete()
+        return len(events)
+
+
+def get_fanout_stats():
+    """Posts waiting for fan-out"""
+    return {'pending': FanoutEvent.objects.count()}
+
+
+def set_follow(user, followee_id, following):
+    """Idempotently make user follow or stop following followee_id.
+
+    Returns whether the state changed. Following copies the followee's
+    latest FEED_TIMELINE_BACKFILL fanned-out posts into user's timeline
+    (the others are read directly); unfollowing removes the followee's
+    posts from it.
+    Raises User.DoesNotExist for an unknown user and ValueError for
+    following oneself.
+    """
+    if followee_id == user.id:
+        raise ValueError('You cannot follow yourself')
+    if not User.objects.filter(pk=followee_id).exists():
+        raise User.DoesNotExist
+
+    with transaction.atomic():
+        if following:
+            try:
+                with transaction.atomic():
+                    Follow.objects.create(follower=user, followee_id=followee_id)
+            except IntegrityError:
+                return False
+            FollowerCount.apply(followee_id, 1)
+            recent = Post.objects.filter(author_id=followee_id, fanned_out=True).order_by('-created_at', '-id')
+            _add_entries([user.id], list(recent.only('id', 'created_at')[:settings.FEED_TIMELINE_BACKFILL]))
+        else:
+            deleted, _ = Follow.objects.filter(follower=user, followee_id=followee_id).delete()
+            if not deleted:
+                return False
+            FollowerCount.apply(followee_id, -1)
+            TimelineEntry.objects.filter(user=user, post__author_id=followee_id).delete()
+    return True
+
+
+def _after(queryset, created_at_field, id_field, after):
+    """Rows strictly after a (created_at, id) cursor position, newest first"""
+    ordered = queryset.order_by(f'-{created_at_field}', f'-{id_field}')
+    if after is None:
+        return ordered
+    created_at, pk = after
+    return ordered.filter(
+        Q(**{f'{created_at_field}__lt': created_at}) | Q(**{created_at_field: created_at, f'{id_field}__lt': pk})
+    )
+
+
+def get_timeline(user_id, limit, after=None):
+    """Up to ``limit`` + 1 posts of user's home timeline, newest first.
+
+    Merges the materialized entries with the followed authors' posts that
+    were not fanned out (see drain_fanout), which are read directly; each
+    source is one indexed range scan from ``after``, the (created_at,
+    post id) of the previous page's last post. A post is in exactly one
+    of the two sources.
+    """
+    entries = _after(TimelineEntry.objects.filter(user_id=user_id), 'created_at', 'post_id', after)
+    entries = entries.select_related('post__author')[:limit + 1]
+    followees = Follow.objects.filter(follower_id=user_id).values('followee_id')
+    posts = _after(Post.objects.filter(author_id__in=followees, fanned_out=False), 'created_at', 'id', after)
+    posts = posts.select_related('author')[:limit + 1]
+    sources = [
+        [((entry.created_at, entry.post_id), entry.post) for entry in entries],
+        [((post.created_at, post.id), post) for post in posts],
+    ]
+
+    # Each source is sorted newest first
+    return list(merge(*sources, key=lambda row: row[0], reverse=True))[:limit + 1]
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def timeline_view(request):
+    """The viewer's home timeline: their own posts and those of the users
+    they follow, newest first, paged with the opaque ``next`` cursor
+    (``page_size`` up to 100)."""
+    try:
+        limit = min(MAX_PAGE_SIZE, max(1, int(request.query_params.get('page_size', api_settings.PAGE_SIZE))))
+    except ValueError:
+        limit = api_settings.PAGE_SIZE
+    token = request.query_params.get('cursor')
+    after = None
+    if token:
+        created_at, pk, reverse = decode_cursor(token)
+        if reverse:
+            raise NotFound('Invalid cursor')
+        after = (created_at, pk)
+
+    rows = get_timeline(request.user.id, limit, after)
+    next_url = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        created_at, pk = rows[-1][0]
+        next_url = replace_query_param(request.build_absolute_uri(), 'cursor', encode_cursor(created_at, pk))
+
+    posts = [post for _key, post in rows]
+    context = {
+        'request': request,
+        'liked_post_ids': PostLike.get_liked_ids(request.user, [post.id for post in posts]),
+    }
+    return Response({
+        'next': next_url,
+        'results': PostListSerializer(posts, many=True, context=context).data,
+    })
@@ -1,14 +1,30 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import PostViewSet, CommentViewSet, LeaderboardViewSet
+from .views import PostViewSet, CommentViewSet, LeaderboardViewSet, UserViewSet
+from . import async_views
+from .batch import batch_view
+from .event_views import event_stream
+from .metrics import metrics_view
+from .search import search_view
+from .timelines import timeline_view
 from .auth_views import login_view, logout_view, check_auth, current_user, create_user_view
 
 router = DefaultRouter()
 router.register(r'posts', PostViewSet, basename='post')
 router.register(r'comments', CommentViewSet, basename='comment')
 router.register(r'leaderboard', LeaderboardViewSet, basename='leaderboard')
+router.register(r'users', UserViewSet, basename='user')
 
 urlpatterns = [
+    path('api/batch/', batch_view, name='batch'),
+    path('api/events/', event_stream, name='events'),
+    path('api/metrics/', metrics_view, name='metrics'),
+    path('api/search/', search_view, name='search'),
+    path('api/timeline/', timeline_view, name='timeline'),
+    # Async read path; writes and page-number mode fall through to the viewsets
+    path('api/posts/', async_views.post_list),
+    path('api/posts/<int:pk>/', async_views.post_detail),
+    path('api/leaderboard/', async_views.leaderboard),
     path('api/', include(router.urls)),
     path('api/login/', login_view, name='login'),
     path('api/logout/', logout_view, name='logout'),
@@ -0,0 +1,109 @@
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY, get_user_model, user_logged_out
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.utils.crypto import constant_time_compare
+from rest_framework.authentication import SessionAuthentication
+from .invalidation import invalidate
+from .metrics import record_cache
+
+# User attributes kept in a snapshot
+SNAPSHOT_FIELDS = ('id', 'username', 'is_active', 'is_staff', 'is_superuser')
+
+
+class UserSnapshot:
+    """Read-only stand-in for a User, built from the cached snapshot.
+
+    Enough for permission checks and UserSerializer, but not a model
+    instance: views that write rows for the user need request.user from
+    the regular session authentication.
+    """
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, data):
+        for field in SNAPSHOT_FIELDS:
+            setattr(self, field, data[field])
+
+    @property
+    def pk(self):
+        return self.id
+
+    def __str__(self):
+        return self.username
+
+
+def _snapshot_key(user_id):
+    return f'auth:user:{user_id}'
+
+
+def _load_snapshot(user_id):
+    """Cached snapshot of a user, fetched and stored on a miss; None if the user is gone"""
+    key = _snapshot_key(user_id)
+    data = cache.get(key)
+    record_cache('user_snapshot', data is not None)
+    if data is None:
+        user = get_user_model().objects.filter(pk=user_id).first()
+        if user is None:
+            return None
+        data = {field: getattr(user, field) for field in SNAPSHOT_FIELDS}
+        data['session_hash'] = user.get_session_auth_hash()
+        cache.set(key, data, timeout=getattr(settings, 'USER_SNAPSHOT_TTL', 60))
+    return data
+
+
+def get_user_snapshot(request):
+    """The session's user as a UserSnapshot, or None for anonymous sessions.
+
+    Applies the same checks as django.contrib.auth.get_user: a configured
+    backend, an active user and a session hash matching the current
+    password, so password changes still log out other sessions.
+    """
+    session = request.session
+    user_id = session.get(SESSION_KEY)
+    if user_id is None or session.get(BACKEND_SESSION_KEY) not in settings.AUTHENTICATION_BACKENDS:
+        return None
+    data = _load_snapshot(user_id)
+    if data is None or not data['is_active']:
+        return None
+    if not constant_time_compare(session.get(HASH_SESSION_KEY, ''), data['session_hash']):
+        return None
+    return UserSnapshot(data)
+
+
+def invalidate_user_snapshot(user_id):
+    """Forget a user's snapshot now and again on commit, as invalidate_leaderboards does"""
+    key = _snapshot_key(user_id)
+    invalidate(lambda: cache.delete(key))
+
+
+class SnapshotSessionAuthentication(SessionAuthentication):
+    """Session authentication that answers from the user snapshot.
+
+    With the cache session engine, authenticating this way needs no
+    database query once the snapshot is cached.
+    """
+
+    def authenticate(self, request):
+        snapshot = get_user_snapshot(request._request)
+        if snapshot is None:
+            return None
+        self.enforce_csrf(request)
+        return (snapshot, None)
+
+
+def _user_changed(sender, instance, **kwargs):
+    invalidate_user_snapshot(instance.pk)
+
+
+def _user_logged_out(sender, request, user, **kwargs):
+    if user is not None:
+        invalidate_user_snapshot(user.pk)
+
+
+def connect_signals():
+    """Called from FeedConfig.ready()"""
+    user_model = get_user_model()
+    post_save.connect(_user_changed, sender=user_model, dispatch_uid='feed.user_snapshot.save')
+    post_delete.connect(_user_changed, sender=user_model, dispatch_uid='feed.user_snapshot.delete')
+    user_logged_out.connect(_user_logged_out, dispatch_uid='feed.user_snapshot.logout')
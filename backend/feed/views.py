@@ -2,13 +2,28 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticatedOrReadOnly, IsAuthenticated
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.utils.urls import replace_query_param
+from rest_framework.exceptions import NotFound
+from django.urls import reverse
 from django.db import transaction
 from django.db.models import Prefetch, Q, Count, Sum
 from django.contrib.auth.models import User
 from django.contrib.contenttypes.models import ContentType
 from django.utils import timezone
 from datetime import timedelta
-from .models import Post, Comment, Like, KarmaTransaction
+from .models import MAX_COMMENT_DEPTH, Post, Comment, PostLike, CommentLike, KarmaOutboxEvent
+from .pagination import KeysetPagination, decode_thread_cursor
+from .threads import apply_viewer_state
+from .thread_cache import get_thread_page
+from .counters import adjust_like_count, record_new_comment, touch_post
+from .outbox import enqueue_karma
+from .timelines import enqueue_fanout, set_follow
+from .likes import remove_legacy_like, set_like
+from .conditional import make_etag, not_modified_response, set_validators
+from .events import publish_on_commit
+from .leaderboard import DEFAULT_WINDOW, WINDOWS as LEADERBOARD_WINDOWS, get_leaderboard
+from .ranking import DEFAULT_ORDERING, DEFAULT_TOP_WINDOW, KEYSET_FIELDS, ORDERINGS, TOP_WINDOWS, rank_posts
 from .serializers import (
     PostSerializer,
     PostListSerializer,
@@ -18,10 +33,65 @@ from .serializers import (
 )
 
 
-class PostViewSet(viewsets.ModelViewSet):
+class SetLikeMixin:
+    """Idempotent PUT/DELETE handling shared by the post and comment like actions"""
+
+    def _set_like(self, request, model, pk):
+        liked = request.method == 'PUT'
+        try:
+            changed = set_like(request.user, model, int(pk), liked)
+        except (ValueError, model.DoesNotExist):
+            raise NotFound()
+        name = model.__name__
+        return Response(
+            {'liked': liked, 'changed': changed, 'message': f"{name} {'liked' if liked else 'unliked'}"},
+            status=status.HTTP_201_CREATED if liked and changed else status.HTTP_200_OK
+        )
+
+
+class PostViewSet(SetLikeMixin, viewsets.ModelViewSet):
     """ViewSet for Post model with optimized queries"""
     queryset = Post.objects.all()
     permission_classes = [IsAuthenticatedOrReadOnly]
+    # Comment tree loading limits (overridable per request up to the maxima)
+    comment_page_size = 20
+    comment_max_page_size = 100
+    comment_depth = 3
+    comment_max_depth = 10
+    comment_replies_per_node = 5
+    comment_max_replies_per_node = 50
+    # Comments on one thread page, whatever the limits above multiply out to
+    comment_max_nodes = 500
+
+    @property
+    def paginator(self):
+        """Keyset pagination by default; ?page=N opts into page numbers"""
+        if not hasattr(self, '_paginator'):
+            if 'page' in self.request.query_params:
+                self._paginator = PageNumberPagination()
+            else:
+                self._paginator = KeysetPagination(*KEYSET_FIELDS[self._ordering()[0]])
+        return self._paginator
+
+    def _ordering(self):
+        """The feed's (?ordering=, ?window=); window only matters for top"""
+        params = self.request.query_params
+        return params.get('ordering', DEFAULT_ORDERING), params.get('window', DEFAULT_TOP_WINDOW)
+
+    def _ordering_error(self):
+        """400 response for an unknown ordering or top window, else None"""
+        ordering, window = self._ordering()
+        if ordering not in ORDERINGS:
+            return Response(
+                {'error': f"Unknown ordering '{ordering}'. Choose from: {', '.join(ORDERINGS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if ordering == 'top' and window not in TOP_WINDOWS:
+            return Response(
+                {'error': f"Unknown window '{window}'. Choose from: {', '.join(TOP_WINDOWS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return None
 
     def get_serializer_class(self):
         if self.action == 'list':
@@ -30,80 +100,176 @@ class PostViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         """Optimize queryset to avoid N+1 queries"""
-        queryset = Post.objects.select_related('author').prefetch_related(
-            Prefetch(
-                'likes',
-                queryset=Like.objects.select_related('user')
-            )
-        ).annotate(
-            annotated_like_count=Count('likes', distinct=True),
-            annotated_comment_count=Count('comments', distinct=True)
+        queryset = Post.objects.select_related('author')
+        if self.action == 'list':
+            return rank_posts(queryset, *self._ordering())
+        return queryset.order_by('-created_at', '-id')
+
+    def list(self, request, *args, **kwargs):
+        """List posts with the viewer's liked state resolved for the whole page.
+
+        Newest first by default; ``?ordering=hot`` ranks by time-decayed
+        engagement and ``?ordering=top&window=24h|7d|30d|all`` by engagement
+        among posts from the window. Every ordering pages through a cursor.
+
+        The page's post rows double as the conditional-GET validator: a
+        matching If-None-Match / If-Modified-Since gets a 304 before the
+        like table is read or anything is serialized.
+        """
+        error = self._ordering_error()
+        if error is not None:
+            return error
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        posts = page if page is not None else list(queryset)
+
+        etag, last_modified = self._list_validators(request, posts)
+        not_modified = not_modified_response(request, etag, last_modified)
+        if not_modified is not None:
+            return not_modified
+
+        context = self.get_serializer_context()
+        context['liked_post_ids'] = PostLike.get_liked_ids(
+            request.user, [post.id for post in posts]
         )
-        return queryset
+        serializer = self.get_serializer_class()(posts, many=True, context=context)
+        if page is not None:
+            response = self.get_paginated_response(serializer.data)
+        else:
+            response = Response(serializer.data)
+        return set_validators(response, etag, last_modified)
+
+    def _list_validators(self, request, posts):
+        """ETag and Last-Modified for a page of posts, from the post rows alone"""
+        etag = make_etag(request, *(
+            (post.id, post.updated_at, post.like_count, post.comment_count) for post in posts
+        ))
+        return etag, max((post.updated_at for post in posts), default=None)
+
+    def _detail_etag(self, request, instance):
+        # Every write that changes the detail response bumps the post's updated_at
+        return make_etag(request, instance.id, instance.updated_at, instance.like_count, instance.comment_count)
+
+    def _thread_limits(self, request):
+        """Read limit/depth/replies query params, clamped to the viewset's maxima, plus the node cap"""
+        def read(name, default, maximum):
+            try:
+                value = int(request.query_params.get(name, default))
+            except ValueError:
+                return default
+            return max(0, min(value, maximum))
+
+        return {
+            'limit': max(read('limit', self.comment_page_size, self.comment_max_page_size), 1),
+            'depth': read('depth', self.comment_depth, self.comment_max_depth),
+            'replies': max(read('replies', self.comment_replies_per_node, self.comment_max_replies_per_node), 1),
+            'max_nodes': self.comment_max_nodes,
+        }
+
+    def _render_thread(self, request, post, parent=None, after_path=''):
+        """Fetch a (possibly cached) thread page and overlay the viewer's state"""
+        page = get_thread_page(post, parent=parent, after_path=after_path, **self._thread_limits(request))
+
+        base_url = request.build_absolute_uri(reverse('post-thread', kwargs={'pk': post.id}))
+        # Carry the caller's limits over to the continuation URLs
+        for name in ('limit', 'depth', 'replies'):
+            if name in request.query_params:
+                base_url = replace_query_param(base_url, name, request.query_params[name])
+
+        def thread_url(cursor):
+            return replace_query_param(base_url, 'cursor', cursor)
+
+        # Resolve the viewer's likes once for the whole page
+        liked_ids = CommentLike.get_liked_ids(request.user, page['comment_ids'])
+        tree = apply_viewer_state(page['tree'], liked_ids, thread_url)
+        next_url = thread_url(page['next_cursor']) if page['next_cursor'] else None
+        return tree, next_url
 
     def retrieve(self, request, *args, **kwargs):
-        """Retrieve a single post with full comment tree (optimized)"""
+        """Retrieve a post with the first page of its comment tree.
+
+        Returns up to ``limit`` root comments, each down to ``depth`` levels
+        of replies with at most ``replies`` children per comment. Truncated
+        branches carry a ``more_replies`` URL and ``comments_next`` continues
+        with further roots; both resume through the ``thread`` action.
+        """
         instance = self.get_object()
-        
-        # Fetch all comments for this post in a single query with all relationships
-        comments = Comment.objects.filter(post=instance).select_related(
-            'author', 'parent'
-        ).prefetch_related(
-            Prefetch(
-                'likes',
-                queryset=Like.objects.select_related('user')
-            )
-        ).annotate(
-            annotated_like_count=Count('likes')
-        ).order_by('created_at')
-        
-        # Attach prefetched comments to instance for serializer
-        instance._prefetched_comments = list(comments)
-        
-        serializer = self.get_serializer(instance)
-        return Response(serializer.data)
+
+        etag = self._detail_etag(request, instance)
+        not_modified = not_modified_response(request, etag, instance.updated_at)
+        if not_modified is not None:
+            return not_modified
+
+        instance._comment_tree, instance._comments_next = self._render_thread(request, instance)
+
+        context = self.get_serializer_context()
+        context['liked_post_ids'] = PostLike.get_liked_ids(request.user, [instance.id])
+        serializer = self.get_serializer_class()(instance, context=context)
+        return set_validators(Response(serializer.data), etag, instance.updated_at)
+
+    @action(detail=True, methods=['get'])
+    def thread(self, request, pk=None):
+        """Continue a comment tree from a cursor returned by retrieve or a previous page"""
+        post = self.get_object()
+        parent = None
+        after_path = ''
+        cursor = request.query_params.get('cursor')
+        if cursor:
+            parent_id, after_path = decode_thread_cursor(cursor)
+            if parent_id is not None:
+                parent = Comment.objects.filter(id=parent_id, post=post).first()
+                if parent is None:
+                    raise NotFound('Invalid cursor')
+
+        results, next_url = self._render_thread(request, post, parent=parent, after_path=after_path)
+        return Response({
+            'next': next_url,
+            'results': results,
+        })
 
     def perform_create(self, serializer):
-        """Create a new post"""
-        serializer.save(author=self.request.user)
+        """Create a new post, queue it for followers' timelines and announce it to live feed streams"""
+        with transaction.atomic():
+            post = serializer.save(author=self.request.user)
+            enqueue_fanout(post)
+        # Viewer-neutral payload: nobody has liked a brand new post yet
+        payload = PostListSerializer(post, context={'liked_post_ids': set()}).data
+        publish_on_commit('post.created', id=post.id, post=payload)
 
-    @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
+    @action(detail=True, methods=['post', 'put', 'delete'], permission_classes=[IsAuthenticated])
     def like(self, request, pk=None):
-        """Like or unlike a post with concurrency protection"""
+        """Like or unlike a post.
+
+        PUT likes and DELETE unlikes idempotently, so they are safe to retry;
+        POST is the original toggle, kept for existing clients.
+        """
+        if request.method != 'POST':
+            return self._set_like(request, Post, pk)
         post = self.get_object()
         user = request.user
         content_type = ContentType.objects.get_for_model(Post)
         
         with transaction.atomic():
             # Use select_for_update to prevent race conditions
-            like, created = Like.objects.select_for_update().get_or_create(
-                user=user,
-                content_type=content_type,
-                object_id=post.id,
-                defaults={}
-            )
+            like, created = PostLike.objects.select_for_update().get_or_create(user=user, post=post)
             
             if not created:
-                # Unlike: delete the like and remove karma
+                # Unlike: delete the like and queue the karma reversal
+                like_id = like.id
                 like.delete()
-                # Remove the most recent matching karma transaction (limit to 1 to avoid deleting others' karma)
-                karma_tx = KarmaTransaction.objects.filter(
-                    user=post.author,
-                    content_type=content_type,
-                    object_id=post.id,
-                    amount=5  # Post like = 5 karma
-                ).order_by('-created_at').first()
-                if karma_tx:
-                    karma_tx.delete()
+                if like.from_legacy:
+                    remove_legacy_like(PostLike, user.id, post.id)
+                adjust_like_count(Post, post.id, -1)
+                # Karma is reversed by the outbox drain, not on the request path
+                enqueue_karma(
+                    KarmaOutboxEvent.UNLIKE, post.author_id, 5, content_type, post.id,
+                    like_id=like_id, like_created_at=like.created_at
+                )
                 return Response({'liked': False, 'message': 'Post unliked'}, status=status.HTTP_200_OK)
             
-            # Like: create karma transaction
-            KarmaTransaction.objects.create(
-                user=post.author,
-                amount=5,  # Post like = 5 karma
-                content_type=content_type,
-                object_id=post.id
-            )
+            # Like: bump the counter and queue the karma award
+            adjust_like_count(Post, post.id, 1)
+            enqueue_karma(KarmaOutboxEvent.LIKE, post.author_id, 5, content_type, post.id, like_id=like.id)  # Post like = 5 karma
             return Response({'liked': True, 'message': 'Post liked'}, status=status.HTTP_201_CREATED)
 
     @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
@@ -122,93 +288,200 @@ class PostViewSet(viewsets.ModelViewSet):
                     {'error': 'Parent comment not found'},
                     status=status.HTTP_400_BAD_REQUEST
                 )
+            if parent.depth >= MAX_COMMENT_DEPTH:
+                return Response(
+                    {'error': f'Replies can be nested at most {MAX_COMMENT_DEPTH} levels deep'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
         
-        comment = Comment.objects.create(
-            post=post,
-            author=request.user,
-            content=request.data.get('content'),
-            parent=parent
-        )
+        with transaction.atomic():
+            comment = Comment.objects.create(
+                post=post,
+                author=request.user,
+                content=request.data.get('content'),
+                parent=parent
+            )
+            record_new_comment(comment)
         
         serializer = CommentSerializer(comment)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
 
-class CommentViewSet(viewsets.ReadOnlyModelViewSet):
+class CommentViewSet(SetLikeMixin, viewsets.ReadOnlyModelViewSet):
     """ViewSet for Comment model"""
-    queryset = Comment.objects.all()
+    queryset = Comment.objects.select_related('author')
     serializer_class = CommentSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
 
-    @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
+    def list(self, request, *args, **kwargs):
+        """List comments with the viewer's liked state resolved for the whole page"""
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        comments = page if page is not None else list(queryset)
+
+        context = self.get_serializer_context()
+        context['liked_comment_ids'] = CommentLike.get_liked_ids(
+            request.user, [comment.id for comment in comments]
+        )
+        serializer = self.get_serializer_class()(comments, many=True, context=context)
+        if page is not None:
+            return self.get_paginated_response(serializer.data)
+        return Response(serializer.data)
+
+    @action(detail=True, methods=['post', 'put', 'delete'], permission_classes=[IsAuthenticated])
     def like(self, request, pk=None):
-        """Like or unlike a comment with concurrency protection"""
+        """Like or unlike a comment.
+
+        PUT likes and DELETE unlikes idempotently, so they are safe to retry;
+        POST is the original toggle, kept for existing clients.
+        """
+        if request.method != 'POST':
+            return self._set_like(request, Comment, pk)
         comment = self.get_object()
         user = request.user
         content_type = ContentType.objects.get_for_model(Comment)
         
         with transaction.atomic():
             # Use select_for_update to prevent race conditions
-            like, created = Like.objects.select_for_update().get_or_create(
-                user=user,
-                content_type=content_type,
-                object_id=comment.id,
-                defaults={}
-            )
+            like, created = CommentLike.objects.select_for_update().get_or_create(user=user, comment=comment)
             
             if not created:
-                # Unlike: delete the like and remove karma
+                # Unlike: delete the like and queue the karma reversal
+                like_id = like.id
                 like.delete()
-                # Remove the most recent matching karma transaction (limit to 1 to avoid deleting others' karma)
-                karma_tx = KarmaTransaction.objects.filter(
-                    user=comment.author,
-                    content_type=content_type,
-                    object_id=comment.id,
-                    amount=1  # Comment like = 1 karma
-                ).order_by('-created_at').first()
-                if karma_tx:
-                    karma_tx.delete()
+                if like.from_legacy:
+                    remove_legacy_like(CommentLike, user.id, comment.id)
+                adjust_like_count(Comment, comment.id, -1)
+                touch_post(comment.post_id)
+                # Karma is reversed by the outbox drain, not on the request path
+                enqueue_karma(
+                    KarmaOutboxEvent.UNLIKE, comment.author_id, 1, content_type, comment.id,
+                    like_id=like_id, like_created_at=like.created_at
+                )
                 return Response({'liked': False, 'message': 'Comment unliked'}, status=status.HTTP_200_OK)
             
-            # Like: create karma transaction
-            KarmaTransaction.objects.create(
-                user=comment.author,
-                amount=1,  # Comment like = 1 karma
-                content_type=content_type,
-                object_id=comment.id
-            )
+            # Like: bump the counter and queue the karma award
+            adjust_like_count(Comment, comment.id, 1)
+            touch_post(comment.post_id)
+            enqueue_karma(KarmaOutboxEvent.LIKE, comment.author_id, 1, content_type, comment.id, like_id=like.id)  # Comment like = 1 karma
             return Response({'liked': True, 'message': 'Comment liked'}, status=status.HTTP_201_CREATED)
 
 
+class UserViewSet(viewsets.GenericViewSet):
+    """Follow relationships between users"""
+    queryset = User.objects.all()
+    permission_classes = [IsAuthenticatedOrReadOnly]
+
+    @action(detail=True, methods=['put', 'delete'], permission_classes=[IsAuthenticated])
+    def follow(self, request, pk=None):
+        """Follow (PUT) or unfollow (DELETE) a user idempotently; safe to retry"""
+        following = request.method == 'PUT'
+        try:
+            followee_id = int(pk)
+        except ValueError:
+            raise NotFound()
+        try:
+            changed = set_follow(request.user, followee_id, following)
+        except User.DoesNotExist:
+            raise NotFound()
+        except ValueError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(
+            {'following': following, 'changed': changed, 'message': f"User {'followed' if following else 'unfollowed'}"},
+            status=status.HTTP_201_CREATED if following and changed else status.HTTP_200_OK
+        )
+
+
 class LeaderboardViewSet(viewsets.ViewSet):
     """ViewSet for leaderboard"""
     permission_classes = [IsAuthenticatedOrReadOnly]
+    default_limit = 5
+    max_limit = 100
+
+    def _parse_int(self, request, name, default, minimum):
+        try:
+            return max(int(request.query_params.get(name, default)), minimum)
+        except ValueError:
+            return default
+
+    def _window_error(self, window):
+        return Response(
+            {'error': f"Unknown window '{window}'. Choose from: {', '.join(LEADERBOARD_WINDOWS)}"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    def _page_params(self, request):
+        offset = self._parse_int(request, 'offset', 0, 0)
+        limit = min(self._parse_int(request, 'limit', self.default_limit, 1), self.max_limit)
+        return offset, limit
+
+    def _etag(self, request, leaderboard, entries, me):
+        # The ranked entries are the validator: answer 304 before fetching users
+        return make_etag(request, len(leaderboard), tuple(
+            (entry['user_id'], entry['total_karma'], entry['rank']) for entry in entries
+        ), me and (me['total_karma'], me['rank']))
+
+    def _user_ids(self, entries, me):
+        user_ids = {entry['user_id'] for entry in entries}
+        if me:
+            user_ids.add(me['user_id'])
+        return user_ids
+
+    def _response_data(self, request, window, offset, limit, leaderboard, entries, me, users):
+        """The legacy list, or the paged envelope when any query parameter is given"""
+        result = [
+            {**entry, 'user': users[entry['user_id']]}
+            for entry in entries if entry['user_id'] in users
+        ]
+        data = LeaderboardEntrySerializer(result, many=True).data
+
+        if not any(name in request.query_params for name in ('window', 'offset', 'limit')):
+            return data
+
+        if me and me['user_id'] in users:
+            me = LeaderboardEntrySerializer({**me, 'user': users[me['user_id']]}).data
+        else:
+            me = None
+        base_url = request.build_absolute_uri()
+        next_url = None
+        if offset + limit < len(leaderboard):
+            next_url = replace_query_param(base_url, 'offset', offset + limit)
+        previous_url = None
+        if offset > 0:
+            previous_url = replace_query_param(base_url, 'offset', max(offset - limit, 0))
+        return {
+            'window': window,
+            'count': len(leaderboard),
+            'next': next_url,
+            'previous': previous_url,
+            'results': data,
+            'me': me,
+        }
 
     def list(self, request):
-        """Get top 5 users by karma in last 24 hours"""
-        cutoff_time = timezone.now() - timedelta(hours=24)
-        
-        # Calculate karma for last 24 hours
-        leaderboard_data = KarmaTransaction.objects.filter(
-            created_at__gte=cutoff_time
-        ).values('user').annotate(
-            total_karma=Sum('amount')
-        ).order_by('-total_karma')[:5]
-        
-        # Fetch user details
-        user_ids = [entry['user'] for entry in leaderboard_data]
-        users = {user.id: user for user in User.objects.filter(id__in=user_ids)}
-        
-        # Build response with rank
-        result = []
-        for rank, entry in enumerate(leaderboard_data, start=1):
-            user = users.get(entry['user'])
-            if user:
-                result.append({
-                    'user': UserSerializer(user).data,
-                    'total_karma': entry['total_karma'],
-                    'rank': rank
-                })
-        
-        serializer = LeaderboardEntrySerializer(result, many=True)
-        return Response(serializer.data)
+        """Get users ranked by karma over a window (default: top 5, last 24 hours).
+
+        Without query parameters the response is the legacy top-5 list. With
+        ?window=1h|24h|7d|all, ?offset= or ?limit= it is a paged envelope that
+        also carries the requesting user's own rank as ``me``.
+        """
+        window = request.query_params.get('window', DEFAULT_WINDOW)
+        if window not in LEADERBOARD_WINDOWS:
+            return self._window_error(window)
+        offset, limit = self._page_params(request)
+
+        leaderboard = get_leaderboard(window)
+        entries = leaderboard.page(offset, limit)
+        me = None
+        if request.user.is_authenticated:
+            me = leaderboard.lookup(request.user.id)
+
+        etag = self._etag(request, leaderboard, entries, me)
+        not_modified = not_modified_response(request, etag)
+        if not_modified is not None:
+            return not_modified
+
+        # Fetch user details for the page (and the viewer) in one query
+        users = User.objects.in_bulk(self._user_ids(entries, me))
+        data = self._response_data(request, window, offset, limit, leaderboard, entries, me, users)
+        return set_validators(Response(data), etag)
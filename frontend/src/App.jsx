@@ -4,7 +4,14 @@ import Leaderboard from './components/Leaderboard'
 import CreatePost from './components/CreatePost'
 import Login from './components/Login'
 import Register from './components/Register'
-import { leaderboardAPI, authAPI } from './api'
+import { leaderboardAPI, authAPI, subscribeEvents } from './api'
+
+// Longest random delay before refetching the leaderboard after a change event
+const LEADERBOARD_RELOAD_JITTER_MS = 2000
+// Leaderboard poll while the event stream is down or unavailable, and while
+// it is up (then only to move the 24h window edge)
+const LEADERBOARD_POLL_MS = 60000
+const LEADERBOARD_STREAM_POLL_MS = 300000
 
 function App() {
   const [leaderboard, setLeaderboard] = useState([])
@@ -17,8 +24,41 @@ function App() {
   useEffect(() => {
     checkAuth()
     loadLeaderboard()
-    const interval = setInterval(loadLeaderboard, 60000) // Refresh every minute
-    return () => clearInterval(interval)
+    // Reload when karma changes; every client gets the event at once, so
+    // each waits a random moment (folding in any further events) to spread
+    // the refetches out. Poll as before until the stream is open, and again
+    // whenever it drops.
+    let reloadTimer = null
+    const scheduleReload = () => {
+      if (reloadTimer === null) {
+        reloadTimer = setTimeout(() => {
+          reloadTimer = null
+          loadLeaderboard()
+        }, Math.random() * LEADERBOARD_RELOAD_JITTER_MS)
+      }
+    }
+    let interval = null
+    let pollMs = null
+    const pollEvery = (ms) => {
+      // onerror repeats while the browser retries; keep the running interval
+      if (ms !== pollMs) {
+        clearInterval(interval)
+        interval = setInterval(loadLeaderboard, ms)
+        pollMs = ms
+      }
+    }
+    pollEvery(LEADERBOARD_POLL_MS)
+    const unsubscribe = subscribeEvents({
+      open: () => pollEvery(LEADERBOARD_STREAM_POLL_MS),
+      error: () => pollEvery(LEADERBOARD_POLL_MS),
+      'leaderboard.changed': scheduleReload,
+      resync: scheduleReload,
+    })
+    return () => {
+      unsubscribe()
+      clearInterval(interval)
+      clearTimeout(reloadTimer)
+    }
   }, [])
 
   const checkAuth = async () => {
@@ -103,6 +103,8 @@ console.log('API Base URL:', API_BASE_URL)
 export const postsAPI = {
   getAll: () => api.get('/posts/'),
   getById: (id) => api.get(`/posts/${id}/`),
+  // Follow a comments_next / more_replies URL returned by the API
+  getThreadPage: (url) => api.get(url),
   create: (content) => api.post('/posts/', { content }),
   like: (id) => api.post(`/posts/${id}/like/`),
   addComment: (postId, content, parentId = null) =>
@@ -117,6 +119,46 @@ export const leaderboardAPI = {
   getTop5: () => api.get('/leaderboard/'),
 }
 
+// Live feed events (Server-Sent Events). Each tab holds one stream for every
+// topic, shared by all subscribers and closed when the last one leaves.
+const EVENT_TOPICS = ['posts', 'leaderboard']
+const EVENT_TYPES = ['post.created', 'post.counters', 'leaderboard.changed', 'resync']
+const eventSubscribers = new Set()
+let eventSource = null
+
+const notify = (type, payload) => {
+  eventSubscribers.forEach((handlers) => handlers[type] && handlers[type](payload))
+}
+
+// Subscribe to live events; handlers maps event type to a callback receiving
+// the parsed payload, plus `open` and `error` for the stream's state (`open`
+// is called at once if the stream is already up). Returns an unsubscribe
+// function.
+export const subscribeEvents = (handlers) => {
+  eventSubscribers.add(handlers)
+  if (eventSource === null) {
+    eventSource = new EventSource(`${API_BASE_URL}/events/?topics=${EVENT_TOPICS.join(',')}`, {
+      withCredentials: true,
+    })
+    eventSource.onopen = () => notify('open')
+    // Also fires while the browser retries, and for good if the server
+    // cannot stream (a WSGI deployment answers 503)
+    eventSource.onerror = () => notify('error')
+    EVENT_TYPES.forEach((type) => {
+      eventSource.addEventListener(type, (event) => notify(type, JSON.parse(event.data)))
+    })
+  } else if (eventSource.readyState === EventSource.OPEN && handlers.open) {
+    handlers.open()
+  }
+  return () => {
+    eventSubscribers.delete(handlers)
+    if (eventSubscribers.size === 0) {
+      eventSource.close()
+      eventSource = null
+    }
+  }
+}
+
 export const authAPI = {
   login: (username, password) => api.post('/login/', { username, password }),
   logout: () => api.post('/logout/'),
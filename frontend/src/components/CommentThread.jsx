@@ -1,12 +1,22 @@
-import { useState } from 'react'
+import { useState, useEffect } from 'react'
 import { postsAPI, commentsAPI } from '../api'
 
-function CommentThread({ comments, postId, onUpdate, depth = 0 }) {
+function CommentThread({ comments, moreUrl = null, postId, onUpdate, depth = 0 }) {
   const [replyingTo, setReplyingTo] = useState(null)
+  const [loadedComments, setLoadedComments] = useState([])
+  const [nextUrl, setNextUrl] = useState(moreUrl)
+  const [loadingMore, setLoadingMore] = useState(false)
   const [replyContent, setReplyContent] = useState('')
   const [submittingReply, setSubmittingReply] = useState(false)
   const [likingComments, setLikingComments] = useState(new Set())
 
+  // A reloaded thread brings a fresh first page and cursor; pages loaded
+  // from the old cursor would repeat comments
+  useEffect(() => {
+    setLoadedComments([])
+    setNextUrl(moreUrl)
+  }, [postId, comments, moreUrl])
+
   const handleLike = async (commentId) => {
     if (likingComments.has(commentId)) return
     try {
@@ -41,7 +51,23 @@ function CommentThread({ comments, postId, onUpdate, depth = 0 }) {
     }
   }
 
-  if (!comments || comments.length === 0) {
+  const handleLoadMore = async () => {
+    if (!nextUrl || loadingMore) return
+    try {
+      setLoadingMore(true)
+      const response = await postsAPI.getThreadPage(nextUrl)
+      setLoadedComments((prev) => [...prev, ...response.data.results])
+      setNextUrl(response.data.next)
+    } catch (error) {
+      console.error('Failed to load more comments:', error)
+    } finally {
+      setLoadingMore(false)
+    }
+  }
+
+  const allComments = [...(comments || []), ...loadedComments]
+
+  if (allComments.length === 0 && !nextUrl) {
     return (
       <div className="text-gray-500 text-sm py-4 text-center">
         No comments yet. Be the first to comment!
@@ -51,7 +77,7 @@ function CommentThread({ comments, postId, onUpdate, depth = 0 }) {
 
   return (
     <div className={`space-y-4 ${depth > 0 ? 'ml-8 border-l-2 border-gray-200 pl-4' : ''}`}>
-      {comments.map((comment) => (
+      {allComments.map((comment) => (
         <div key={comment.id} className="bg-gray-50 rounded-lg p-4">
           <div className="flex items-start justify-between mb-2">
             <div className="flex items-center space-x-2">
@@ -134,10 +160,11 @@ function CommentThread({ comments, postId, onUpdate, depth = 0 }) {
             </form>
           )}
 
-          {comment.replies && comment.replies.length > 0 && (
+          {((comment.replies && comment.replies.length > 0) || comment.more_replies) && (
             <div className="mt-4">
               <CommentThread
                 comments={comment.replies}
+                moreUrl={comment.more_replies}
                 postId={postId}
                 onUpdate={onUpdate}
                 depth={depth + 1}
@@ -146,6 +173,16 @@ function CommentThread({ comments, postId, onUpdate, depth = 0 }) {
           )}
         </div>
       ))}
+
+      {nextUrl && (
+        <button
+          onClick={handleLoadMore}
+          disabled={loadingMore}
+          className="text-sm text-blue-600 hover:text-blue-800 px-3 py-1 rounded hover:bg-gray-100 transition-colors disabled:opacity-50"
+        >
+          {loadingMore ? 'Loading...' : 'Load more replies'}
+        </button>
+      )}
     </div>
   )
 }
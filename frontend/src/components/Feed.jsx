@@ -1,6 +1,6 @@
 import { useState, useEffect } from 'react'
 import PostCard from './PostCard'
-import { postsAPI } from '../api'
+import { postsAPI, subscribeEvents } from '../api'
 
 function Feed({ onUpdate }) {
   const [posts, setPosts] = useState([])
@@ -9,6 +9,26 @@ function Feed({ onUpdate }) {
 
   useEffect(() => {
     loadPosts()
+
+    // Live updates instead of refetching the whole feed
+    const unsubscribe = subscribeEvents({
+      'post.created': ({ post }) =>
+        setPosts((current) => (current.some((p) => p.id === post.id) ? current : [post, ...current])),
+      'post.counters': ({ id, like_count_delta = 0, comment_count_delta = 0 }) =>
+        setPosts((current) =>
+          current.map((p) =>
+            p.id === id
+              ? {
+                  ...p,
+                  like_count: p.like_count + like_count_delta,
+                  comment_count: p.comment_count + comment_count_delta,
+                }
+              : p
+          )
+        ),
+      resync: () => loadPosts(),
+    })
+    return unsubscribe
   }, [])
 
   const loadPosts = async () => {
@@ -1,4 +1,4 @@
-import { useState } from 'react'
+import { useState, useEffect } from 'react'
 import CommentThread from './CommentThread'
 import { postsAPI } from '../api'
 
@@ -9,6 +9,11 @@ function PostCard({ post, onUpdate }) {
   const [commentContent, setCommentContent] = useState('')
   const [submittingComment, setSubmittingComment] = useState(false)
 
+  // Pick up live counter changes pushed into the feed
+  useEffect(() => {
+    setPostData((current) => ({ ...current, like_count: post.like_count, comment_count: post.comment_count }))
+  }, [post.like_count, post.comment_count])
+
   const handleCommentUpdate = async () => {
     if (showComments) {
       await loadFullPost()
@@ -147,7 +152,8 @@ function PostCard({ post, onUpdate }) {
           </form>
 
           <CommentThread
-            comments={postData.comments || []}
+            comments={postData.comments}
+            moreUrl={postData.comments_next}
             postId={postData.id}
             onUpdate={handleCommentUpdate}
           />